@@ -0,0 +1,20 @@
+"""
+Shared FastAPI dependencies
+
+Created on first use and cached for the lifetime of the worker process.
+"""
+
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def get_spatial_engine():
+    """
+    Return the worker's shared SpatialEngine instance.
+
+    execute_plan/execute_stats_plan/execute_raster_operation keep no
+    per-request state on the engine, so a single instance can serve all
+    requests. Imported lazily: the engine pulls in geopandas/GDAL.
+    """
+    from app.utils.spatial_engine import SpatialEngine
+    return SpatialEngine(data_dir="./data")
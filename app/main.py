@@ -1,22 +1,74 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
 from pathlib import Path
+from typing import Optional, Tuple
+from logging.handlers import QueueHandler, QueueListener
+import anyio
+import asyncio
+import atexit
+import logging
 import os
+import queue
+import re
+import sys
+
+# GDAL/PROJ defaults, set before any route module imports rasterio: no
+# debug logging, no network grid fetches, and a larger block cache (MB)
+os.environ.setdefault("CPL_DEBUG", "OFF")
+os.environ.setdefault("PROJ_NETWORK", "OFF")
+os.environ.setdefault("GDAL_CACHEMAX", "1024")
 
 from app.routes import query_router
 from app.routes.raster import router as raster_router
-from app.utils.database import db_manager
-from app.utils.auto_discovery import auto_discovery
+from app.utils.http_cache import compute_etag, etag_response
+
+# app.utils.database (SQLAlchemy, geopandas), app.utils.auto_discovery and
+# app.utils.raster_operations (rasterio) are imported inside the handlers
+# that use them, so importing this module stays cheap
+
+
+def configure_logging() -> QueueListener:
+    """
+    Route the app's loggers through a QueueHandler.
+
+    Callers on the event loop only enqueue records; formatting and the
+    blocking stream write happen on the listener's background thread.
+    """
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+
+    app_logger = logging.getLogger("app")
+    app_logger.addHandler(QueueHandler(log_queue))
+    app_logger.setLevel(logging.INFO)
+    app_logger.propagate = False
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+log_listener = configure_logging()
+logger = logging.getLogger(__name__)
+
+# Interactive docs are for development; disabling them in production also
+# skips building the OpenAPI schema for every worker.
+ENABLE_DOCS = os.getenv("ENABLE_DOCS", "true").lower() in ("1", "true", "yes")
 
 # Create FastAPI app
 app = FastAPI(
     title="Cognitive Geospatial Assistant API",
     description="An LLM-Integrated API for Interactive Geospatial Reasoning and Querying",
     version="1.0.0",
-    docs_url="/docs",
-    redoc_url="/redoc"
+    default_response_class=ORJSONResponse,
+    docs_url="/docs" if ENABLE_DOCS else None,
+    redoc_url="/redoc" if ENABLE_DOCS else None,
+    openapi_url="/openapi.json" if ENABLE_DOCS else None
 )
 
 # Configure CORS
@@ -31,36 +83,94 @@ app.add_middleware(
 )
 
 
+# Worker threads available to run_in_threadpool / sync endpoints; each
+# in-flight query holds one while it waits on DeepSeek or PostGIS
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "64"))
+
+# Number of pooled connections to open at startup so the first requests
+# don't pay connect/auth latency (capped at the pool size)
+POOL_WARM_SIZE = int(os.getenv("DB_POOL_WARM", "5"))
+
+
+async def warm_connection_pool():
+    """Open POOL_WARM_SIZE connections in parallel and return them to the pool"""
+    from app.utils.database import db_manager
+
+    size = min(POOL_WARM_SIZE, db_manager.engine.pool.size())
+    if size <= 0:
+        return
+
+    connections = await asyncio.gather(
+        *[asyncio.to_thread(db_manager.engine.connect) for _ in range(size)],
+        return_exceptions=True
+    )
+    warmed = 0
+    for conn in connections:
+        if isinstance(conn, Exception):
+            continue
+        conn.close()
+        warmed += 1
+    logger.info(f"✅ Warmed {warmed}/{size} pooled database connections")
+
+
+async def run_auto_discovery():
+    """Discover undocumented tables in a worker thread and signal completion"""
+    try:
+        from app.utils.auto_discovery import auto_discovery
+
+        result = await asyncio.to_thread(auto_discovery.auto_discover_and_update)
+        if result.get("new_tables_found", 0) > 0:
+            logger.info(f"Auto-discovery added {result['new_tables_found']} new table(s)")
+        else:
+            logger.info("Auto-discovery complete: all tables are already documented")
+    except Exception as e:
+        logger.error(f"Auto-discovery failed: {e}")
+    finally:
+        app.state.discovery_ready.set()
+
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database connection and auto-discover new tables on startup"""
-    print("🚀 Starting Cognitive Geospatial Assistant API...")
-    print("📊 Initializing database connection...")
+    """Initialize database connection and start table auto-discovery in the background"""
+    logger.info("🚀 Starting Cognitive Geospatial Assistant API...")
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    # Set once auto-discovery has finished (or was skipped); await it before
+    # relying on freshly generated table descriptions
+    app.state.discovery_ready = asyncio.Event()
+    logger.info("📊 Initializing database connection...")
 
     try:
+        from app.utils.database import db_manager
+
         db_manager.initialize()
-        if db_manager.test_connection():
-            print("✅ Database connection successful")
-            
-            # Auto-discover new tables and generate descriptions
-            print("🔍 Auto-discovering tables...")
-            result = auto_discovery.auto_discover_and_update()
-            if result.get("new_tables_found", 0) > 0:
-                print(f"✅ Found and added {result['new_tables_found']} new table(s)")
-            else:
-                print("✅ All tables are already documented")
-        else:
-            print("⚠️  Database connection failed - some features may not work")
+        if await asyncio.to_thread(db_manager.test_connection):
+            logger.info("✅ Database connection successful")
+            await warm_connection_pool()
+
+            # Auto-discover new tables off the startup critical path; LLM
+            # description generation can take seconds per table
+            logger.info("🔍 Auto-discovering tables in the background...")
+            app.state.discovery_task = asyncio.create_task(run_auto_discovery())
+            return
+
+        logger.warning("⚠️  Database connection failed - some features may not work")
     except Exception as e:
-        print(f"❌ Database initialization error: {e}")
+        logger.error(f"❌ Database initialization error: {e}")
+
+    app.state.discovery_ready.set()
 
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
-    print("👋 Shutting down Cognitive Geospatial Assistant API...")
+    logger.info("👋 Shutting down Cognitive Geospatial Assistant API...")
+    # Release the raster routes' cached GDAL dataset handles, if any raster
+    # request loaded the module
+    raster_operations = sys.modules.get("app.utils.raster_operations")
+    if raster_operations is not None:
+        raster_operations.close_datasets()
 
 
 # Include routers
@@ -68,57 +178,83 @@ app.include_router(query_router)
 app.include_router(raster_router)  # NDVI, terrain, land cover endpoints
 
 
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles with Cache-Control headers.
+
+    Starlette already emits an mtime/size based ETag and answers
+    If-None-Match with 304; this adds freshness lifetimes so browsers
+    skip revalidation entirely for content-hashed assets.
+    """
+
+    HASHED_ASSET = re.compile(r"\.[0-9a-f]{8,}\.[A-Za-z0-9]+$")
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        name = os.path.basename(full_path)
+        if self.HASHED_ASSET.search(name):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        elif name.endswith(".html"):
+            response.headers["Cache-Control"] = "public, max-age=60"
+        else:
+            response.headers["Cache-Control"] = "public, max-age=3600"
+        return response
+
+
 # Serve static files (dashboards, assets)
 static_dir = Path(__file__).parent / "static"
 if static_dir.exists():
-    app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
-    print(f"✅ Static files mounted from {static_dir}")
+    app.mount("/static", CachedStaticFiles(directory=str(static_dir), html=True), name="static")
+    logger.info(f"✅ Static files mounted from {static_dir}")
+
+# HTML pages are read once at import and served from memory with an ETag,
+# so repeat visits are answered with 304 Not Modified and no disk I/O
+HTML_CACHE_CONTROL = "public, max-age=300"
+
+
+def load_html_page(path: Path) -> Optional[Tuple[bytes, str]]:
+    """Read an HTML page and return (body, etag), or None if it is missing"""
+    if not path.exists():
+        return None
+    body = path.read_bytes()
+    return body, compute_etag(body)
+
+
+def cached_html_response(request: Request, page: Tuple[bytes, str]) -> Response:
+    """Return the page body, or 304 if the client already has this version"""
+    body, etag = page
+    return etag_response(request, body, etag, "text/html", HTML_CACHE_CONTROL)
+
 
-# Serve frontend if it exists
 frontend_dir = Path(__file__).parent.parent / "frontend"
-if frontend_dir.exists():
-    @app.get("/", response_class=HTMLResponse)
-    async def read_root():
-        """Serve the frontend HTML"""
-        index_path = frontend_dir / "index.html"
-        if index_path.exists():
-            return index_path.read_text()
-        return """
-        <html>
-            <head>
-                <title>Cognitive Geospatial Assistant API</title>
-            </head>
-            <body>
-                <h1>Cognitive Geospatial Assistant API</h1>
-                <p>API is running! Visit <a href="/docs">/docs</a> for API documentation.</p>
-                <p><a href="/static/dashboard.html">📊 Analytics Dashboard</a></p>
-            </body>
-        </html>
-        """
-else:
-    @app.get("/", response_class=HTMLResponse)
-    async def read_root():
-        """Root endpoint"""
-        return """
-        <html>
-            <head>
-                <title>Cognitive Geospatial Assistant API</title>
-            </head>
-            <body>
-                <h1>Cognitive Geospatial Assistant API</h1>
-                <p>API is running! Visit <a href="/docs">/docs</a> for API documentation.</p>
-                <p><a href="/static/dashboard.html">📊 Analytics Dashboard</a></p>
-            </body>
-        </html>
-        """
+index_page = load_html_page(frontend_dir / "index.html")
+dashboard_page = load_html_page(static_dir / "dashboard.html")
+
+
+@app.get("/", response_class=HTMLResponse)
+async def read_root(request: Request):
+    """Serve the frontend HTML"""
+    if index_page:
+        return cached_html_response(request, index_page)
+    return """
+    <html>
+        <head>
+            <title>Cognitive Geospatial Assistant API</title>
+        </head>
+        <body>
+            <h1>Cognitive Geospatial Assistant API</h1>
+            <p>API is running! Visit <a href="/docs">/docs</a> for API documentation.</p>
+            <p><a href="/static/dashboard.html">📊 Analytics Dashboard</a></p>
+        </body>
+    </html>
+    """
 
 
 @app.get("/dashboard", response_class=HTMLResponse)
-async def get_dashboard():
+async def get_dashboard(request: Request):
     """Serve the analytics dashboard"""
-    dashboard_path = Path(__file__).parent / "static" / "dashboard.html"
-    if dashboard_path.exists():
-        return dashboard_path.read_text()
+    if dashboard_page:
+        return cached_html_response(request, dashboard_page)
     return """
     <html>
         <head><title>Dashboard Not Found</title></head>
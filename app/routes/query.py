@@ -1,16 +1,165 @@
+import os
 import time
-from fastapi import APIRouter, HTTPException, status
-from typing import Dict, Any
-from app.models.query_model import NLQuery, QueryResponse, DatasetInfo
-from app.utils.deepseek import parse_geospatial_query, get_available_datasets
-from app.utils.spatial_engine import SpatialEngine
-from app.utils.database import db_manager
+from functools import lru_cache
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+from typing import Dict, Any, Callable, Iterator, List, Optional
+import orjson
+from app.deps import get_spatial_engine
+from app.models.query_model import NLQuery, QueryResponse, DatasetInfo, OperationPlan
+from app.utils.http_cache import compute_etag, etag_response
+from app.utils.query_cache import MemoryCache
 
 router = APIRouter(prefix="/api", tags=["queries"])
 
+# District boundaries and the dataset list only change when data is
+# loaded, so their encoded responses are cached briefly in memory
+CATALOG_CACHE_TTL = 600
+CATALOG_CACHE_CONTROL = f"public, max-age={CATALOG_CACHE_TTL}"
+_catalog_cache = MemoryCache()
+_datasets_adapter = TypeAdapter(List[DatasetInfo])
+
+# Limits for the raw /execute-sql endpoint
+MAX_SQL_ROWS = int(os.getenv("MAX_SQL_ROWS", "10000"))
+SQL_STATEMENT_TIMEOUT = os.getenv("SQL_STATEMENT_TIMEOUT", "10s")
+
+# District FeatureCollection built entirely inside PostGIS so no geometries
+# are materialized in Python; the JSON text is passed through as-is
+DISTRICTS_GEOJSON_SQL = """
+SELECT
+    CASE WHEN count(*) = 0 THEN
+        json_build_object(
+            'type', 'FeatureCollection',
+            'features', '[]'::json,
+            'message', 'No districts found'
+        )
+    ELSE
+        json_build_object(
+            'type', 'FeatureCollection',
+            'features', json_agg(
+                json_build_object(
+                    'type', 'Feature',
+                    'id', id,
+                    'properties', json_build_object(
+                        'id', id,
+                        'name', name,
+                        'bezirk', bezirk,
+                        'oteil', oteil,
+                        'area_ha', area_ha
+                    ),
+                    'geometry', ST_AsGeoJSON(geometry)::json
+                )
+                ORDER BY bezirk, name
+            )
+        )
+    END::text AS feature_collection
+FROM vector.berlin_districts
+"""
+
+
+# Handlers below are async, so every blocking call (LLM request, PostGIS
+# query, GeoPandas work) goes through run_in_threadpool to keep the event
+# loop free for other requests.
+
+# ==================== Lazy Dependencies ====================
+# The engine, LLM client and database modules pull in geopandas/GDAL,
+# psycopg and requests. Import them on first use so worker cold starts
+# (and lightweight endpoints) don't pay for them.
+
+@lru_cache(maxsize=1)
+def _get_query_parser() -> Callable:
+    """Import and return the DeepSeek query parser"""
+    from app.utils.deepseek import parse_geospatial_query
+    return parse_geospatial_query
+
+
+@lru_cache(maxsize=1)
+def _get_dataset_lister() -> Callable:
+    """Import and return the dataset catalog lister"""
+    from app.utils.deepseek import get_available_datasets
+    return get_available_datasets
+
+
+@lru_cache(maxsize=1)
+def _get_db_manager():
+    """Import and return the global DatabaseManager"""
+    from app.utils.database import db_manager
+    return db_manager
+
+
+def _build_response(
+    request: NLQuery,
+    result: Dict[str, Any],
+    operation_plan: Optional[OperationPlan],
+    start_time: float,
+    default_result_type: str,
+    default_data: Any
+) -> Response:
+    """
+    Build and serialize the QueryResponse shared by /query and /query-stats.
+
+    The response is serialized once, directly to JSON bytes, with unset
+    (None) fields omitted. The routes declare QueryResponse only in their
+    OpenAPI `responses`, not as response_model, so FastAPI never
+    re-validates the (potentially large) GeoJSON payload.
+
+    Args:
+        request: Original natural language query
+        result: Executor result dictionary
+        operation_plan: OperationPlan produced by DeepSeek
+        start_time: perf_counter() value taken when the request started
+        default_result_type: result_type to use if the executor omits it
+        default_data: data to use if the executor omits it
+
+    Returns:
+        JSON response containing the serialized QueryResponse
+    """
+    execution_time = time.perf_counter() - start_time
+
+    # Check if execution was successful
+    if not result.get("success", False):
+        response = QueryResponse(
+            success=False,
+            query=request.question,
+            result_type="error",
+            data={},
+            error=result.get("error", "Unknown error occurred"),
+            execution_time=execution_time
+        )
+    else:
+        # Extract layer name, operations, reasoning, and datasets from operation plan
+        plan = operation_plan.model_dump(
+            mode="json",
+            include={"layer_name", "operations", "reasoning", "datasets_required"}
+        ) if operation_plan else {}
+
+        response = QueryResponse(
+            success=True,
+            query=request.question,
+            result_type=result.get("result_type", default_result_type),
+            data=result.get("data", default_data),
+            layer_name=plan.get("layer_name"),
+            metadata=result.get("metadata"),
+            operations=plan.get("operations"),
+            reasoning=plan.get("reasoning"),
+            datasets_used=plan.get("datasets_required"),
+            execution_time=execution_time
+        )
+
+    return Response(
+        content=response.model_dump_json(exclude_none=True),
+        media_type="application/json"
+    )
+
 
-@router.post("/query", response_model=QueryResponse)
-async def geospatial_query(request: NLQuery) -> QueryResponse:
+@router.post("/query", responses={200: {"model": QueryResponse}})
+async def geospatial_query(
+    request: NLQuery,
+    parse_geospatial_query: Callable = Depends(_get_query_parser),
+    engine=Depends(get_spatial_engine)
+) -> Response:
     """
     Process a natural language geospatial query.
 
@@ -25,72 +174,38 @@ async def geospatial_query(request: NLQuery) -> QueryResponse:
             "question": "Find hospitals within 2 km of flood zones in Berlin"
         }
     """
-    start_time = time.time()
+    start_time = time.perf_counter()
 
     try:
         # Parse the query using DeepSeek
-        operation_plan = parse_geospatial_query(
+        operation_plan = await run_in_threadpool(
+            parse_geospatial_query,
             question=request.question,
             context=request.context,
             user_location=request.user_location
         )
 
         # Execute the operation plan
-        engine = SpatialEngine()
-        result = engine.execute_plan(operation_plan)
-
-        # Calculate execution time
-        execution_time = time.time() - start_time
-
-        # Check if execution was successful
-        if not result.get("success", False):
-            return QueryResponse(
-                success=False,
-                query=request.question,
-                result_type="error",
-                data={},
-                error=result.get("error", "Unknown error occurred"),
-                execution_time=execution_time
-            )
+        result = await run_in_threadpool(engine.execute_plan, operation_plan)
 
-        # Extract layer name, operations, reasoning, and datasets from operation plan
-        layer_name = operation_plan.layer_name if operation_plan else None
-        # Convert operations to list of dicts for JSON serialization
-        operations = [
-            {
-                "operation": op.operation,
-                "parameters": op.parameters,
-                "description": op.description
-            }
-            for op in (operation_plan.operations or [])
-        ] if operation_plan else None
-        reasoning = operation_plan.reasoning if operation_plan else None
-        datasets_used = operation_plan.datasets_required if operation_plan else None
-
-        # Return successful response
-        return QueryResponse(
-            success=True,
-            query=request.question,
-            result_type=result.get("result_type", "geojson"),
-            data=result.get("data", {}),
-            layer_name=layer_name,
-            metadata=result.get("metadata"),
-            operations=operations,
-            reasoning=reasoning,
-            datasets_used=datasets_used,
-            execution_time=execution_time
+        return _build_response(
+            request, result, operation_plan, start_time,
+            default_result_type="geojson", default_data={}
         )
 
     except Exception as e:
-        execution_time = time.time() - start_time
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Query processing failed: {str(e)}"
         )
 
 
-@router.post("/query-stats", response_model=QueryResponse)
-async def geospatial_stats_query(request: NLQuery) -> QueryResponse:
+@router.post("/query-stats", responses={200: {"model": QueryResponse}})
+async def geospatial_stats_query(
+    request: NLQuery,
+    parse_geospatial_query: Callable = Depends(_get_query_parser),
+    engine=Depends(get_spatial_engine)
+) -> Response:
     """
     Process a natural language statistical/aggregation query.
 
@@ -108,11 +223,12 @@ async def geospatial_stats_query(request: NLQuery) -> QueryResponse:
             "question": "Compare bank density and restaurant density in Mitte versus Charlottenburg-Wilmersdorf"
         }
     """
-    start_time = time.time()
+    start_time = time.perf_counter()
 
     try:
         # Parse the query using DeepSeek
-        operation_plan = parse_geospatial_query(
+        operation_plan = await run_in_threadpool(
+            parse_geospatial_query,
             question=request.question,
             context=request.context,
             user_location=request.user_location,
@@ -120,53 +236,14 @@ async def geospatial_stats_query(request: NLQuery) -> QueryResponse:
         )
 
         # Execute the operation plan with stats executor
-        engine = SpatialEngine()
-        result = engine.execute_stats_plan(operation_plan)
-
-        # Calculate execution time
-        execution_time = time.time() - start_time
-
-        # Check if execution was successful
-        if not result.get("success", False):
-            return QueryResponse(
-                success=False,
-                query=request.question,
-                result_type="error",
-                data={},
-                error=result.get("error", "Unknown error occurred"),
-                execution_time=execution_time
-            )
+        result = await run_in_threadpool(engine.execute_stats_plan, operation_plan)
 
-        # Extract layer name, operations, reasoning, and datasets from operation plan
-        layer_name = operation_plan.layer_name if operation_plan else None
-        # Convert operations to list of dicts for JSON serialization
-        operations = [
-            {
-                "operation": op.operation,
-                "parameters": op.parameters,
-                "description": op.description
-            }
-            for op in (operation_plan.operations or [])
-        ] if operation_plan else None
-        reasoning = operation_plan.reasoning if operation_plan else None
-        datasets_used = operation_plan.datasets_required if operation_plan else None
-
-        # Return successful response
-        return QueryResponse(
-            success=True,
-            query=request.question,
-            result_type=result.get("result_type", "table"),
-            data=result.get("data", []),
-            layer_name=layer_name,
-            metadata=result.get("metadata"),
-            operations=operations,
-            reasoning=reasoning,
-            datasets_used=datasets_used,
-            execution_time=execution_time
+        return _build_response(
+            request, result, operation_plan, start_time,
+            default_result_type="table", default_data=[]
         )
 
     except Exception as e:
-        execution_time = time.time() - start_time
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Query processing failed: {str(e)}"
@@ -174,7 +251,10 @@ async def geospatial_stats_query(request: NLQuery) -> QueryResponse:
 
 
 @router.get("/datasets", response_model=list[DatasetInfo])
-async def list_datasets():
+async def list_datasets(
+    request: Request,
+    get_available_datasets: Callable = Depends(_get_dataset_lister)
+):
     """
     List all available datasets.
 
@@ -182,8 +262,19 @@ async def list_datasets():
     that can be queried.
     """
     try:
-        datasets = get_available_datasets()
-        return [DatasetInfo(**ds) for ds in datasets]
+        cached = _catalog_cache.get("datasets")
+        if cached is None:
+            datasets = _datasets_adapter.validate_python(
+                await run_in_threadpool(get_available_datasets)
+            )
+            body = _datasets_adapter.dump_json(datasets)
+            cached = {"body": body, "etag": compute_etag(body)}
+            _catalog_cache.set("datasets", cached, ttl=CATALOG_CACHE_TTL)
+
+        return etag_response(
+            request, cached["body"], cached["etag"],
+            "application/json", CATALOG_CACHE_CONTROL
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -192,14 +283,14 @@ async def list_datasets():
 
 
 @router.get("/health")
-async def health_check() -> Dict[str, Any]:
+async def health_check(db_manager=Depends(_get_db_manager)) -> Dict[str, Any]:
     """
     Check API and database health.
 
     Returns:
         Status of API and database connection
     """
-    db_status = db_manager.test_connection()
+    db_status = await run_in_threadpool(db_manager.test_connection)
 
     return {
         "status": "healthy" if db_status else "degraded",
@@ -208,47 +299,75 @@ async def health_check() -> Dict[str, Any]:
     }
 
 
+def _sql_result_body(first_feature: Optional[str], features: Iterator[str]) -> Iterator[bytes]:
+    """Assemble the /execute-sql JSON envelope around streamed Feature strings"""
+    head = b'{"success":true,"data":{"type":"FeatureCollection","features":['
+    if first_feature is None:
+        yield head + b']},"metadata":' + orjson.dumps({"count": 0, "max_rows": MAX_SQL_ROWS}) + b"}"
+        return
+
+    count = 1
+    batch = [first_feature]
+    yield head
+    for feature in features:
+        batch.append(feature)
+        count += 1
+        if len(batch) >= 1000:
+            yield ",".join(batch).encode()
+            batch = [""]  # leading separator for the next batch
+    yield ",".join(batch).encode()
+    yield b']},"metadata":' + orjson.dumps({"count": count, "max_rows": MAX_SQL_ROWS}) + b"}"
+
+
 @router.post("/execute-sql")
-async def execute_sql_query(query: Dict[str, str]) -> Dict[str, Any]:
+async def execute_sql_query(
+    query: Dict[str, str],
+    db_manager=Depends(_get_db_manager)
+) -> StreamingResponse:
     """
     Execute a raw SQL query (for advanced users).
 
-    This is a power-user feature for direct PostGIS queries.
+    This is a power-user feature for direct PostGIS queries. The query must
+    be a single statement and runs on a read-only connection with a
+    statement timeout, and at most
+    MAX_SQL_ROWS features are returned (streamed as they are read).
 
     Body:
         {
             "sql": "SELECT * FROM geo.hospitals LIMIT 10"
         }
     """
-    try:
-        sql = query.get("sql")
-        if not sql:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="SQL query is required"
-            )
-
-        # Execute the query
-        result_gdf = db_manager.execute_spatial_query(sql)
-
-        # Convert to GeoJSON
-        geojson = result_gdf.__geo_interface__
+    sql = query.get("sql")
+    if not sql:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="SQL query is required"
+        )
 
-        return {
-            "success": True,
-            "data": geojson,
-            "metadata": {"count": len(result_gdf)}
-        }
+    try:
+        features = db_manager.stream_geojson_features(
+            sql, max_rows=MAX_SQL_ROWS, statement_timeout=SQL_STATEMENT_TIMEOUT
+        )
+        # Pull the first feature before responding so SQL errors still
+        # surface as a 500 instead of a truncated stream
+        first_feature = await run_in_threadpool(next, features, None)
 
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"SQL execution failed: {str(e)}"
         )
 
+    return StreamingResponse(
+        _sql_result_body(first_feature, features),
+        media_type="application/json"
+    )
+
 
 @router.get("/districts-geojson")
-async def get_districts_geojson():
+async def get_districts_geojson(request: Request, db_manager=Depends(_get_db_manager)):
     """
     Return Berlin district boundaries as GeoJSON for visualization.
 
@@ -259,32 +378,23 @@ async def get_districts_geojson():
         GeoJSON FeatureCollection with district geometries and properties
     """
     try:
-        # Query district boundaries
-        query = """
-        SELECT
-            id,
-            name,
-            bezirk,
-            oteil,
-            area_ha,
-            geometry
-        FROM vector.berlin_districts
-        ORDER BY bezirk, name
-        """
-
-        gdf = db_manager.execute_spatial_query(query)
-
-        if len(gdf) == 0:
-            return {
-                "type": "FeatureCollection",
-                "features": [],
-                "message": "No districts found"
-            }
-
-        # Convert to GeoJSON
-        geojson = gdf.__geo_interface__
-
-        return geojson
+        cached = _catalog_cache.get("districts_geojson")
+        if cached is not None:
+            return etag_response(
+                request, cached["body"], cached["etag"],
+                "application/geo+json", CATALOG_CACHE_CONTROL
+            )
+
+        body = (await run_in_threadpool(
+            db_manager.fetch_prepared_scalar, "districts_geojson", DISTRICTS_GEOJSON_SQL
+        )).encode()
+        cached = {"body": body, "etag": compute_etag(body)}
+        _catalog_cache.set("districts_geojson", cached, ttl=CATALOG_CACHE_TTL)
+
+        return etag_response(
+            request, body, cached["etag"],
+            "application/geo+json", CATALOG_CACHE_CONTROL
+        )
 
     except Exception as e:
         raise HTTPException(
@@ -3,63 +3,140 @@ Raster Operations API Endpoints
 Handles NDVI analysis, terrain processing, land cover classification
 """
 
-from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict, Any
 from pathlib import Path
+from functools import lru_cache
+import asyncio
 import logging
+import orjson
 
-from app.utils.spatial_engine import SpatialEngine
-from app.utils.raster_operations import RasterOperations
+from app.deps import get_spatial_engine
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/raster", tags=["raster"])
 
-# Initialize engines
-spatial_engine = SpatialEngine(data_dir="./data")
-raster_ops = RasterOperations()
+@lru_cache(maxsize=1024)
+def _resolve(rel: str) -> Path:
+    """Absolute path of an existing file under data/, interned per request string"""
+    return (get_spatial_engine().data_dir / rel).resolve(strict=True)
+
+
+def resolve_data_path(rel: str) -> str:
+    """
+    Resolve a request path against data/, raising 404 if it doesn't exist
+
+    Successful lookups are cached (misses are not), so repeat requests for
+    the same datasets skip resolving the path. A cached path is still
+    stat'ed: if the dataset was deleted or renamed since, the cache is
+    cleared and the path resolved again, giving a 404 rather than a 500
+    from rasterio.
+    """
+    try:
+        path = _resolve(rel)
+        if not path.exists():
+            _resolve.cache_clear()
+            path = _resolve(rel)
+        return str(path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail=f"File not found: {rel}")
+
+
+async def run_raster_operation(engine, operation: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a raster operation in a worker thread so the event loop stays free"""
+    return await asyncio.to_thread(engine.execute_raster_operation, operation)
+
+
+async def prefetch_ndvi(engine, ndvi_t1: str, ndvi_t2: str) -> None:
+    """Decode both NDVI rasters concurrently before change detection reads them"""
+    # Imported here so loading the router doesn't pull in rasterio/geopandas
+    from app.utils.raster_operations import prefetch_band
+
+    await asyncio.gather(
+        asyncio.to_thread(prefetch_band, engine.data_dir / ndvi_t1),
+        asyncio.to_thread(prefetch_band, engine.data_dir / ndvi_t2)
+    )
+
+
+CATALOG_PATH = Path("data/metadata/catalog.json")
+
+# Parsed raster catalog, reloaded only when catalog.json's mtime changes
+_catalog: Optional[Dict[str, Any]] = None
+
+
+def _get_catalog() -> Optional[Dict[str, Any]]:
+    """
+    Return the raster catalog as {'mtime_ns', 'rasters', 'by_id'}, or None
+    if catalog.json is missing
+    """
+    global _catalog
+
+    try:
+        mtime_ns = CATALOG_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    if _catalog is None or _catalog['mtime_ns'] != mtime_ns:
+        rasters = orjson.loads(CATALOG_PATH.read_bytes()).get('datasets', {}).get('raster', [])
+        by_id = {}
+        for raster in rasters:
+            # First entry wins for duplicate ids, as with a linear scan
+            by_id.setdefault(raster.get('id'), raster)
+        _catalog = {'mtime_ns': mtime_ns, 'rasters': rasters, 'by_id': by_id}
+
+    return _catalog
 
 
 # ==================== Request Models ====================
 
+NDVI_CHANGE_EXAMPLE = {
+    "example": {
+        "ndvi_t1": "raster/ndvi_timeseries/berlin_ndvi_2018.tif",
+        "ndvi_t2": "raster/ndvi_timeseries/berlin_ndvi_2024.tif",
+        "threshold": -0.2,
+        "mask_vector": "vector/osm/berlin_residential.geojson"
+    }
+}
+
+ZONAL_STATS_EXAMPLE = {
+    "example": {
+        "raster": "raster/ndvi_timeseries/berlin_ndvi_2024.tif",
+        "vector": "vector/osm/berlin_parks.geojson",
+        "stats": ["mean", "min", "max", "std"]
+    }
+}
+
+# Request bodies are read-only once validated; unknown fields are rejected
+# rather than silently dropped
+REQUEST_MODEL_CONFIG = ConfigDict(frozen=True, extra='forbid')
+
+
 class NDVIChangeRequest(BaseModel):
     """Request model for NDVI change detection"""
+    model_config = ConfigDict(**REQUEST_MODEL_CONFIG, json_schema_extra=NDVI_CHANGE_EXAMPLE)
+
     ndvi_t1: str = Field(..., description="Path to earlier NDVI raster (relative to data/)")
     ndvi_t2: str = Field(..., description="Path to later NDVI raster (relative to data/)")
     threshold: float = Field(-0.2, description="Loss threshold (negative for loss)")
     mask_vector: Optional[str] = Field(None, description="Optional vector mask (e.g., residential areas)")
 
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "ndvi_t1": "raster/ndvi_timeseries/berlin_ndvi_2018.tif",
-                "ndvi_t2": "raster/ndvi_timeseries/berlin_ndvi_2024.tif",
-                "threshold": -0.2,
-                "mask_vector": "vector/osm/berlin_residential.geojson"
-            }
-        }
-
 
 class ZonalStatsRequest(BaseModel):
     """Request model for zonal statistics"""
+    model_config = ConfigDict(**REQUEST_MODEL_CONFIG, json_schema_extra=ZONAL_STATS_EXAMPLE)
+
     raster: str = Field(..., description="Path to raster file")
     vector: str = Field(..., description="Path to vector polygons")
     stats: List[str] = Field(['mean', 'min', 'max'], description="Statistics to compute")
     categorical: bool = Field(False, description="Compute categorical stats (for land cover)")
 
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "raster": "raster/ndvi_timeseries/berlin_ndvi_2024.tif",
-                "vector": "vector/osm/berlin_parks.geojson",
-                "stats": ["mean", "min", "max", "std"]
-            }
-        }
-
 
 class ClipRasterRequest(BaseModel):
     """Request model for clipping raster by vector"""
+    model_config = REQUEST_MODEL_CONFIG
+
     raster: str = Field(..., description="Path to input raster")
     vector: str = Field(..., description="Path to vector polygon for clipping")
     output: Optional[str] = Field(None, description="Output path for clipped raster")
@@ -67,6 +144,8 @@ class ClipRasterRequest(BaseModel):
 
 class VectorizeRasterRequest(BaseModel):
     """Request model for raster to vector conversion"""
+    model_config = REQUEST_MODEL_CONFIG
+
     raster: str = Field(..., description="Path to input raster")
     threshold: Optional[float] = Field(None, description="Threshold value")
     operator: str = Field('greater', description="Threshold operator: greater, less, equal")
@@ -75,7 +154,10 @@ class VectorizeRasterRequest(BaseModel):
 # ==================== NDVI Endpoints ====================
 
 @router.post("/ndvi/change-detection")
-async def ndvi_change_detection(request: NDVIChangeRequest) -> Dict[str, Any]:
+async def ndvi_change_detection(
+    request: NDVIChangeRequest,
+    engine=Depends(get_spatial_engine)
+) -> Dict[str, Any]:
     """
     Detect vegetation change between two time periods using NDVI
 
@@ -103,6 +185,10 @@ async def ndvi_change_detection(request: NDVIChangeRequest) -> Dict[str, Any]:
     result = response.json()
     ```
     """
+    ndvi_t1 = resolve_data_path(request.ndvi_t1)
+    ndvi_t2 = resolve_data_path(request.ndvi_t2)
+    mask_vector = resolve_data_path(request.mask_vector) if request.mask_vector else None
+
     try:
         logger.info(f"NDVI change detection request: {request.ndvi_t1} → {request.ndvi_t2}")
 
@@ -110,18 +196,19 @@ async def ndvi_change_detection(request: NDVIChangeRequest) -> Dict[str, Any]:
         operation = {
             'type': 'vegetation_loss',
             'params': {
-                'ndvi_t1': request.ndvi_t1,
-                'ndvi_t2': request.ndvi_t2,
+                'ndvi_t1': ndvi_t1,
+                'ndvi_t2': ndvi_t2,
                 'threshold': request.threshold,
             }
         }
 
         # Add mask if provided
-        if request.mask_vector:
-            operation['params']['mask_vector'] = request.mask_vector
+        if mask_vector:
+            operation['params']['mask_vector'] = mask_vector
 
-        # Execute
-        result = spatial_engine.execute_raster_operation(operation)
+        # Read both rasters in parallel, then execute off the event loop
+        await prefetch_ndvi(engine, ndvi_t1, ndvi_t2)
+        result = await run_raster_operation(engine, operation)
 
         if result.get('success'):
             logger.info(f"Found {result['metadata']['count']} vegetation loss areas")
@@ -135,7 +222,10 @@ async def ndvi_change_detection(request: NDVIChangeRequest) -> Dict[str, Any]:
 
 
 @router.post("/ndvi/zonal-stats")
-async def ndvi_zonal_statistics(request: ZonalStatsRequest) -> Dict[str, Any]:
+async def ndvi_zonal_statistics(
+    request: ZonalStatsRequest,
+    engine=Depends(get_spatial_engine)
+) -> Dict[str, Any]:
     """
     Compute NDVI statistics per polygon (zonal statistics)
 
@@ -158,19 +248,22 @@ async def ndvi_zonal_statistics(request: ZonalStatsRequest) -> Dict[str, Any]:
     )
     ```
     """
+    raster = resolve_data_path(request.raster)
+    vector = resolve_data_path(request.vector)
+
     try:
         logger.info(f"Zonal stats request: {request.raster} x {request.vector}")
 
         operation = {
             'type': 'zonal_stats',
             'params': {
-                'raster': request.raster,
-                'vector': request.vector,
+                'raster': raster,
+                'vector': vector,
                 'stats': request.stats
             }
         }
 
-        result = spatial_engine.execute_raster_operation(operation)
+        result = await run_raster_operation(engine, operation)
 
         if result.get('success'):
             logger.info(f"Computed zonal stats for {result['metadata']['count']} polygons")
@@ -216,7 +309,10 @@ async def ndvi_timeseries(
 # ==================== General Raster Operations ====================
 
 @router.post("/clip")
-async def clip_raster(request: ClipRasterRequest) -> Dict[str, Any]:
+async def clip_raster(
+    request: ClipRasterRequest,
+    engine=Depends(get_spatial_engine)
+) -> Dict[str, Any]:
     """
     Clip raster by vector polygon
 
@@ -226,19 +322,23 @@ async def clip_raster(request: ClipRasterRequest) -> Dict[str, Any]:
     - Reducing file size
 
     Returns:
-        Path to clipped raster file
+        Path to clipped raster file (a unique temp/clipped_<id>.tif when
+        no output is given)
     """
+    raster = resolve_data_path(request.raster)
+    vector = resolve_data_path(request.vector)
+
     try:
         operation = {
             'type': 'clip_raster',
             'params': {
-                'raster': request.raster,
-                'vector': request.vector,
-                'output': request.output or 'temp/clipped.tif'
+                'raster': raster,
+                'vector': vector,
+                'output': request.output
             }
         }
 
-        result = spatial_engine.execute_raster_operation(operation)
+        result = await run_raster_operation(engine, operation)
         return result
 
     except Exception as e:
@@ -247,7 +347,10 @@ async def clip_raster(request: ClipRasterRequest) -> Dict[str, Any]:
 
 
 @router.post("/vectorize")
-async def vectorize_raster(request: VectorizeRasterRequest) -> Dict[str, Any]:
+async def vectorize_raster(
+    request: VectorizeRasterRequest,
+    engine=Depends(get_spatial_engine)
+) -> Dict[str, Any]:
     """
     Convert raster to vector polygons
 
@@ -269,17 +372,19 @@ async def vectorize_raster(request: VectorizeRasterRequest) -> Dict[str, Any]:
     )
     ```
     """
+    raster = resolve_data_path(request.raster)
+
     try:
         operation = {
             'type': 'vectorize_raster',
             'params': {
-                'raster': request.raster,
+                'raster': raster,
                 'threshold': request.threshold,
                 'operator': request.operator
             }
         }
 
-        result = spatial_engine.execute_raster_operation(operation)
+        result = await run_raster_operation(engine, operation)
         return result
 
     except Exception as e:
@@ -296,21 +401,16 @@ async def list_rasters() -> Dict[str, Any]:
 
     Returns catalog of NDVI, DEM, land cover, and other raster data
     """
-    import json
-
-    catalog_path = Path("data/metadata/catalog.json")
+    # A catalog.json change means a file read and parse; keep it off the loop
+    catalog = await asyncio.to_thread(_get_catalog)
 
-    if not catalog_path.exists():
+    if catalog is None:
         return {
             "success": False,
             "error": "Catalog not found"
         }
 
-    with open(catalog_path) as f:
-        catalog = json.load(f)
-
-    # Filter raster datasets
-    rasters = catalog.get('datasets', {}).get('raster', [])
+    rasters = catalog['rasters']
 
     return {
         "success": True,
@@ -330,25 +430,18 @@ async def raster_info(dataset_id: str) -> Dict[str, Any]:
     Returns:
         Metadata including resolution, extent, bands, etc.
     """
-    import json
-
-    catalog_path = Path("data/metadata/catalog.json")
+    # A catalog.json change means a file read and parse; keep it off the loop
+    catalog = await asyncio.to_thread(_get_catalog)
 
-    if not catalog_path.exists():
+    if catalog is None:
         raise HTTPException(status_code=404, detail="Catalog not found")
 
-    with open(catalog_path) as f:
-        catalog = json.load(f)
-
-    # Search for dataset
-    rasters = catalog.get('datasets', {}).get('raster', [])
-
-    for raster in rasters:
-        if raster.get('id') == dataset_id:
-            return {
-                "success": True,
-                "dataset": raster
-            }
+    raster = catalog['by_id'].get(dataset_id)
+    if raster is not None:
+        return {
+            "success": True,
+            "dataset": raster
+        }
 
     raise HTTPException(status_code=404, detail=f"Dataset '{dataset_id}' not found")
 
@@ -370,7 +463,8 @@ async def analyze_urban_vegetation_loss(
     region: str = Query(..., description="Region name (e.g., 'berlin')"),
     year_start: int = Query(2018, description="Start year"),
     year_end: int = Query(2024, description="End year"),
-    threshold: float = Query(-0.2, description="Loss threshold")
+    threshold: float = Query(-0.2, description="Loss threshold"),
+    engine=Depends(get_spatial_engine)
 ) -> Dict[str, Any]:
     """
     Complex analysis: Urban vegetation loss
@@ -395,6 +489,7 @@ async def analyze_urban_vegetation_loss(
         urban_mask = f"vector/urban_areas_{region}.geojson"
 
         # Execute NDVI change detection
+        await prefetch_ndvi(engine, ndvi_t1, ndvi_t2)
         operation = {
             'type': 'vegetation_loss',
             'params': {
@@ -405,7 +500,7 @@ async def analyze_urban_vegetation_loss(
             }
         }
 
-        result = spatial_engine.execute_raster_operation(operation)
+        result = await run_raster_operation(engine, operation)
 
         if result.get('success'):
             # Add analysis metadata
@@ -1,4 +1,13 @@
-from .deepseek import query_deepseek, parse_geospatial_query
-from .spatial_engine import SpatialEngine
-
 __all__ = ["query_deepseek", "parse_geospatial_query", "SpatialEngine"]
+
+
+def __getattr__(name):
+    # Resolve exports lazily so importing a single submodule (e.g.
+    # app.utils.database) doesn't drag in the engine and LLM client.
+    if name in ("query_deepseek", "parse_geospatial_query"):
+        from . import deepseek
+        return getattr(deepseek, name)
+    if name == "SpatialEngine":
+        from .spatial_engine import SpatialEngine
+        return SpatialEngine
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -5,13 +5,53 @@ Automatically discovers new tables added to the database and generates
 descriptions using the LLM (DeepSeek).
 """
 
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional, Tuple
 from app.utils.database import db_manager
 from app.utils.schema_discovery import schema_discovery
+from dotenv import load_dotenv
+from functools import lru_cache
+import asyncio
+import hashlib
+import importlib.util
 import json
+import os
 from pathlib import Path
 import re
 
+import httpx
+import orjson
+from diskcache import Cache
+
+DEEPSEEK_URL = "https://api.deepseek.com/v1/chat/completions"
+LLM_TIMEOUT = 15
+
+# LLM descriptions persisted across runs, keyed by table structure
+DESCRIPTION_CACHE_DIR = Path(__file__).parent.parent.parent / "data" / "cache" / "descriptions"
+DESCRIPTION_CACHE_TTL = 30 * 24 * 3600  # 30 days
+
+# Table name → display name: drop source/region prefixes, underscores to spaces
+_TABLE_PREFIX_RE = re.compile(r"osm_|berlin_")
+_UNDERSCORE_TO_SPACE = str.maketrans("_", " ")
+
+# HTTP/2 multiplexes the concurrent description requests over one
+# connection; httpx needs the optional h2 package for it
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+@lru_cache(maxsize=1)
+def _description_cache() -> Cache:
+    return Cache(str(DESCRIPTION_CACHE_DIR))
+
+
+def _description_key(table_name: str, structure: Dict[str, Any]) -> str:
+    """Cache key that changes whenever the table's columns or geometry type do"""
+    fingerprint = json.dumps({
+        "t": table_name,
+        "c": sorted(structure.get("columns", [])),
+        "g": structure.get("geometry_type", "UNKNOWN")
+    })
+    return hashlib.sha256(fingerprint.encode()).hexdigest()
+
 
 class AutoTableDiscovery:
     """Automatically discover new tables and generate descriptions"""
@@ -30,11 +70,12 @@ class AutoTableDiscovery:
             # Get all tables from database
             all_tables = db_manager.get_available_tables(schema="vector")
             
-            # Get existing descriptions
-            existing_descriptions = schema_discovery.get_all_descriptions()
+            # Described table names; a dict keys view, so each membership
+            # test below is a hash lookup rather than a scan
+            described = schema_discovery.get_all_descriptions().keys()
             
             # Find new tables (in database but not in descriptions)
-            new_tables = [t for t in all_tables if t not in existing_descriptions]
+            new_tables = [t for t in all_tables if t not in described]
             
             return new_tables
         except Exception as e:
@@ -83,8 +124,7 @@ class AutoTableDiscovery:
         # berlin_districts → Berlin district boundaries
         # vegetation_ndvi → Vegetation index data
         
-        name = table_name.replace("osm_", "").replace("berlin_", "").replace("_", " ")
-        name = name.title()
+        name = _TABLE_PREFIX_RE.sub("", table_name).translate(_UNDERSCORE_TO_SPACE).title()
         
         geom_type = structure.get("geometry_type", "UNKNOWN")
         row_count = structure.get("row_count", 0)
@@ -119,20 +159,76 @@ class AutoTableDiscovery:
         Returns:
             LLM-generated description string
         """
-        try:
-            import requests
-            import os
-            from dotenv import load_dotenv
-            
-            load_dotenv()
-            DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
-            DEEPSEEK_MODEL = os.getenv("DEEPSEEK_MODEL", "deepseek-chat")
-            DEEPSEEK_URL = "https://api.deepseek.com/v1/chat/completions"
-            
-            if not DEEPSEEK_API_KEY:
-                print("Warning: DEEPSEEK_API_KEY not found, using structural generation")
-                return AutoTableDiscovery.generate_description_from_structure(table_name, structure)
+        return asyncio.run(AutoTableDiscovery.generate_descriptions([(table_name, structure)]))[0]
+
+    @staticmethod
+    async def generate_descriptions(tables: List[Tuple[str, Dict[str, Any]]]) -> List[str]:
+        """
+        Generate descriptions for several tables with concurrent DeepSeek
+        requests over one pooled connection.
+        
+        Args:
+            tables: (table_name, structure) pairs
             
+        Returns:
+            Descriptions in the same order; tables whose request fails get
+            the structural description. Successful LLM descriptions are
+            cached on disk per table structure, so unchanged tables are
+            never sent to the LLM twice.
+        """
+        descriptions: List[Any] = [None] * len(tables)
+
+        # Reuse descriptions generated earlier for the same table structure
+        cache = _description_cache()
+        keys = [_description_key(table_name, structure) for table_name, structure in tables]
+        pending = []
+        for i, key in enumerate(keys):
+            cached = cache.get(key)
+            if cached is not None:
+                descriptions[i] = cached
+            else:
+                pending.append(i)
+
+        load_dotenv()
+        api_key = os.getenv("DEEPSEEK_API_KEY")
+        model = os.getenv("DEEPSEEK_MODEL", "deepseek-chat")
+
+        if pending and not api_key:
+            print("Warning: DEEPSEEK_API_KEY not found, using structural generation")
+        elif pending:
+            async with httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=LLM_TIMEOUT,
+                headers={
+                    "Authorization": f"Bearer {api_key}",
+                    "Content-Type": "application/json"
+                }
+            ) as client:
+                generated = await asyncio.gather(*[
+                    AutoTableDiscovery._gen_llm_desc(client, model, *tables[i])
+                    for i in pending
+                ])
+            for i, description in zip(pending, generated):
+                if description:
+                    descriptions[i] = description
+                    cache.set(keys[i], description, expire=DESCRIPTION_CACHE_TTL)
+
+        # Structural fallback for anything the LLM didn't describe; not cached
+        # so the LLM is asked again next time
+        return [
+            description or AutoTableDiscovery.generate_description_from_structure(table_name, structure)
+            for description, (table_name, structure) in zip(descriptions, tables)
+        ]
+
+    @staticmethod
+    async def _gen_llm_desc(
+        client: httpx.AsyncClient,
+        model: str,
+        table_name: str,
+        structure: Dict[str, Any]
+    ) -> Optional[str]:
+        """Request one table description; None if the request fails"""
+        try:
             # Build prompt for description generation
             columns = structure.get("columns", [])
             geom_type = structure.get("geometry_type", "UNKNOWN")
@@ -154,7 +250,7 @@ Example: "Medical facilities providing hospital services and emergency care"
 Description:"""
 
             payload = {
-                "model": DEEPSEEK_MODEL,
+                "model": model,
                 "messages": [
                     {
                         "role": "user",
@@ -165,15 +261,7 @@ Description:"""
                 "max_tokens": 100
             }
             
-            response = requests.post(
-                DEEPSEEK_URL,
-                headers={
-                    "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json=payload,
-                timeout=15
-            )
+            response = await client.post(DEEPSEEK_URL, json=payload)
             
             if response.status_code == 200:
                 result = response.json()
@@ -183,11 +271,11 @@ Description:"""
                 return description
             else:
                 print(f"Warning: LLM request failed ({response.status_code}), using structural generation")
-                return AutoTableDiscovery.generate_description_from_structure(table_name, structure)
+                return None
                 
         except Exception as e:
             print(f"Warning: LLM description generation failed: {e}, using structural generation")
-            return AutoTableDiscovery.generate_description_from_structure(table_name, structure)
+            return None
 
     @staticmethod
     def auto_discover_and_update() -> Dict[str, Any]:
@@ -219,28 +307,34 @@ Description:"""
         
         # Load existing descriptions
         try:
-            with open(AutoTableDiscovery.DESCRIPTIONS_FILE, 'r') as f:
-                descriptions = json.load(f)
+            with open(AutoTableDiscovery.DESCRIPTIONS_FILE, 'rb') as f:
+                descriptions = orjson.loads(f.read())
         except Exception as e:
             print(f"Warning: Could not load existing descriptions: {e}")
             descriptions = {}
         
-        # Generate descriptions for new tables
-        added_tables = []
+        # Get table structures
+        tables = []
         for table_name in new_tables:
             print(f"\n📊 Processing: {table_name}")
             
-            # Get table structure
             structure = AutoTableDiscovery.get_table_structure(table_name)
             
             if not structure:
                 print(f"  ⚠️  Could not get table structure, skipping")
                 continue
             
-            # Generate description using LLM
-            print(f"  🧠 Generating description with AI...")
-            description = AutoTableDiscovery.generate_description_with_llm(table_name, structure)
-            
+            tables.append((table_name, structure))
+        
+        # Generate all descriptions concurrently using the LLM
+        if tables:
+            print(f"\n🧠 Generating {len(tables)} description(s) with AI...")
+            generated = asyncio.run(AutoTableDiscovery.generate_descriptions(tables))
+        else:
+            generated = []
+        
+        added_tables = []
+        for (table_name, structure), description in zip(tables, generated):
             # Add to descriptions
             descriptions[table_name] = description
             added_tables.append({
@@ -250,16 +344,17 @@ Description:"""
                 "geometry_type": structure.get("geometry_type")
             })
             
-            print(f"  ✅ Description: {description}")
+            print(f"  ✅ {table_name}: {description}")
         
         # Save updated descriptions
         if added_tables:
             try:
                 # Sort descriptions by key for consistency
-                descriptions = dict(sorted(descriptions.items()))
-                
-                with open(AutoTableDiscovery.DESCRIPTIONS_FILE, 'w') as f:
-                    json.dump(descriptions, f, indent=2)
+                with open(AutoTableDiscovery.DESCRIPTIONS_FILE, 'wb') as f:
+                    f.write(orjson.dumps(
+                        descriptions,
+                        option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS
+                    ))
                 
                 print(f"\n✅ Updated {AutoTableDiscovery.DESCRIPTIONS_FILE}")
                 
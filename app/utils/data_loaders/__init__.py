@@ -2,16 +2,30 @@
 Data loaders for various geospatial data sources
 """
 
-from .osm_loader import OSMLoader
-from .sentinel_loader import SentinelLoader
-from .dem_loader import DEMLoader
-from .gadm_loader import GADMLoader
-from .copernicus_loader import CopernicusLoader
+import importlib
 
-__all__ = [
-    'OSMLoader',
-    'SentinelLoader',
-    'DEMLoader',
-    'GADMLoader',
-    'CopernicusLoader'
-]
+# Loader class -> submodule. Loaders pull in heavy optional dependencies
+# (osmnx, rasterio, planetary-computer...), so each is imported on first use.
+_LOADERS = {
+    'OSMLoader': 'osm_loader',
+    'SentinelLoader': 'sentinel_loader',
+    'DEMLoader': 'dem_loader',
+    'GADMLoader': 'gadm_loader',
+    'CopernicusLoader': 'copernicus_loader',
+}
+
+__all__ = list(_LOADERS)
+
+
+def __getattr__(name):
+    if name in _LOADERS:
+        module = importlib.import_module(f'.{_LOADERS[name]}', __package__)
+        value = getattr(module, name)
+        # Cache on the package so later lookups skip __getattr__
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -3,24 +3,59 @@ Copernicus Data Loader (ESA WorldCover, Copernicus DEM, etc.)
 All free and open-source from ESA Copernicus program
 """
 
+import asyncio
 import os
-import requests
+import numpy as np
 import rasterio
 import geopandas as gpd
 from pathlib import Path
-from typing import Optional, Tuple
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
 import logging
 
-logger = logging.getLogger(__name__)
+from .download import DOWNLOAD_WORKERS, USER_AGENT, BaseHTTPLoader, afetch_to_file, range_download
+from .stac import is_downloaded, planetary_computer_href, record_download
 
+logger = logging.getLogger(__name__)
 
-class CopernicusLoader:
+# ESA WorldCover pixel value -> land cover type
+WORLDCOVER_CLASSES: Mapping[int, str] = MappingProxyType({
+    10: "Tree cover",
+    20: "Shrubland",
+    30: "Grassland",
+    40: "Cropland",
+    50: "Built-up",
+    60: "Bare / sparse vegetation",
+    70: "Snow and ice",
+    80: "Permanent water bodies",
+    90: "Herbaceous wetland",
+    95: "Mangroves",
+    100: "Moss and lichen"
+})
+
+# Lookup table for labelling whole uint8 WorldCover arrays in one gather:
+# WORLDCOVER_LUT[array]. Unknown values map to ""
+WORLDCOVER_LUT = np.full(256, "", dtype=f"U{max(map(len, WORLDCOVER_CLASSES.values()))}")
+WORLDCOVER_LUT[list(WORLDCOVER_CLASSES)] = list(WORLDCOVER_CLASSES.values())
+WORLDCOVER_LUT.setflags(write=False)
+
+
+class CopernicusLoader(BaseHTTPLoader):
     """Load free and open Copernicus datasets"""
 
     def __init__(self, data_dir: str = "data/raster/copernicus"):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
 
+    @staticmethod
+    def _worldcover_filename(tile_code: str, year: int) -> str:
+        return f"ESA_WorldCover_10m_{year}v200_{tile_code}_Map.tif"
+
+    @staticmethod
+    def _worldcover_url(tile_code: str, year: int) -> str:
+        base_url = f"https://esa-worldcover.s3.eu-central-1.amazonaws.com/v200/{year}/map"
+        return f"{base_url}/{CopernicusLoader._worldcover_filename(tile_code, year)}"
+
     def download_worldcover(
         self,
         tile_code: str,
@@ -42,13 +77,10 @@ class CopernicusLoader:
         Download tiles from: https://esa-worldcover.org/
         """
 
-        base_url = f"https://esa-worldcover.s3.eu-central-1.amazonaws.com/v200/{year}/map"
-        filename = f"ESA_WorldCover_10m_{year}v200_{tile_code}_Map.tif"
-
-        url = f"{base_url}/{filename}"
+        url = self._worldcover_url(tile_code, year)
 
         if output_name is None:
-            output_name = filename
+            output_name = self._worldcover_filename(tile_code, year)
 
         output_path = self.data_dir / output_name
 
@@ -58,38 +90,81 @@ class CopernicusLoader:
 
         logger.info(f"Downloading WorldCover tile {tile_code} for {year}")
 
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
+        return self.download(url, output_path)
 
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+    async def adownload_worldcover_many(
+        self,
+        tile_codes: List[str],
+        year: int = 2021,
+        concurrency: int = 32
+    ) -> Dict[str, Path]:
+        """
+        Download several WorldCover tiles concurrently on the event loop
 
-        logger.info(f"Downloaded to {output_path}")
+        A single aiohttp session (with at most `concurrency` pooled
+        connections) drives all transfers from one thread, which scales to
+        hundreds of tiles without a thread stack per download.
 
-        return output_path
+        Args:
+            tile_codes: Tile codes (e.g., ['N51E000', 'N51E003'])
+            year: Year (2020 or 2021 available)
+            concurrency: Maximum simultaneous downloads
+
+        Returns:
+            Dictionary mapping tile codes to downloaded file paths
+        """
+        import aiohttp
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(session: aiohttp.ClientSession, tile_code: str) -> Path:
+            output_path = self.data_dir / self._worldcover_filename(tile_code, year)
+            if output_path.exists():
+                logger.info(f"File already exists: {output_path}")
+                return output_path
+
+            async with semaphore:
+                logger.info(f"Downloading WorldCover tile {tile_code} for {year}")
+                return await afetch_to_file(session, self._worldcover_url(tile_code, year), output_path)
+
+        connector = aiohttp.TCPConnector(limit=concurrency)
+        async with aiohttp.ClientSession(connector=connector, headers={'User-Agent': USER_AGENT}) as session:
+            paths = await asyncio.gather(*(fetch(session, tile_code) for tile_code in tile_codes))
+
+        return dict(zip(tile_codes, paths))
+
+    def download_worldcover_many(
+        self,
+        tile_codes: List[str],
+        year: int = 2021,
+        max_workers: int = DOWNLOAD_WORKERS
+    ) -> Dict[str, Path]:
+        """
+        Download several WorldCover tiles concurrently
+
+        Synchronous wrapper around adownload_worldcover_many; call that
+        directly from async code.
 
-    def get_worldcover_classes(self) -> dict:
+        Args:
+            tile_codes: Tile codes (e.g., ['N51E000', 'N51E003'])
+            year: Year (2020 or 2021 available)
+            max_workers: Maximum simultaneous downloads
+
+        Returns:
+            Dictionary mapping tile codes to downloaded file paths
+        """
+
+        return asyncio.run(self.adownload_worldcover_many(tile_codes, year, concurrency=max_workers))
+
+    def get_worldcover_classes(self) -> Mapping[int, str]:
         """
         Get WorldCover land cover classification
 
         Returns:
-            Dictionary mapping pixel values to land cover types
+            Read-only mapping of pixel values to land cover types
         """
 
-        return {
-            10: "Tree cover",
-            20: "Shrubland",
-            30: "Grassland",
-            40: "Cropland",
-            50: "Built-up",
-            60: "Bare / sparse vegetation",
-            70: "Snow and ice",
-            80: "Permanent water bodies",
-            90: "Herbaceous wetland",
-            95: "Mangroves",
-            100: "Moss and lichen"
-        }
+        return WORLDCOVER_CLASSES
 
     def download_corine_land_cover(
         self,
@@ -160,16 +235,7 @@ class CopernicusLoader:
 
         logger.info(f"Downloading Global Surface Water tile ({lon}, {lat})")
 
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-
-        logger.info(f"Downloaded to {output_path}")
-
-        return output_path
+        return self.download(url, output_path)
 
     def load_from_planetary_computer(
         self,
@@ -194,36 +260,17 @@ class CopernicusLoader:
         - io-lulc: Impact Observatory Land Use/Land Cover
         """
 
-        import planetary_computer as pc
-        import pystac_client
-        import rioxarray
-
-        catalog = pystac_client.Client.open(
-            "https://planetarycomputer.microsoft.com/api/stac/v1",
-            modifier=pc.sign_inplace
-        )
-
-        search = catalog.search(
-            collections=[dataset],
-            bbox=bbox
-        )
-
-        items = list(search.items())
-
-        if not items:
-            raise ValueError(f"No items found for {dataset} in this bbox")
-
-        logger.info(f"Found {len(items)} tiles for {dataset}")
-
-        # Use first item (or mosaic if needed)
-        item = items[0]
-        asset = item.assets['data']
-
         output_path = self.data_dir / output_name
 
+        # Same dataset and bbox as the existing file: nothing to fetch or sign
+        if is_downloaded(dataset, bbox, output_path):
+            logger.info(f"File already exists: {output_path}")
+            return output_path
+
         # Download
-        import urllib.request
-        urllib.request.urlretrieve(asset.href, output_path)
+        href = planetary_computer_href(dataset, bbox)
+        range_download(self.session, href, output_path)
+        record_download(dataset, bbox, output_path)
 
         logger.info(f"Downloaded {dataset} to {output_path}")
 
@@ -3,17 +3,52 @@ Digital Elevation Model (DEM) loader - Copernicus DEM, SRTM, etc.
 """
 
 import os
-import requests
 import rasterio
+from contextlib import ExitStack
 import numpy as np
+from rasterio.enums import Resampling
+from rasterio.warp import transform_bounds
+from rasterio.windows import Window, from_bounds
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Callable, Optional, Sequence, Tuple
 import logging
 
+from app.utils.kernels import (
+    ASPECT_Q16_OFFSET,
+    SLOPE_Q16_OFFSET,
+    TERRAIN_Q16_NODATA,
+    TERRAIN_Q16_SCALE,
+    aspect_kernel,
+    quantize_terrain_array,
+    slope_kernel,
+    terrain_kernel
+)
+from app.utils.raster_operations import copy_as_cog, overview_factors, write_cog
+from app.utils.tiling import generate_tiling_grid
+
+from .download import GDAL_HTTP_ENV, BaseHTTPLoader, range_download, stream_to_file
+from .stac import is_downloaded, planetary_computer_href, record_download
+
 logger = logging.getLogger(__name__)
 
+# Slope/aspect are computed in tiles of this size (also the output block
+# size), each read with a TERRAIN_HALO pixel border for the finite differences
+TERRAIN_TILE_SIZE = 512
+TERRAIN_HALO = 1
+
+COPERNICUS_DEM_COLLECTION = "cop-dem-glo-30"
+
+# GDAL configuration for DEM processing: threaded (de)compression and
+# overview building and a bigger block cache for the windowed passes, plus
+# the remote-read settings
+GDAL_ENV_OPTIONS = {
+    'GDAL_NUM_THREADS': 'ALL_CPUS',
+    'GDAL_CACHEMAX': 512,
+    **GDAL_HTTP_ENV
+}
+
 
-class DEMLoader:
+class DEMLoader(BaseHTTPLoader):
     """Load Digital Elevation Models from various sources"""
 
     def __init__(self, data_dir: str = "data/raster/dem"):
@@ -53,12 +88,10 @@ class DEMLoader:
 
         logger.info(f"Downloading Copernicus DEM for bbox {bbox}")
 
-        response = requests.get(url, params=params, stream=True)
+        response = self.get_stream(url, params=params)
 
         if response.status_code == 200:
-            with open(output_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            stream_to_file(response, output_path)
 
             logger.info(f"Downloaded DEM to {output_path}")
             return output_path
@@ -113,14 +146,21 @@ class DEMLoader:
     def compute_slope(
         self,
         dem_path: Path,
-        output_path: Optional[Path] = None
+        output_path: Optional[Path] = None,
+        quantize: bool = True
     ) -> Path:
         """
         Compute slope from DEM
 
+        By default slope is stored as int16 hundredths of a degree with the
+        band scale/offset set (see TERRAIN_Q16_SCALE); GDAL tools apply them,
+        rasterio callers read degrees with
+        src.read(1, masked=True) * src.scales[0] + src.offsets[0].
+
         Args:
             dem_path: Path to DEM raster
             output_path: Optional output path
+            quantize: Store int16 fixed point instead of float32
 
         Returns:
             Path to slope raster
@@ -129,22 +169,13 @@ class DEMLoader:
         if output_path is None:
             output_path = dem_path.parent / f"{dem_path.stem}_slope.tif"
 
-        with rasterio.open(dem_path) as src:
-            dem = src.read(1)
-            transform = src.transform
-
-            # Compute gradients
-            dx, dy = np.gradient(dem, transform.a, transform.e)
-
-            # Slope in degrees
-            slope = np.arctan(np.sqrt(dx**2 + dy**2)) * (180.0 / np.pi)
-
-            # Save
-            profile = src.profile.copy()
-            profile.update(dtype=rasterio.float32, compress='lzw')
-
-            with rasterio.open(output_path, 'w', **profile) as dst:
-                dst.write(slope.astype(rasterio.float32), 1)
+        # Slope in degrees, gradients and trigonometry fused in one pass
+        self._compute_terrain(
+            dem_path,
+            [output_path],
+            lambda dem, s0, s1: (slope_kernel(dem, s0, s1),),
+            offsets=[SLOPE_Q16_OFFSET] if quantize else None
+        )
 
         logger.info(f"Computed slope to {output_path}")
 
@@ -153,14 +184,18 @@ class DEMLoader:
     def compute_aspect(
         self,
         dem_path: Path,
-        output_path: Optional[Path] = None
+        output_path: Optional[Path] = None,
+        quantize: bool = True
     ) -> Path:
         """
         Compute aspect (orientation) from DEM
 
+        Quantized like compute_slope, around an offset of ASPECT_Q16_OFFSET.
+
         Args:
             dem_path: Path to DEM raster
             output_path: Optional output path
+            quantize: Store int16 fixed point instead of float32
 
         Returns:
             Path to aspect raster
@@ -169,78 +204,215 @@ class DEMLoader:
         if output_path is None:
             output_path = dem_path.parent / f"{dem_path.stem}_aspect.tif"
 
-        with rasterio.open(dem_path) as src:
-            dem = src.read(1)
-            transform = src.transform
+        # Aspect in degrees (0-360)
+        self._compute_terrain(
+            dem_path,
+            [output_path],
+            lambda dem, s0, s1: (aspect_kernel(dem, s0, s1),),
+            offsets=[ASPECT_Q16_OFFSET] if quantize else None
+        )
 
-            dx, dy = np.gradient(dem, transform.a, transform.e)
+        logger.info(f"Computed aspect to {output_path}")
 
-            # Aspect in degrees (0-360)
-            aspect = np.arctan2(-dy, dx) * (180.0 / np.pi)
-            aspect = (aspect + 360) % 360  # Normalize to 0-360
+        return output_path
 
-            profile = src.profile.copy()
-            profile.update(dtype=rasterio.float32, compress='lzw')
+    def compute_derivatives(
+        self,
+        dem_path: Path,
+        slope_path: Optional[Path] = None,
+        aspect_path: Optional[Path] = None,
+        quantize: bool = True
+    ) -> Tuple[Path, Path]:
+        """
+        Compute slope and aspect from DEM in a single pass
 
-            with rasterio.open(output_path, 'w', **profile) as dst:
-                dst.write(aspect.astype(rasterio.float32), 1)
+        Reads the DEM once and shares the gradients between both outputs;
+        use this rather than compute_slope + compute_aspect when both are needed.
 
-        logger.info(f"Computed aspect to {output_path}")
+        Args:
+            dem_path: Path to DEM raster
+            slope_path: Optional slope output path
+            aspect_path: Optional aspect output path
+            quantize: Store int16 fixed point instead of float32 (see compute_slope)
 
-        return output_path
+        Returns:
+            (slope raster path, aspect raster path)
+        """
+
+        if slope_path is None:
+            slope_path = dem_path.parent / f"{dem_path.stem}_slope.tif"
+        if aspect_path is None:
+            aspect_path = dem_path.parent / f"{dem_path.stem}_aspect.tif"
+
+        self._compute_terrain(
+            dem_path,
+            [slope_path, aspect_path],
+            terrain_kernel,
+            offsets=[SLOPE_Q16_OFFSET, ASPECT_Q16_OFFSET] if quantize else None
+        )
+
+        logger.info(f"Computed slope to {slope_path} and aspect to {aspect_path}")
+
+        return slope_path, aspect_path
+
+    @staticmethod
+    def _compute_terrain(
+        dem_path: Path,
+        output_paths: Sequence[Path],
+        kernel: Callable[[np.ndarray, float, float], Tuple[np.ndarray, ...]],
+        offsets: Optional[Sequence[float]] = None
+    ) -> None:
+        """
+        Apply a terrain kernel (see app.utils.kernels) tile by tile
+
+        The kernel returns one array per output path, so several
+        derivatives are computed from each DEM tile read. With offsets,
+        output i is written as int16 quantized around offsets[i]; without,
+        as float32.
+
+        Each tile is read with a TERRAIN_HALO pixel border so finite
+        differences at tile edges see their neighbours, then cropped back;
+        at the raster edges there is no border and the kernel falls back to
+        one-sided differences, exactly as on the whole array. Peak memory is
+        one tile instead of the full DEM.
+
+        Tiles go to a tiled GeoTIFF with average overviews, which is then
+        rewritten as a Cloud-Optimized GeoTIFF.
+        """
+        output_paths = [Path(path) for path in output_paths]
+        tmp_paths = [path.with_name(path.name + ".part") for path in output_paths]
+
+        try:
+            with rasterio.Env(**GDAL_ENV_OPTIONS), rasterio.open(dem_path) as src:
+                transform = src.transform
+                profile = src.profile.copy()
+                profile.update(
+                    driver='GTiff',
+                    count=1,
+                    compress='zstd',
+                    zstd_level=3,
+                    num_threads='ALL_CPUS',
+                    tiled=True,
+                    blockxsize=TERRAIN_TILE_SIZE,
+                    blockysize=TERRAIN_TILE_SIZE,
+                    BIGTIFF='IF_SAFER'
+                )
+                if offsets is None:
+                    # Floating-point predictor + ZSTD compresses the smooth
+                    # slope/aspect fields far better than plain LZW
+                    profile.update(dtype=rasterio.float32, predictor=3)
+                else:
+                    profile.update(dtype=rasterio.int16, nodata=TERRAIN_Q16_NODATA, predictor=2)
+
+                with ExitStack() as stack:
+                    dsts = [stack.enter_context(rasterio.open(path, 'w', **profile)) for path in tmp_paths]
+                    if offsets is not None:
+                        for dst, offset in zip(dsts, offsets):
+                            dst.scales = (TERRAIN_Q16_SCALE,)
+                            dst.offsets = (offset,)
+
+                    windows = generate_tiling_grid(src.shape, TERRAIN_TILE_SIZE)
+                    padded_windows = generate_tiling_grid(src.shape, TERRAIN_TILE_SIZE, overlap=TERRAIN_HALO)
+
+                    for window, padded in zip(windows, padded_windows):
+                        results = kernel(src.read(1, window=padded), transform.a, transform.e)
+
+                        top = window.row_off - padded.row_off
+                        left = window.col_off - padded.col_off
+                        for i, (dst, result) in enumerate(zip(dsts, results)):
+                            result = result[top:top + window.height, left:left + window.width]
+                            if offsets is not None:
+                                result = quantize_terrain_array(result, offsets[i])
+                            dst.write(result, 1, window=window)
+
+                    factors = overview_factors(src.shape)
+                    if factors:
+                        for dst in dsts:
+                            dst.build_overviews(factors, Resampling.average)
+                            dst.update_tags(ns='rio_overview', resampling='average')
+
+                for tmp_path, output_path in zip(tmp_paths, output_paths):
+                    copy_as_cog(
+                        tmp_path,
+                        output_path,
+                        compress='zstd',
+                        level=3,
+                        predictor='FLOATING_POINT' if offsets is None else 'STANDARD',
+                        blocksize=TERRAIN_TILE_SIZE,
+                        overview_resampling='average',
+                        num_threads='ALL_CPUS',
+                        BIGTIFF='IF_SAFER'
+                    )
+        except BaseException:
+            for tmp_path in tmp_paths:
+                tmp_path.unlink(missing_ok=True)
+            raise
 
     def load_from_planetary_computer(
         self,
         bbox: Tuple[float, float, float, float],
-        output_name: str = "copernicus_dem.tif"
+        output_name: str = "copernicus_dem.tif",
+        full_tile: bool = False
     ) -> Path:
         """
         Load Copernicus DEM from Microsoft Planetary Computer
 
+        By default only the bbox is read from the remote COG through GDAL's
+        /vsicurl/ (HTTP range requests for the blocks it covers), so the
+        download scales with the bbox rather than the 1x1 degree tile.
+
         Args:
-            bbox: Bounding box
+            bbox: Bounding box (min_lon, min_lat, max_lon, max_lat)
             output_name: Output filename
+            full_tile: Download the whole tile instead of the bbox window
 
         Returns:
             Path to DEM
         """
 
-        import planetary_computer as pc
-        import pystac_client
-
-        # Open STAC catalog
-        catalog = pystac_client.Client.open(
-            "https://planetarycomputer.microsoft.com/api/stac/v1",
-            modifier=pc.sign_inplace
-        )
-
-        # Search for DEM
-        search = catalog.search(
-            collections=["cop-dem-glo-30"],
-            bbox=bbox
-        )
-
-        items = list(search.items())
+        output_path = self.data_dir / output_name
 
-        if not items:
-            raise ValueError("No DEM tiles found for this bbox")
+        # The download record also says whether the file is a window or a
+        # whole tile, so switching full_tile refetches
+        record_key = COPERNICUS_DEM_COLLECTION if full_tile else f"{COPERNICUS_DEM_COLLECTION}:window"
 
-        logger.info(f"Found {len(items)} DEM tiles")
+        # Same bbox as the existing file: nothing to fetch or sign
+        if is_downloaded(record_key, bbox, output_path):
+            logger.info(f"File already exists: {output_path}")
+            return output_path
 
         # For simplicity, use first tile (you may want to mosaic multiple)
-        item = items[0]
-        dem_asset = item.assets['data']
-
-        output_path = self.data_dir / output_name
+        href = planetary_computer_href(COPERNICUS_DEM_COLLECTION, bbox)
 
-        # Download
-        import urllib.request
-        urllib.request.urlretrieve(dem_asset.href, output_path)
+        if full_tile:
+            range_download(self.session, href, output_path)
+        else:
+            self._read_window(href, bbox, output_path)
+        record_download(record_key, bbox, output_path)
 
         logger.info(f"Downloaded Copernicus DEM to {output_path}")
 
         return output_path
 
+    @staticmethod
+    def _read_window(href: str, bbox: Tuple[float, float, float, float], output_path: Path) -> None:
+        """Copy the part of a remote raster covering a lon/lat bbox to a local COG"""
+        with rasterio.Env(**GDAL_ENV_OPTIONS), rasterio.open(f"/vsicurl/{href}") as src:
+            bounds = transform_bounds("EPSG:4326", src.crs, *bbox)
+            window = from_bounds(*bounds, transform=src.transform)
+            window = window.round_offsets().round_lengths().intersection(
+                Window(0, 0, src.width, src.height)
+            )
+
+            data = src.read(window=window)
+            profile = src.profile.copy()
+            profile.update(
+                width=window.width,
+                height=window.height,
+                transform=src.window_transform(window)
+            )
+
+        write_cog(output_path, data, profile)
 
 # Example usage
 if __name__ == "__main__":
@@ -256,8 +428,7 @@ if __name__ == "__main__":
         dem_path = loader.load_from_planetary_computer(berlin_bbox, "berlin_dem.tif")
 
         # Compute derivatives
-        loader.compute_slope(dem_path)
-        loader.compute_aspect(dem_path)
+        loader.compute_derivatives(dem_path)
 
     except Exception as e:
         logger.error(f"Failed to download DEM: {e}")
@@ -0,0 +1,458 @@
+"""
+HTTP download helpers shared by the data loaders
+"""
+
+import importlib.util
+import os
+import shutil
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from pathlib import Path
+from typing import AsyncIterator, Optional
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+import logging
+
+try:
+    from tqdm import tqdm
+    TQDM_AVAILABLE = True
+except ImportError:
+    TQDM_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# httpx multiplexes concurrent requests to one host over a single
+# connection with HTTP/2, which needs the optional h2 package
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Identifies the client to Overpass, GADM, etc.; Overpass throttles
+# anonymous default user agents first under load
+USER_AGENT = "AI-Geospatial/1.0 (+https://github.com/rabby0101/AI-Geospatial)"
+
+# GDAL settings for reading remote rasters (/vsicurl/, signed HTTPS hrefs):
+# cached, multiplexed HTTP/2 range reads, and no directory listing probes
+# per open. GDAL uses its own libcurl handles, so these play the role the
+# shared Session plays for requests
+GDAL_HTTP_ENV = {
+    'CPL_VSIL_CURL_ALLOWED_EXTENSIONS': '.tif,.tiff,.gpkg',
+    'GDAL_DISABLE_READDIR_ON_OPEN': 'EMPTY_DIR',
+    'VSI_CACHE': True,
+    'VSI_CACHE_SIZE': 128 * 1024 * 1024,
+    'GDAL_HTTP_MULTIPLEX': 'YES',
+    'GDAL_HTTP_VERSION': 2
+}
+
+# Concurrent downloads for the *_many / batch loader methods
+DOWNLOAD_WORKERS = 8
+
+# Byte range fetched per request by range_download
+RANGE_PART_SIZE = 8 * 1024 * 1024
+
+# Bytes per read/write while streaming a response to disk. Throughput
+# plateaus around 100 KiB-1 MiB; small chunks cost a Python iteration and a
+# write() syscall each
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def create_session(pool_size: int = 16) -> requests.Session:
+    """
+    Create a Session with pooled keep-alive connections and retries
+
+    Reusing one Session avoids a TCP+TLS handshake per file, and the pool
+    is sized so DOWNLOAD_WORKERS threads can share it. POST is retried
+    too: the loaders only POST read-only queries (Overpass, STAC search).
+    """
+    retry = Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET", "HEAD", "POST"]
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.headers['User-Agent'] = USER_AGENT
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+@lru_cache(maxsize=1)
+def shared_session() -> requests.Session:
+    """The process-wide Session used by every BaseHTTPLoader"""
+    return create_session(pool_size=32)
+
+
+class BaseHTTPLoader:
+    """
+    Base class for loaders that fetch over HTTP
+
+    All loaders share one pooled Session, so keep-alive connections (and
+    their DNS lookups and TLS handshakes) are reused across loaders and calls.
+    """
+
+    @property
+    def session(self) -> requests.Session:
+        return shared_session()
+
+    def get_stream(self, url: str, **kwargs) -> requests.Response:
+        """GET a URL without reading the body; pass the response to stream_to_file"""
+        return self.session.get(url, stream=True, **kwargs)
+
+    def download(self, url: str, output_path: Path) -> Path:
+        """Download a URL to disk (see fetch_to_file)"""
+        return fetch_to_file(self.session, url, output_path)
+
+
+def _preallocate(fd: int, size: int) -> None:
+    """Reserve size bytes for fd up front so the filesystem can allocate contiguous extents"""
+    if hasattr(os, 'posix_fallocate'):
+        os.posix_fallocate(fd, 0, size)
+    else:
+        os.ftruncate(fd, size)
+
+
+def stream_to_file(response: requests.Response, output_path: Path) -> Path:
+    """
+    Write a streamed (stream=True) response body to disk
+
+    The body goes to a .part file that is renamed once complete, so an
+    interrupted download is never mistaken for a finished one. When the
+    server sends the body's Content-Length the file is preallocated to
+    that size, and a tqdm progress bar is shown on interactive terminals.
+
+    Args:
+        response: Response with an unread body
+        output_path: Destination path
+
+    Returns:
+        output_path
+    """
+    output_path = Path(output_path)
+    part_path = output_path.with_name(output_path.name + ".part")
+
+    # Copy from the raw stream into one reused buffer rather than
+    # allocating a bytes object per iter_content chunk
+    response.raw.decode_content = True
+
+    # With a Content-Encoding the header counts compressed bytes, not what
+    # is written to disk
+    total = 0
+    if 'Content-Encoding' not in response.headers:
+        total = int(response.headers.get('Content-Length', 0))
+
+    try:
+        with open(part_path, 'wb') as f:
+            if total > 0:
+                _preallocate(f.fileno(), total)
+
+            if TQDM_AVAILABLE:
+                # disable=None turns the bar off when stderr isn't a TTY (servers, logs)
+                with tqdm.wrapattr(
+                    f, 'write', total=total or None, desc=output_path.name, disable=None
+                ) as out:
+                    shutil.copyfileobj(response.raw, out, length=DOWNLOAD_CHUNK_SIZE)
+            else:
+                shutil.copyfileobj(response.raw, f, length=DOWNLOAD_CHUNK_SIZE)
+
+            # Drop any preallocated tail if the body came up short
+            f.truncate()
+        os.replace(part_path, output_path)
+    except BaseException:
+        part_path.unlink(missing_ok=True)
+        raise
+
+    return output_path
+
+
+def _copy_local(url: str, output_path: Path) -> Path:
+    """Copy a file:// URL in the kernel (sendfile/copy_file_range) via a .part file"""
+    output_path = Path(output_path)
+    part_path = output_path.with_name(output_path.name + ".part")
+
+    try:
+        shutil.copyfile(url2pathname(urlparse(url).path), part_path)
+        os.replace(part_path, output_path)
+    except BaseException:
+        part_path.unlink(missing_ok=True)
+        raise
+
+    logger.info(f"Copied to {output_path}")
+
+    return output_path
+
+
+def fetch_to_file(session: requests.Session, url: str, output_path: Path) -> Path:
+    """
+    Download a URL to disk (see stream_to_file)
+
+    file:// URLs (e.g. locally staged assets) are copied without passing
+    the bytes through Python.
+
+    Args:
+        session: Session to download with
+        url: File URL
+        output_path: Destination path
+
+    Returns:
+        output_path
+    """
+    if url.startswith("file://"):
+        return _copy_local(url, output_path)
+
+    with session.get(url, stream=True) as response:
+        response.raise_for_status()
+        stream_to_file(response, output_path)
+
+    logger.info(f"Downloaded to {output_path}")
+
+    return output_path
+
+
+async def _awrite_chunks(chunks: AsyncIterator[bytes], output_path: Path, total: Optional[int]) -> None:
+    """
+    Write an async stream of body chunks to output_path via a .part file
+
+    Chunks are written with plain blocking writes; a 1 MiB local write is
+    far shorter than the network wait between chunks.
+    """
+    part_path = output_path.with_name(output_path.name + ".part")
+
+    try:
+        with open(part_path, 'wb') as f:
+            if total:
+                _preallocate(f.fileno(), total)
+            async for chunk in chunks:
+                f.write(chunk)
+            f.truncate()
+        os.replace(part_path, output_path)
+    except BaseException:
+        part_path.unlink(missing_ok=True)
+        raise
+
+
+async def afetch_to_file(session, url: str, output_path: Path) -> Path:
+    """
+    Download a URL to disk with an aiohttp ClientSession
+
+    The asyncio counterpart of fetch_to_file for bulk downloads: one event
+    loop thread drives every connection instead of a thread per download.
+
+    Args:
+        session: aiohttp.ClientSession to download with
+        url: File URL
+        output_path: Destination path
+
+    Returns:
+        output_path
+    """
+    output_path = Path(output_path)
+
+    async with session.get(url) as response:
+        response.raise_for_status()
+        total = response.content_length if 'Content-Encoding' not in response.headers else None
+        await _awrite_chunks(response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE), output_path, total)
+
+    logger.info(f"Downloaded to {output_path}")
+
+    return output_path
+
+
+def fetch_if_modified(
+    session: requests.Session,
+    url: str,
+    output_path: Path,
+    revalidate: bool = True
+) -> bool:
+    """
+    Download a URL unless the local copy is still current
+
+    The server's ETag is kept in a <name>.etag sidecar. A cached file with
+    a sidecar is revalidated with If-None-Match, and a 304 skips the body.
+    Cached files without a sidecar (or with revalidate=False) are used as
+    they are, and so is the cached file if revalidation can't reach the server.
+
+    Args:
+        session: Session to download with
+        url: File URL
+        output_path: Destination path
+        revalidate: Check a cached file against the server
+
+    Returns:
+        True if output_path was (re)downloaded, False if the cached copy was kept
+    """
+    output_path = Path(output_path)
+    etag_path = output_path.with_name(output_path.name + ".etag")
+
+    headers = {}
+    if output_path.exists():
+        if not revalidate or not etag_path.exists():
+            logger.info(f"File already exists: {output_path}")
+            return False
+        headers['If-None-Match'] = etag_path.read_text().strip()
+
+    try:
+        with session.get(url, stream=True, headers=headers) as response:
+            if response.status_code == 304:
+                logger.info(f"Not modified upstream: {output_path}")
+                return False
+            response.raise_for_status()
+            stream_to_file(response, output_path)
+            etag = response.headers.get('ETag')
+    except requests.ConnectionError as e:
+        if not headers:
+            raise
+        logger.warning(f"Could not revalidate {output_path}, using cached copy: {e}")
+        return False
+
+    if etag:
+        etag_path.write_text(etag)
+    else:
+        etag_path.unlink(missing_ok=True)
+
+    logger.info(f"Downloaded to {output_path}")
+
+    return True
+
+
+async def afetch_if_modified(
+    client,
+    url: str,
+    output_path: Path,
+    revalidate: bool = True
+) -> bool:
+    """
+    fetch_if_modified with an httpx.AsyncClient
+
+    Lets many files from one host share a single (HTTP/2 when available)
+    connection; same ETag sidecar and fallback rules as fetch_if_modified.
+
+    Args:
+        client: httpx.AsyncClient to download with
+        url: File URL
+        output_path: Destination path
+        revalidate: Check a cached file against the server
+
+    Returns:
+        True if output_path was (re)downloaded, False if the cached copy was kept
+    """
+    import httpx
+
+    output_path = Path(output_path)
+    etag_path = output_path.with_name(output_path.name + ".etag")
+
+    headers = {}
+    if output_path.exists():
+        if not revalidate or not etag_path.exists():
+            logger.info(f"File already exists: {output_path}")
+            return False
+        headers['If-None-Match'] = etag_path.read_text().strip()
+
+    try:
+        async with client.stream('GET', url, headers=headers) as response:
+            if response.status_code == 304:
+                logger.info(f"Not modified upstream: {output_path}")
+                return False
+            response.raise_for_status()
+
+            total = None
+            if 'Content-Encoding' not in response.headers:
+                total = int(response.headers.get('Content-Length', 0))
+            await _awrite_chunks(response.aiter_bytes(DOWNLOAD_CHUNK_SIZE), output_path, total)
+            etag = response.headers.get('ETag')
+    except httpx.TransportError as e:
+        if not headers:
+            raise
+        logger.warning(f"Could not revalidate {output_path}, using cached copy: {e}")
+        return False
+
+    if etag:
+        etag_path.write_text(etag)
+    else:
+        etag_path.unlink(missing_ok=True)
+
+    logger.info(f"Downloaded to {output_path}")
+
+    return True
+
+
+def _fetch_range(session: requests.Session, url: str, fd: int, start: int, end: int) -> None:
+    """Download bytes start..end (inclusive) of url into the same offsets of fd"""
+    with session.get(url, headers={'Range': f'bytes={start}-{end}'}, stream=True) as response:
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise IOError(f"Server ignored range request for {url}")
+
+        offset = start
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            os.pwrite(fd, chunk, offset)
+            offset += len(chunk)
+
+    if offset != end + 1:
+        raise IOError(f"Incomplete range {start}-{end} for {url}: got {offset - start} bytes")
+
+
+def range_download(
+    session: requests.Session,
+    url: str,
+    output_path: Path,
+    part_size: int = RANGE_PART_SIZE,
+    max_workers: int = DOWNLOAD_WORKERS
+) -> Path:
+    """
+    Download a large file as concurrent HTTP byte ranges
+
+    Several TCP streams fill a CDN link that a single congestion-limited
+    stream can't. Each range is written straight to its offset in a
+    preallocated .part file. Servers that don't advertise byte ranges, or
+    files smaller than one part, are downloaded with fetch_to_file.
+
+    Args:
+        session: Session to download with (its pool should fit max_workers)
+        url: File URL
+        output_path: Destination path
+        part_size: Bytes per range request
+        max_workers: Maximum simultaneous range requests
+
+    Returns:
+        output_path
+    """
+    if url.startswith("file://"):
+        return _copy_local(url, output_path)
+
+    head = session.head(url, allow_redirects=True)
+    head.raise_for_status()
+    size = int(head.headers.get('Content-Length', 0))
+
+    if head.headers.get('Accept-Ranges', '').lower() != 'bytes' or size <= part_size:
+        return fetch_to_file(session, url, output_path)
+
+    output_path = Path(output_path)
+    part_path = output_path.with_name(output_path.name + ".part")
+    ranges = [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+
+    fd = os.open(part_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        try:
+            _preallocate(fd, size)
+
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(_fetch_range, session, url, fd, start, end)
+                    for start, end in ranges
+                ]
+                for future in futures:
+                    future.result()
+        finally:
+            os.close(fd)
+        os.replace(part_path, output_path)
+    except BaseException:
+        part_path.unlink(missing_ok=True)
+        raise
+
+    logger.info(f"Downloaded {size} bytes in {len(ranges)} ranges to {output_path}")
+
+    return output_path
@@ -3,18 +3,74 @@ GADM (Administrative Boundaries) loader
 Completely free and open-source administrative boundaries
 """
 
+import asyncio
 import os
-import requests
 import geopandas as gpd
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
 import logging
 import zipfile
 
-logger = logging.getLogger(__name__)
+from .download import (
+    DOWNLOAD_WORKERS,
+    HTTP2_AVAILABLE,
+    USER_AGENT,
+    BaseHTTPLoader,
+    afetch_if_modified,
+    fetch_if_modified
+)
+from .vector_io import read_vector
 
+logger = logging.getLogger(__name__)
 
-class GADMLoader:
+# Common country names -> ISO 3166-1 alpha-3 codes
+AVAILABLE_COUNTRIES: Mapping[str, str] = MappingProxyType({
+    "Germany": "DEU",
+    "France": "FRA",
+    "Italy": "ITA",
+    "Spain": "ESP",
+    "United Kingdom": "GBR",
+    "United States": "USA",
+    "Canada": "CAN",
+    "Brazil": "BRA",
+    "India": "IND",
+    "China": "CHN",
+    "Japan": "JPN",
+    "Australia": "AUS",
+    "South Africa": "ZAF",
+    "Kenya": "KEN",
+    "Nigeria": "NGA",
+    "Bangladesh": "BGD"
+})
+
+
+def extract_zip(zip_path: Path, extract_dir: Path, max_workers: int = DOWNLOAD_WORKERS) -> None:
+    """
+    Extract a zip archive, inflating members on a thread pool
+
+    zlib releases the GIL while inflating, so the .shp/.dbf/.shx members of
+    a GADM archive decompress in parallel. Directories are created up front
+    so workers never race on makedirs.
+    """
+    with zipfile.ZipFile(zip_path) as archive:
+        members = [info for info in archive.infolist() if not info.is_dir()]
+        for info in archive.infolist():
+            # extract() itself sanitizes names like ../x; only pre-create
+            # directories that stay inside extract_dir
+            target = Path(extract_dir, info.filename).resolve()
+            if target.is_relative_to(Path(extract_dir).resolve()):
+                (target if info.is_dir() else target.parent).mkdir(parents=True, exist_ok=True)
+
+        # Largest first, so the big .shp doesn't start last
+        members.sort(key=lambda info: info.file_size, reverse=True)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(lambda info: archive.extract(info, extract_dir), members))
+
+
+class GADMLoader(BaseHTTPLoader):
     """Load administrative boundaries from GADM (free and open)"""
 
     GADM_BASE_URL = "https://geodata.ucdavis.edu/gadm/gadm4.1"
@@ -23,19 +79,37 @@ class GADMLoader:
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
 
+    def _country_source(self, country_code: str, admin_level: int, format: str) -> Tuple[str, Path]:
+        """URL and local path of a country's GADM file"""
+        if format == "gpkg":
+            url = f"{self.GADM_BASE_URL}/gpkg/gadm41_{country_code}.gpkg"
+            filename = f"gadm41_{country_code}.gpkg"
+        elif format == "shp":
+            url = f"{self.GADM_BASE_URL}/shp/gadm41_{country_code}_{admin_level}.zip"
+            filename = f"gadm41_{country_code}_{admin_level}.zip"
+        else:
+            raise ValueError("Format must be 'gpkg' or 'shp'")
+
+        return url, self.data_dir / filename
+
     def download_country(
         self,
         country_code: str,
         admin_level: int = 0,
-        format: str = "gpkg"
+        format: str = "gpkg",
+        revalidate: bool = True
     ) -> Path:
         """
         Download GADM administrative boundaries for a country
 
+        A previously downloaded file is revalidated with its ETag and only
+        fetched again if it changed upstream.
+
         Args:
             country_code: ISO 3166-1 alpha-3 code (e.g., 'DEU' for Germany)
             admin_level: Administrative level (0=country, 1=states, 2=counties, etc.)
             format: 'gpkg' or 'shp'
+            revalidate: Check an existing download against the server
 
         Returns:
             Path to downloaded file
@@ -43,96 +117,147 @@ class GADMLoader:
         Free and Open Source: GADM is freely available for academic and other non-commercial use
         """
 
-        if format == "gpkg":
-            url = f"{self.GADM_BASE_URL}/gpkg/gadm41_{country_code}.gpkg"
-            filename = f"gadm41_{country_code}.gpkg"
-        elif format == "shp":
-            url = f"{self.GADM_BASE_URL}/shp/gadm41_{country_code}_{admin_level}.zip"
-            filename = f"gadm41_{country_code}_{admin_level}.zip"
-        else:
-            raise ValueError("Format must be 'gpkg' or 'shp'")
+        url, output_path = self._country_source(country_code, admin_level, format)
 
-        output_path = self.data_dir / filename
+        logger.info(f"Fetching GADM data for {country_code} from {url}")
 
-        # Check if already downloaded
-        if output_path.exists():
-            logger.info(f"File already exists: {output_path}")
-            return output_path
+        downloaded = fetch_if_modified(self.session, url, output_path, revalidate)
+
+        # Extract if shapefile
+        if format == "shp" and downloaded:
+            extract_dir = self.data_dir / f"{country_code}_{admin_level}"
+            extract_zip(output_path, extract_dir)
+            logger.info(f"Extracted to {extract_dir}")
+
+        return output_path
 
-        logger.info(f"Downloading GADM data for {country_code} from {url}")
+    async def adownload_countries(
+        self,
+        country_codes: List[str],
+        admin_level: int = 0,
+        format: str = "gpkg",
+        max_concurrent: int = DOWNLOAD_WORKERS,
+        revalidate: bool = True
+    ) -> Dict[str, Path]:
+        """
+        Download GADM boundaries for several countries on the event loop
 
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
+        Every file comes from the same host, so one httpx client multiplexes
+        the requests over a single HTTP/2 connection (a small pool of
+        keep-alive connections without h2) instead of a handshake per country.
 
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        Args:
+            country_codes: ISO 3166-1 alpha-3 codes
+            admin_level: Administrative level (used for 'shp')
+            format: 'gpkg' or 'shp'
+            max_concurrent: Maximum simultaneous downloads
+            revalidate: Check existing downloads against the server
 
-        logger.info(f"Downloaded to {output_path}")
+        Returns:
+            Dictionary mapping country codes to downloaded file paths
+        """
+        import httpx
 
-        # Extract if shapefile
-        if format == "shp":
-            with zipfile.ZipFile(output_path, 'r') as zip_ref:
-                extract_dir = self.data_dir / f"{country_code}_{admin_level}"
-                zip_ref.extractall(extract_dir)
+        sources = [self._country_source(code, admin_level, format) for code in country_codes]
+
+        async def fetch(client: httpx.AsyncClient, code: str, url: str, output_path: Path) -> Path:
+            logger.info(f"Fetching GADM data for {code} from {url}")
+            downloaded = await afetch_if_modified(client, url, output_path, revalidate)
+
+            if format == "shp" and downloaded:
+                extract_dir = self.data_dir / f"{code}_{admin_level}"
+                await asyncio.to_thread(extract_zip, output_path, extract_dir)
                 logger.info(f"Extracted to {extract_dir}")
 
-        return output_path
+            return output_path
+
+        async with httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=max_concurrent),
+            follow_redirects=True,
+            timeout=httpx.Timeout(30.0, read=300.0),
+            headers={'User-Agent': USER_AGENT}
+        ) as client:
+            paths = await asyncio.gather(*(
+                fetch(client, code, url, output_path)
+                for code, (url, output_path) in zip(country_codes, sources)
+            ))
+
+        return dict(zip(country_codes, paths))
+
+    def download_countries(
+        self,
+        country_codes: List[str],
+        admin_level: int = 0,
+        format: str = "gpkg",
+        max_workers: int = DOWNLOAD_WORKERS
+    ) -> Dict[str, Path]:
+        """
+        Download GADM boundaries for several countries concurrently
+
+        Synchronous wrapper around adownload_countries; call that directly
+        from async code.
+
+        Args:
+            country_codes: ISO 3166-1 alpha-3 codes
+            admin_level: Administrative level (used for 'shp')
+            format: 'gpkg' or 'shp'
+            max_workers: Maximum simultaneous downloads
+
+        Returns:
+            Dictionary mapping country codes to downloaded file paths
+        """
+
+        return asyncio.run(
+            self.adownload_countries(country_codes, admin_level, format, max_concurrent=max_workers)
+        )
 
     def load_boundaries(
         self,
         country_code: str,
-        admin_level: int = 0
+        admin_level: int = 0,
+        columns: Optional[List[str]] = None,
+        bbox: Optional[Tuple[float, float, float, float]] = None
     ) -> gpd.GeoDataFrame:
         """
         Load administrative boundaries as GeoDataFrame
 
+        Read column-wise with pyogrio when it is installed, otherwise
+        feature by feature with Fiona. Both push the column and bbox
+        filters down to GDAL, which answers a bbox from the GeoPackage's
+        R-tree index instead of parsing every polygon.
+
         Args:
             country_code: ISO country code
             admin_level: Administrative level
+            columns: Attribute columns to read (default all); geometry is always read
+            bbox: Only read units intersecting (min_lon, min_lat, max_lon, max_lat)
 
         Returns:
             GeoDataFrame with boundaries
         """
 
-        # Download if needed
-        gpkg_path = self.download_country(country_code, admin_level, "gpkg")
+        # Download if needed; an existing copy is read without a network check
+        gpkg_path = self.download_country(country_code, admin_level, "gpkg", revalidate=False)
 
         # Layer name in GeoPackage
         layer_name = f"ADM_ADM_{admin_level}"
 
-        gdf = gpd.read_file(gpkg_path, layer=layer_name)
+        gdf = read_vector(gpkg_path, layer=layer_name, columns=columns, bbox=bbox)
 
         logger.info(f"Loaded {len(gdf)} administrative units")
 
         return gdf
 
-    def get_available_countries(self) -> dict:
+    def get_available_countries(self) -> Mapping[str, str]:
         """
         Return common country codes
 
         Returns:
-            Dictionary of country names to ISO codes
+            Read-only mapping of country names to ISO codes
         """
 
-        return {
-            "Germany": "DEU",
-            "France": "FRA",
-            "Italy": "ITA",
-            "Spain": "ESP",
-            "United Kingdom": "GBR",
-            "United States": "USA",
-            "Canada": "CAN",
-            "Brazil": "BRA",
-            "India": "IND",
-            "China": "CHN",
-            "Japan": "JPN",
-            "Australia": "AUS",
-            "South Africa": "ZAF",
-            "Kenya": "KEN",
-            "Nigeria": "NGA",
-            "Bangladesh": "BGD"
-        }
+        return AVAILABLE_COUNTRIES
 
 
 # Example usage
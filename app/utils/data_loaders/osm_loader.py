@@ -2,17 +2,396 @@
 OpenStreetMap data loader using Overpass API and Geofabrik
 """
 
+import hashlib
 import os
-import requests
 import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from itertools import chain
+from operator import itemgetter
 from pathlib import Path
-from typing import Optional, List, Dict
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
 import logging
 
+import orjson
+from diskcache import Cache
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+from .download import BaseHTTPLoader, fetch_if_modified
+from .vector_io import VECTOR_IO_ENGINE, read_vector
+
 logger = logging.getLogger(__name__)
 
+OVERPASS_CACHE_DIR = Path(__file__).parent.parent.parent.parent / "data" / "cache" / "overpass"
+
+# OSM changes slowly and Overpass has per-client quotas: reuse identical
+# query responses for a day
+OVERPASS_CACHE_TTL = 24 * 3600
+
+
+# Element keys kept from an Overpass `out geom` response; ways also carry
+# their node ids and bounds, which nothing downstream reads
+OVERPASS_ELEMENT_KEYS = ('type', 'id', 'lon', 'lat', 'geometry', 'tags')
+
+# Larger bboxes are split into tiles of at most this many degrees per side,
+# each queried separately: a whole-city query risks a 504 from Overpass,
+# after which the whole job has to be retried
+OVERPASS_TILE_SPAN = 0.25
+
+# Server-side timeout (s) for a single tile's query; a small job that
+# overruns is aborted early instead of burning the client's quota
+OVERPASS_TILE_TIMEOUT = 60
+
+# Tiles queried concurrently (overpass-api.de grants two slots per client)
+OVERPASS_TILE_WORKERS = 2
+
+# Datasets converted and written concurrently by get_common_features
+SAVE_WORKERS = 4
+
+
+@lru_cache(maxsize=1)
+def _overpass_cache() -> Cache:
+    return Cache(str(OVERPASS_CACHE_DIR))
+
+# One Overpass statement: element type and its tag filters, each an exact
+# (key, value) or a key-only (key, None) match
+OverpassStatement = Tuple[str, Tuple[Tuple[str, Optional[str]], ...]]
+
+
+def _node_way(key: str, *values: str) -> Tuple[OverpassStatement, ...]:
+    """node and way statements for key=value, for each value"""
+    return tuple(
+        (element_type, ((key, value),))
+        for element_type in ("node", "way")
+        for value in values
+    )
+
 
-class OSMLoader:
+# Feature name (as passed to query_overpass) -> Overpass statements
+OVERPASS_FEATURES: Mapping[str, Tuple[OverpassStatement, ...]] = MappingProxyType({
+    "building": (("way", (("building", None),)),),
+    "hospital": _node_way("amenity", "hospital"),
+    "school": _node_way("amenity", "school"),
+    "toilet": _node_way("amenity", "toilets"),
+    "pharmacy": _node_way("amenity", "pharmacy"),
+    "fire_station": _node_way("amenity", "fire_station"),
+    "police": _node_way("amenity", "police"),
+    "park": _node_way("leisure", "park"),
+    "restaurant": _node_way("amenity", "restaurant"),
+    "transport_stop": (
+        ("node", (("public_transport", "stop_position"),)),
+        ("node", (("highway", "bus_stop"),)),
+    ),
+    "parking": _node_way("amenity", "parking"),
+    "road": (("way", (("highway", None),)),),
+    "river": (("way", (("waterway", "river"),)),),
+    "doctor": _node_way("amenity", "doctors"),
+    "dentist": _node_way("amenity", "dentist"),
+    "clinic": _node_way("amenity", "clinic"),
+    "veterinary": _node_way("amenity", "veterinary"),
+    "university": _node_way("amenity", "university"),
+    "library": _node_way("amenity", "library"),
+    "supermarket": _node_way("shop", "supermarket"),
+    "bank": _node_way("amenity", "bank"),
+    "atm": (("node", (("amenity", "atm"),)),),
+    "post_office": _node_way("amenity", "post_office"),
+    "museum": _node_way("tourism", "museum"),
+    "theatre": _node_way("amenity", "theatre", "cinema"),
+    "gym": _node_way("leisure", "fitness_centre") + _node_way("amenity", "gym"),
+    "forest": (
+        ("way", (("landuse", "forest"),)),
+        ("relation", (("landuse", "forest"),)),
+    ),
+    "water_body": (
+        ("way", (("water", "yes"),)),
+        ("way", (("natural", "water"),)),
+        ("way", (("natural", "lake"),)),
+        ("relation", (("water", "yes"),)),
+    ),
+    "district": (
+        ("relation", (("boundary", "administrative"), ("admin_level", "8"))),
+    ),
+})
+
+# Datasets downloaded by get_common_features -> features they contain
+COMMON_FEATURE_TYPES: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+    # Original 10 datasets
+    'hospitals': ('hospital',),
+    'toilets': ('toilet',),
+    'pharmacies': ('pharmacy',),
+    'fire_stations': ('fire_station',),
+    'police_stations': ('police',),
+    'parks': ('park',),
+    'restaurants': ('restaurant',),
+    'transport_stops': ('transport_stop',),
+    'schools': ('school',),
+    'parking': ('parking',),
+    # New Medical (4)
+    'doctors': ('doctor',),
+    'dentists': ('dentist',),
+    'clinics': ('clinic',),
+    'veterinary': ('veterinary',),
+    # New Education (2)
+    'universities': ('university',),
+    'libraries': ('library',),
+    # New Commerce (4)
+    'supermarkets': ('supermarket',),
+    'banks': ('bank',),
+    'atm': ('atm',),
+    'post_offices': ('post_office',),
+    # New Recreation (3)
+    'museums': ('museum',),
+    'theatres': ('theatre',),
+    'gyms': ('gym',),
+    # New Land Use (2)
+    'forests': ('forest',),
+    'water_bodies': ('water_body',),
+    # New Administrative (1)
+    'districts': ('district',)
+})
+
+
+# Overpass element type letters, for combined selectors like nw[...]
+_ELEMENT_LETTERS = {"node": "n", "way": "w", "relation": "r"}
+
+
+def _tag_filter(tags: Iterable[Tuple[str, Optional[str]]]) -> str:
+    return ''.join(f'["{k}"="{v}"]' if v is not None else f'["{k}"]' for k, v in tags)
+
+
+def tile_bbox(bbox: tuple, max_span: float = OVERPASS_TILE_SPAN) -> List[Tuple[float, float, float, float]]:
+    """
+    Split (min_lon, min_lat, max_lon, max_lat) into a grid of equal tiles
+    no wider or taller than max_span degrees
+
+    Returns:
+        Tiles, row-major from the south-west corner; [bbox] if it already fits
+    """
+    if max_span <= 0:
+        raise ValueError(f"max_span must be positive, got {max_span}")
+
+    min_lon, min_lat, max_lon, max_lat = bbox
+    cols = max(1, int(np.ceil((max_lon - min_lon) / max_span)))
+    rows = max(1, int(np.ceil((max_lat - min_lat) / max_span)))
+    lons = np.linspace(min_lon, max_lon, cols + 1)
+    lats = np.linspace(min_lat, max_lat, rows + 1)
+
+    return [
+        (float(lons[col]), float(lats[row]), float(lons[col + 1]), float(lats[row + 1]))
+        for row in range(rows)
+        for col in range(cols)
+    ]
+
+
+def build_overpass_query(statements: Iterable[OverpassStatement], bbox: tuple, timeout: int = 180) -> str:
+    """
+    Build one Overpass QL union for a set of statements
+
+    Exact single-tag statements on the same element type and key are merged
+    into one regex filter, and element types sharing an identical filter
+    into one selector, e.g. nw["amenity"~"^(hospital|school)$"]; a whole
+    feature catalogue becomes a handful of index scans. `out geom` returns
+    way coordinates inline so no member-node recursion is needed.
+
+    The bbox filters each statement rather than being set globally: a
+    global [bbox:...] also bounds `out geom`, which then returns null for
+    every way node outside it and truncates ways crossing the edge.
+    """
+    # Values per (element type, key), in first-seen order
+    merged: Dict[Tuple[str, str], List[str]] = {}
+    # Tag filter -> element types, in first-seen order
+    selectors: Dict[str, List[str]] = {}
+
+    for element_type, tags in dict.fromkeys(statements):
+        if len(tags) == 1 and tags[0][1] is not None:
+            key, value = tags[0]
+            merged.setdefault((element_type, key), []).append(value)
+        else:
+            selectors.setdefault(_tag_filter(tags), []).append(element_type)
+
+    for (element_type, key), values in merged.items():
+        value_filter = f'="{values[0]}"' if len(values) == 1 else f'~"^({"|".join(values)})$"'
+        selectors.setdefault(f'["{key}"{value_filter}]', []).append(element_type)
+
+    bbox_filter = f"({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]})"
+
+    lines = []
+    for tag_filter, element_types in selectors.items():
+        if len(element_types) == 1:
+            selector = element_types[0]
+        else:
+            selector = ''.join(
+                letter for element_type, letter in _ELEMENT_LETTERS.items() if element_type in element_types
+            )
+        lines.append(f'{selector}{tag_filter}{bbox_filter};')
+
+    return f"""
+        [out:json][timeout:{timeout}];
+        (
+            {' '.join(lines)}
+        );
+        out geom;
+        """
+
+
+# (lon, lat) of an `out geom` point, fetched by C-level itemgetter
+_LONLAT = itemgetter('lon', 'lat')
+
+
+def _coords_array(xy: List[Tuple[float, float]]) -> np.ndarray:
+    """(n, 2) float64 array of (lon, lat) tuples, filled from a flat iterator"""
+    return np.fromiter(chain.from_iterable(xy), dtype=np.float64, count=2 * len(xy)).reshape(-1, 2)
+
+
+def iter_overpass_elements(response) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the tagged elements of an Overpass JSON response, trimmed to
+    OVERPASS_ELEMENT_KEYS
+
+    With ijson installed the body is parsed incrementally from the socket
+    (requires a stream=True response), so neither the raw payload nor the
+    whole decoded document is held in memory at once; otherwise the body
+    is read and decoded in one go with orjson.
+    """
+    if IJSON_AVAILABLE:
+        response.raw.decode_content = True
+        elements = ijson.items(response.raw, 'elements.item', use_float=True)
+    else:
+        elements = orjson.loads(response.content)['elements']
+
+    for element in elements:
+        if 'tags' in element:
+            yield {key: element[key] for key in OVERPASS_ELEMENT_KEYS if key in element}
+
+
+def elements_to_gdf(elements: List[Dict[str, Any]]) -> gpd.GeoDataFrame:
+    """
+    Tagged nodes and ways from an Overpass `out geom` response as a GeoDataFrame
+
+    Coordinates are gathered into flat per-type buffers and the geometries
+    built with shapely's vectorized constructors, one GEOS call per
+    geometry type instead of a Python constructor call per element; way
+    points are read with a C-level itemgetter map, the coordinates
+    flattened into arrays with np.fromiter (much cheaper than converting a
+    list of tuples) and the per-coordinate geometry indices expanded with
+    np.repeat at the end. Tags
+    are gathered per key as (rows, values) and scattered into
+    None-filled object arrays, so pandas receives ready-made columns
+    instead of unifying the keys of a dict per row.
+    """
+    if not elements:
+        return gpd.GeoDataFrame({'osm_id': np.array([], dtype=np.int64)}, geometry=[], crs="EPSG:4326")
+
+    osm_ids = []
+    tag_rows: Dict[str, Tuple[List[int], List[str]]] = {}
+    point_rows, point_xy = [], []
+    line_rows, line_xy, line_sizes = [], [], []
+    ring_rows, ring_xy, ring_sizes = [], [], []
+
+    for element in elements:
+        if 'tags' not in element:
+            continue
+
+        if element['type'] == 'node':
+            point_rows.append(len(osm_ids))
+            point_xy.append((element['lon'], element['lat']))
+        elif element['type'] == 'way':
+            points = element.get('geometry') or ()
+            try:
+                coords = list(map(_LONLAT, points))
+            except TypeError:
+                # A null node would silently shorten the way (and open rings)
+                raise ValueError(f"Overpass returned way {element['id']} with missing node coordinates")
+            if len(coords) < 2:
+                continue
+            if coords[0] == coords[-1] and len(coords) >= 4:
+                ring_sizes.append(len(coords))
+                ring_rows.append(len(osm_ids))
+                ring_xy.extend(coords)
+            else:
+                line_sizes.append(len(coords))
+                line_rows.append(len(osm_ids))
+                line_xy.extend(coords)
+        else:
+            continue
+
+        row = len(osm_ids)
+        osm_ids.append(element['id'])
+        for key, value in element['tags'].items():
+            rows_values = tag_rows.get(key)
+            if rows_values is None:
+                rows_values = tag_rows[key] = ([], [])
+            rows_values[0].append(row)
+            rows_values[1].append(value)
+
+    columns = {'osm_id': np.array(osm_ids, dtype=np.int64)}
+    for key, (rows, values) in tag_rows.items():
+        column = np.full(len(osm_ids), None, dtype=object)
+        column[rows] = values
+        columns[key] = column
+
+    geometry = np.empty(len(osm_ids), dtype=object)
+    if point_rows:
+        geometry[point_rows] = shapely.points(_coords_array(point_xy))
+    if line_rows:
+        line_index = np.repeat(np.arange(len(line_rows)), line_sizes)
+        geometry[line_rows] = shapely.linestrings(_coords_array(line_xy), indices=line_index)
+    if ring_rows:
+        ring_index = np.repeat(np.arange(len(ring_rows)), ring_sizes)
+        geometry[ring_rows] = shapely.polygons(shapely.linearrings(_coords_array(ring_xy), indices=ring_index))
+
+    return gpd.GeoDataFrame(pd.DataFrame(columns), geometry=geometry, crs="EPSG:4326")
+
+
+def split_by_dataset(
+    elements: Iterable[Dict[str, Any]],
+    feature_types: Mapping[str, Iterable[str]]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Assign the elements of one combined response to datasets by their tags
+
+    Exact tag matches are looked up in a (type, key, value) -> datasets
+    table; only key-only and multi-tag statements are tested one by one.
+    """
+    exact: Dict[Tuple[str, str, str], Set[str]] = defaultdict(set)
+    other: List[Tuple[OverpassStatement, str]] = []
+    for name, features in feature_types.items():
+        for feature in features:
+            for statement in OVERPASS_FEATURES[feature]:
+                element_type, tags = statement
+                if len(tags) == 1 and tags[0][1] is not None:
+                    exact[(element_type, *tags[0])].add(name)
+                else:
+                    other.append((statement, name))
+
+    datasets: Dict[str, List[Dict[str, Any]]] = {name: [] for name in feature_types}
+    for element in elements:
+        tags = element.get('tags', {})
+        names: Set[str] = set()
+        for key, value in tags.items():
+            names |= exact.get((element['type'], key, value), set())
+        for (element_type, filters), name in other:
+            if element['type'] == element_type and all(
+                key in tags and (value is None or tags[key] == value) for key, value in filters
+            ):
+                names.add(name)
+        for name in names:
+            datasets[name].append(element)
+
+    return datasets
+
+
+class OSMLoader(BaseHTTPLoader):
     """Load OpenStreetMap data for specific regions and features"""
 
     OVERPASS_URL = "https://overpass-api.de/api/interpreter"
@@ -22,163 +401,115 @@ class OSMLoader:
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
 
+    def _run_overpass(self, query: str, force: bool = False) -> List[Dict[str, Any]]:
+        """
+        POST an Overpass QL query and return its elements
+
+        The response is parsed as it streams in (see iter_overpass_elements)
+        and cached on disk for OVERPASS_CACHE_TTL, keyed by the endpoint and
+        query text; force=True skips the cached copy.
+        """
+        cache = _overpass_cache()
+        key = hashlib.blake2b(f"{self.OVERPASS_URL}\n{query}".encode()).hexdigest()
+
+        if not force:
+            elements = cache.get(key)
+            if elements is not None:
+                logger.info("Using cached Overpass response")
+                return elements
+
+        # The shared Session sends Accept-Encoding (gzip, deflate), which
+        # Overpass honours: its JSON compresses several-fold on the wire
+        with self.session.post(self.OVERPASS_URL, data={'data': query}, stream=True) as response:
+            response.raise_for_status()
+            elements = list(iter_overpass_elements(response))
+            # raw.tell() counts bytes received, before decompression
+            logger.debug(
+                f"Overpass returned {len(elements)} elements in {response.raw.tell() / 1e6:.1f} MB "
+                f"({response.headers.get('Content-Encoding', 'uncompressed')})"
+            )
+        cache.set(key, elements, expire=OVERPASS_CACHE_TTL)
+        return elements
+
+    def _fetch_elements(
+        self,
+        statements: List[OverpassStatement],
+        bbox: tuple,
+        timeout: int,
+        force: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Run statements over bbox, tile by tile if it exceeds OVERPASS_TILE_SPAN
+
+        Tiles are queried concurrently with the timeout capped at
+        OVERPASS_TILE_TIMEOUT and cached individually; elements crossing a
+        tile edge come back whole from each tile they touch and are returned
+        once.
+        """
+        tiles = tile_bbox(bbox)
+        if len(tiles) == 1:
+            return self._run_overpass(build_overpass_query(statements, bbox, timeout), force)
+
+        logger.info(f"Splitting bbox {bbox} into {len(tiles)} Overpass tiles")
+        tile_timeout = min(timeout, OVERPASS_TILE_TIMEOUT)
+
+        with ThreadPoolExecutor(max_workers=OVERPASS_TILE_WORKERS) as executor:
+            responses = executor.map(
+                lambda tile: self._run_overpass(build_overpass_query(statements, tile, tile_timeout), force),
+                tiles
+            )
+            # OSM ids are unique per element type only
+            elements = {
+                (element['type'], element['id']): element
+                for response in responses
+                for element in response
+            }
+
+        return list(elements.values())
+
     def query_overpass(
         self,
         bbox: tuple,
         features: List[str],
-        timeout: int = 180
+        timeout: int = 180,
+        force: bool = False
     ) -> gpd.GeoDataFrame:
         """
         Query OSM data using Overpass API
 
+        Bboxes larger than OVERPASS_TILE_SPAN degrees are queried tile by
+        tile (see _fetch_elements).
+
         Args:
             bbox: (min_lon, min_lat, max_lon, max_lat)
             features: List of OSM features like ['hospital', 'school', 'building']
-            timeout: Query timeout in seconds
+                (see OVERPASS_FEATURES)
+            timeout: Query timeout in seconds (at most OVERPASS_TILE_TIMEOUT per tile)
+            force: Query Overpass even if the response is cached
 
         Returns:
-            GeoDataFrame with OSM features
-        """
+            GeoDataFrame with OSM features (empty, without a request, if
+            features is empty)
 
-        # Build Overpass QL query
-        queries = []
-        for feature in features:
-            if feature == "building":
-                queries.append(f'way["building"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "hospital":
-                queries.append(f'node["amenity"="hospital"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["amenity"="hospital"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "school":
-                queries.append(f'node["amenity"="school"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["amenity"="school"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "toilet":
-                queries.append(f'node["amenity"="toilets"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["amenity"="toilets"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "pharmacy":
-                queries.append(f'node["amenity"="pharmacy"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["amenity"="pharmacy"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "fire_station":
-                queries.append(f'node["amenity"="fire_station"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["amenity"="fire_station"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "police":
-                queries.append(f'node["amenity"="police"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["amenity"="police"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "park":
-                queries.append(f'node["leisure"="park"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["leisure"="park"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "restaurant":
-                queries.append(f'node["amenity"="restaurant"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["amenity"="restaurant"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "transport_stop":
-                queries.append(f'node["public_transport"="stop_position"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'node["highway"="bus_stop"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "parking":
-                queries.append(f'node["amenity"="parking"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["amenity"="parking"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "road":
-                queries.append(f'way["highway"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "river":
-                queries.append(f'way["waterway"="river"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "doctor":
-                queries.append(f'node["amenity"="doctors"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["amenity"="doctors"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "dentist":
-                queries.append(f'node["amenity"="dentist"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["amenity"="dentist"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "clinic":
-                queries.append(f'node["amenity"="clinic"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["amenity"="clinic"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "veterinary":
-                queries.append(f'node["amenity"="veterinary"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["amenity"="veterinary"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "university":
-                queries.append(f'node["amenity"="university"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["amenity"="university"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "library":
-                queries.append(f'node["amenity"="library"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["amenity"="library"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "supermarket":
-                queries.append(f'node["shop"="supermarket"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["shop"="supermarket"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "bank":
-                queries.append(f'node["amenity"="bank"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["amenity"="bank"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "atm":
-                queries.append(f'node["amenity"="atm"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "post_office":
-                queries.append(f'node["amenity"="post_office"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["amenity"="post_office"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "museum":
-                queries.append(f'node["tourism"="museum"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["tourism"="museum"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "theatre":
-                queries.append(f'node["amenity"="theatre"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'node["amenity"="cinema"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["amenity"="theatre"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["amenity"="cinema"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "gym":
-                queries.append(f'node["leisure"="fitness_centre"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'node["amenity"="gym"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["leisure"="fitness_centre"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["amenity"="gym"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "forest":
-                queries.append(f'way["landuse"="forest"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'relation["landuse"="forest"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "water_body":
-                queries.append(f'way["water"="yes"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["natural"="water"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'way["natural"="lake"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-                queries.append(f'relation["water"="yes"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-            elif feature == "district":
-                queries.append(f'relation["boundary"="administrative"]["admin_level"="8"]({bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]});')
-
-        query = f"""
-        [out:json][timeout:{timeout}];
-        (
-            {' '.join(queries)}
-        );
-        out body;
-        >;
-        out skel qt;
+        Raises:
+            ValueError: If a feature name is not in OVERPASS_FEATURES
         """
 
+        unknown = [feature for feature in features if feature not in OVERPASS_FEATURES]
+        if unknown:
+            raise ValueError(f"Unknown OSM features {unknown}; expected any of {sorted(OVERPASS_FEATURES)}")
+
+        statements = [
+            statement
+            for feature in features
+            for statement in OVERPASS_FEATURES[feature]
+        ]
+        if not statements:
+            return elements_to_gdf([])
+
         logger.info(f"Querying Overpass API for {features} in bbox {bbox}")
 
-        response = requests.post(self.OVERPASS_URL, data={'data': query})
-        response.raise_for_status()
-
-        # Convert to GeoDataFrame
-        data = response.json()
-
-        # Parse OSM elements to geometries
-        from shapely.geometry import Point, LineString, Polygon
-
-        features_list = []
-        nodes = {elem['id']: (elem['lon'], elem['lat'])
-                for elem in data['elements'] if elem['type'] == 'node'}
-
-        for element in data['elements']:
-            if element['type'] == 'node' and 'tags' in element:
-                features_list.append({
-                    'geometry': Point(element['lon'], element['lat']),
-                    'osm_id': element['id'],
-                    **element.get('tags', {})
-                })
-            elif element['type'] == 'way' and 'nodes' in element:
-                coords = [nodes[n] for n in element['nodes'] if n in nodes]
-                if len(coords) >= 2:
-                    if coords[0] == coords[-1] and len(coords) >= 4:
-                        geom = Polygon(coords)
-                    else:
-                        geom = LineString(coords)
-
-                    features_list.append({
-                        'geometry': geom,
-                        'osm_id': element['id'],
-                        **element.get('tags', {})
-                    })
-
-        gdf = gpd.GeoDataFrame(features_list, crs="EPSG:4326")
+        gdf = elements_to_gdf(self._fetch_elements(statements, bbox, timeout, force))
         logger.info(f"Retrieved {len(gdf)} features")
 
         return gdf
@@ -186,14 +517,20 @@ class OSMLoader:
     def download_geofabrik(
         self,
         region: str,
-        output_file: Optional[str] = None
+        output_file: Optional[str] = None,
+        overwrite: bool = False
     ) -> Path:
         """
         Download OSM data from Geofabrik
 
+        An existing file is returned without a network request unless
+        overwrite is set; it is then revalidated with its ETag and only
+        downloaded again if Geofabrik published a newer extract.
+
         Args:
             region: e.g., 'europe/germany/berlin'
             output_file: Optional custom output filename
+            overwrite: Refresh an existing download from Geofabrik
 
         Returns:
             Path to downloaded file
@@ -206,105 +543,109 @@ class OSMLoader:
 
         output_path = self.data_dir / output_file
 
-        logger.info(f"Downloading {url}")
-
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        logger.info(f"Fetching {url}")
 
-        logger.info(f"Downloaded to {output_path}")
+        fetch_if_modified(self.session, url, output_path, revalidate=overwrite)
 
         return output_path
 
-    def load_from_file(self, filepath: str, layer: Optional[str] = None) -> gpd.GeoDataFrame:
+    def load_from_file(
+        self,
+        filepath: str,
+        layer: Optional[str] = None,
+        columns: Optional[List[str]] = None,
+        bbox: Optional[Tuple[float, float, float, float]] = None
+    ) -> gpd.GeoDataFrame:
         """
-        Load OSM data from local file (GeoJSON, Shapefile, GeoPackage, etc.)
+        Load OSM data from local file (GeoJSON, Shapefile, GeoPackage, FlatGeobuf, etc.)
+
+        Read column-wise with pyogrio when it is installed, otherwise
+        feature by feature with Fiona.
 
         Args:
             filepath: Path to file
             layer: Optional layer name for multi-layer formats
+            columns: Tag columns to read (default all); geometry is always read
+            bbox: Only read features intersecting (min_lon, min_lat, max_lon, max_lat)
 
         Returns:
             GeoDataFrame
         """
 
-        if layer:
-            gdf = gpd.read_file(filepath, layer=layer)
-        else:
-            gdf = gpd.read_file(filepath)
+        gdf = read_vector(filepath, layer=layer, columns=columns, bbox=bbox)
 
         logger.info(f"Loaded {len(gdf)} features from {filepath}")
 
         return gdf
 
-    def get_common_features(self, city: str, bbox: tuple) -> Dict[str, gpd.GeoDataFrame]:
+    def get_common_features(
+        self,
+        city: str,
+        bbox: tuple,
+        timeout: int = 180,
+        force: bool = False
+    ) -> Dict[str, gpd.GeoDataFrame]:
         """
         Download common urban features for a city
 
+        Every dataset in COMMON_FEATURE_TYPES comes from a single Overpass
+        request (one per tile for large bboxes); the response is split into
+        datasets locally by tag.
+
         Args:
             city: City name for file naming
             bbox: Bounding box (min_lon, min_lat, max_lon, max_lat)
+            timeout: Query timeout in seconds
+            force: Query Overpass even if the response is cached
 
         Returns:
             Dictionary of GeoDataFrames by feature type
         """
 
-        feature_types = {
-            # Original 10 datasets
-            'hospitals': ['hospital'],
-            'toilets': ['toilet'],
-            'pharmacies': ['pharmacy'],
-            'fire_stations': ['fire_station'],
-            'police_stations': ['police'],
-            'parks': ['park'],
-            'restaurants': ['restaurant'],
-            'transport_stops': ['transport_stop'],
-            'schools': ['school'],
-            'parking': ['parking'],
-            # New Medical (4)
-            'doctors': ['doctor'],
-            'dentists': ['dentist'],
-            'clinics': ['clinic'],
-            'veterinary': ['veterinary'],
-            # New Education (2)
-            'universities': ['university'],
-            'libraries': ['library'],
-            # New Commerce (4)
-            'supermarkets': ['supermarket'],
-            'banks': ['bank'],
-            'atm': ['atm'],
-            'post_offices': ['post_office'],
-            # New Recreation (3)
-            'museums': ['museum'],
-            'theatres': ['theatre'],
-            'gyms': ['gym'],
-            # New Land Use (2)
-            'forests': ['forest'],
-            'water_bodies': ['water_body'],
-            # New Administrative (1)
-            'districts': ['district']
-        }
+        statements = [
+            statement
+            for features in COMMON_FEATURE_TYPES.values()
+            for feature in features
+            for statement in OVERPASS_FEATURES[feature]
+        ]
 
-        datasets = {}
+        logger.info(f"Querying Overpass API for {len(COMMON_FEATURE_TYPES)} datasets in bbox {bbox}")
 
-        for name, features in feature_types.items():
-            try:
-                gdf = self.query_overpass(bbox, features)
+        try:
+            elements = self._fetch_elements(statements, bbox, timeout, force)
+        except Exception as e:
+            logger.error(f"Failed to download common features: {e}")
+            return {}
 
-                # Save to file
-                output_file = self.data_dir / f"{city}_{name}.geojson"
-                gdf.to_file(output_file, driver='GeoJSON')
+        def save(name: str, elements_for_name: List[Dict[str, Any]]) -> gpd.GeoDataFrame:
+            gdf = elements_to_gdf(elements_for_name)
 
-                datasets[name] = gdf
-                logger.info(f"Saved {name} to {output_file}")
+            # Stays GeoJSON: load_data_to_postgis.py, load_new_osm_data.py
+            # and the raster route examples read {city}_{name}.geojson.
+            # One file per dataset, so the writes can run in parallel
+            output_file = self.data_dir / f"{city}_{name}.geojson"
+            gdf.to_file(output_file, driver='GeoJSON', engine=VECTOR_IO_ENGINE)
 
-            except Exception as e:
-                logger.error(f"Failed to download {name}: {e}")
+            logger.info(f"Saved {name} to {output_file}")
+            return gdf
+
+        datasets = {}
 
-        return datasets
+        # Each dataset goes to its own file: build and write them concurrently
+        with ThreadPoolExecutor(max_workers=SAVE_WORKERS) as executor:
+            futures = {
+                executor.submit(save, name, elements_for_name): name
+                for name, elements_for_name in split_by_dataset(elements, COMMON_FEATURE_TYPES).items()
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    datasets[name] = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to save {name}: {e}")
+
+        # Keep the COMMON_FEATURE_TYPES order
+        return {name: datasets[name] for name in COMMON_FEATURE_TYPES if name in datasets}
 
 
 # Example usage
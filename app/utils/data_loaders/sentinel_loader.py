@@ -3,18 +3,43 @@ Sentinel-2 satellite imagery loader using Sentinel Hub or Microsoft Planetary Co
 """
 
 import os
-import requests
 import rasterio
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import chain
 from pathlib import Path
-from typing import Optional, Tuple, List
+from typing import Optional, Sequence, Tuple, List
 from datetime import datetime, timedelta
 import logging
 
+from app.utils.kernels import ndvi_kernel
+from app.utils.tiling import generate_tiling_grid
+
+from .download import GDAL_HTTP_ENV, BaseHTTPLoader
+from .stac import cached_search
+
 logger = logging.getLogger(__name__)
 
+# Bands of a scene read concurrently by download_scene
+BAND_READ_WORKERS = 8
+
+# Item assets kept in search results by default: the bands download_scene
+# reads plus the scene classification layer
+SEARCH_ASSETS = ('B02', 'B03', 'B04', 'B08', 'SCL')
+
+# COG overview read by download_for_region(preview=True): level 1 is 4x
+# decimated (40 m pixels, ~2.7k px across a tile), 1/16 of the bytes
+PREVIEW_OVERVIEW_LEVEL = 1
+
+# download_scene output block size
+SCENE_BLOCK_SIZE = 512
+
+# compute_ndvi works in tiles of this size (also the output block size)
+NDVI_TILE_SIZE = 512
+
 
-class SentinelLoader:
+class SentinelLoader(BaseHTTPLoader):
     """Load Sentinel-2 data from various sources"""
 
     def __init__(self, data_dir: str = "data/raster/sentinel2"):
@@ -29,16 +54,24 @@ class SentinelLoader:
         bbox: Tuple[float, float, float, float],
         start_date: str,
         end_date: str,
-        max_cloud_cover: float = 20.0
+        max_cloud_cover: float = 20.0,
+        limit: int = 100,
+        assets: Sequence[str] = SEARCH_ASSETS
     ) -> List[dict]:
         """
         Search for Sentinel-2 scenes using Microsoft Planetary Computer
 
+        Results come least cloudy first, trimmed server-side (STAC fields
+        extension) to the id, footprint, date, cloud cover and the hrefs
+        of `assets`.
+
         Args:
             bbox: (min_lon, min_lat, max_lon, max_lat)
             start_date: ISO format date string (YYYY-MM-DD)
             end_date: ISO format date string (YYYY-MM-DD)
             max_cloud_cover: Maximum cloud cover percentage
+            limit: Maximum number of scenes
+            assets: Asset keys whose hrefs to return
 
         Returns:
             List of scene metadata
@@ -55,16 +88,22 @@ class SentinelLoader:
                     "lt": max_cloud_cover
                 }
             },
-            "limit": 100
+            "sortby": [{"field": "properties.eo:cloud_cover", "direction": "asc"}],
+            "fields": {
+                # type/stac_version/collection keep the items signable
+                "include": [
+                    "id", "type", "stac_version", "collection", "bbox",
+                    "properties.datetime", "properties.eo:cloud_cover",
+                    *(f"assets.{asset}.href" for asset in assets)
+                ],
+                "exclude": ["links"]
+            },
+            "limit": limit
         }
 
         logger.info(f"Searching Planetary Computer: {start_date} to {end_date}")
 
-        response = requests.post(search_url, json=query)
-        response.raise_for_status()
-
-        data = response.json()
-        scenes = data.get('features', [])
+        scenes = cached_search(self.session, search_url, query)
 
         logger.info(f"Found {len(scenes)} scenes")
 
@@ -74,15 +113,25 @@ class SentinelLoader:
         self,
         scene: dict,
         bands: List[str] = ['B04', 'B03', 'B02', 'B08'],
-        output_name: Optional[str] = None
+        output_name: Optional[str] = None,
+        overview_level: Optional[int] = None,
+        ndvi_path: Optional[Path] = None
     ) -> Path:
         """
         Download specific bands from a Sentinel-2 scene
 
+        The band assets are COGs: with overview_level set only that
+        overview's blocks are range-read, instead of the full-resolution
+        image.
+
         Args:
             scene: Scene metadata from search results
             bands: List of band names (B02=Blue, B03=Green, B04=Red, B08=NIR)
             output_name: Custom output filename
+            overview_level: COG overview to read (0 = first, 2x decimated);
+                None reads full resolution
+            ndvi_path: Also write NDVI here, computed from the B04/B08 arrays
+                already in memory rather than by re-reading the scene file
 
         Returns:
             Path to downloaded file
@@ -99,36 +148,67 @@ class SentinelLoader:
 
         output_path = self.data_dir / output_name
 
-        # Download each band
-        band_arrays = []
-        profile = None
-
+        hrefs = {}
         for band in bands:
             asset = signed_item['assets'].get(band)
             if not asset:
                 logger.warning(f"Band {band} not found in scene")
                 continue
+            hrefs[band] = asset['href']
 
-            href = asset['href']
-
-            with rasterio.open(href) as src:
-                if profile is None:
-                    profile = src.profile.copy()
-                    profile.update(count=len(bands))
+        if not hrefs:
+            raise ValueError(f"None of the bands {bands} found in scene {scene['id']}")
 
-                band_data = src.read(1)
-                band_arrays.append(band_data)
+        # Each band is a separate COG: read them concurrently so the request
+        # latencies overlap. GDAL releases the GIL during I/O and decoding
+        with ThreadPoolExecutor(max_workers=min(BAND_READ_WORKERS, len(hrefs))) as executor:
+            results = executor.map(partial(self._read_band, overview_level=overview_level), hrefs.values())
 
-        # Stack bands and save
-        stacked = np.stack(band_arrays)
+            # The output profile comes from the first band to arrive
+            first = next(results)
+            results = chain([first], results)
+            profile = first[0].copy()
+            profile.update(
+                driver='GTiff',
+                count=len(hrefs),
+                tiled=True,
+                blockxsize=SCENE_BLOCK_SIZE,
+                blockysize=SCENE_BLOCK_SIZE,
+                compress='deflate',
+                predictor=2,
+                num_threads='ALL_CPUS',
+                BIGTIFF='IF_SAFER'
+            )
 
-        with rasterio.open(output_path, 'w', **profile) as dst:
-            dst.write(stacked)
+            # Write each band as its read completes instead of stacking a
+            # copy of the whole scene first; only red and NIR are kept for NDVI
+            ndvi_bands = {}
+            with rasterio.Env(GDAL_NUM_THREADS='ALL_CPUS'), rasterio.open(output_path, 'w', **profile) as dst:
+                for band_index, (band, (_, band_data)) in enumerate(zip(hrefs, results), start=1):
+                    dst.write(band_data, band_index)
+                    if ndvi_path is not None and band in ('B04', 'B08'):
+                        ndvi_bands[band] = band_data
 
         logger.info(f"Downloaded scene to {output_path}")
 
+        if ndvi_path is not None:
+            if len(ndvi_bands) == 2:
+                self._write_ndvi(ndvi_bands['B04'], ndvi_bands['B08'], profile, ndvi_path)
+            else:
+                logger.warning("NDVI needs bands B04 and B08; skipping")
+
         return output_path
 
+    @staticmethod
+    def _read_band(href: str, overview_level: Optional[int] = None) -> Tuple[dict, np.ndarray]:
+        """Profile and first band of a remote raster, optionally of one overview level"""
+        open_options = {} if overview_level is None else {'OVERVIEW_LEVEL': overview_level}
+        # rasterio.Env settings are per thread, so each worker sets its own.
+        # Signed blob URLs need no HEAD probe before the first range read
+        with rasterio.Env(GDAL_NUM_THREADS='ALL_CPUS', CPL_VSIL_CURL_USE_HEAD='NO', **GDAL_HTTP_ENV), \
+                rasterio.open(href, **open_options) as src:
+            return src.profile, src.read(1)
+
     def compute_ndvi(
         self,
         scene_path: Path,
@@ -150,29 +230,50 @@ class SentinelLoader:
         """
 
         if output_path is None:
-            output_path = scene_path.parent / f"{scene_path.stem}_ndvi.tif"
+            output_path = self.ndvi_path(scene_path)
 
         with rasterio.open(scene_path) as src:
-            red = src.read(red_band).astype(float)
-            nir = src.read(nir_band).astype(float)
-
-            # NDVI = (NIR - Red) / (NIR + Red)
-            ndvi = np.where(
-                (nir + red) == 0,
-                0,
-                (nir - red) / (nir + red)
-            )
+            # One output block at a time: memory stays at a few tiles
+            # however large the scene is
+            with rasterio.open(output_path, 'w', **self._ndvi_profile(src.profile)) as dst:
+                for window in generate_tiling_grid(src.shape, NDVI_TILE_SIZE):
+                    red = src.read(red_band, window=window)
+                    nir = src.read(nir_band, window=window)
 
-            # Update profile for single band
-            profile = src.profile.copy()
-            profile.update(
-                dtype=rasterio.float32,
-                count=1,
-                compress='lzw'
-            )
+                    # NDVI = (NIR - Red) / (NIR + Red)
+                    dst.write(ndvi_kernel(red, nir), 1, window=window)
+
+        logger.info(f"Computed NDVI to {output_path}")
 
-            with rasterio.open(output_path, 'w', **profile) as dst:
-                dst.write(ndvi.astype(rasterio.float32), 1)
+        return output_path
+
+    @staticmethod
+    def ndvi_path(scene_path: Path) -> Path:
+        """Default NDVI output path for a scene file"""
+        return scene_path.parent / f"{scene_path.stem}_ndvi.tif"
+
+    @staticmethod
+    def _ndvi_profile(profile: dict) -> dict:
+        """Single-band float32 NDVI profile derived from a scene profile"""
+        profile = profile.copy()
+        profile.update(
+            driver='GTiff',
+            dtype=rasterio.float32,
+            count=1,
+            compress='lzw',
+            predictor=1,
+            tiled=True,
+            blockxsize=NDVI_TILE_SIZE,
+            blockysize=NDVI_TILE_SIZE
+        )
+        return profile
+
+    def _write_ndvi(self, red: np.ndarray, nir: np.ndarray, profile: dict, output_path: Path) -> Path:
+        """Write NDVI computed from in-memory red/NIR bands, block by block"""
+        with rasterio.open(output_path, 'w', **self._ndvi_profile(profile)) as dst:
+            for window in generate_tiling_grid(red.shape, NDVI_TILE_SIZE):
+                rows, cols = window.toslices()
+                dst.write(ndvi_kernel(red[rows, cols], nir[rows, cols]), 1, window=window)
 
         logger.info(f"Computed NDVI to {output_path}")
 
@@ -183,7 +284,8 @@ class SentinelLoader:
         region_name: str,
         bbox: Tuple[float, float, float, float],
         date: str,
-        max_cloud: float = 20.0
+        max_cloud: float = 20.0,
+        preview: bool = False
     ) -> Optional[Path]:
         """
         Download best available Sentinel-2 scene for a region and date
@@ -193,6 +295,8 @@ class SentinelLoader:
             bbox: Bounding box
             date: Target date (YYYY-MM-DD)
             max_cloud: Maximum cloud cover
+            preview: Read the PREVIEW_OVERVIEW_LEVEL overview instead of full
+                resolution, for when a coarse scene and NDVI are enough
 
         Returns:
             Path to downloaded scene or None
@@ -203,7 +307,8 @@ class SentinelLoader:
         start = (target - timedelta(days=7)).isoformat()
         end = (target + timedelta(days=7)).isoformat()
 
-        scenes = self.search_planetary_computer(bbox, start, end, max_cloud)
+        # Only the least cloudy scene is used
+        scenes = self.search_planetary_computer(bbox, start, end, max_cloud, limit=10)
 
         if not scenes:
             logger.warning(f"No scenes found for {region_name}")
@@ -215,11 +320,20 @@ class SentinelLoader:
         logger.info(f"Best scene: {best_scene['id']} with {best_scene['properties'].get('eo:cloud_cover')}% cloud cover")
 
         # Download
-        output_name = f"{region_name}_{date}.tif"
-        scene_path = self.download_scene(best_scene, output_name=output_name)
-
-        # Also compute NDVI
-        self.compute_ndvi(scene_path)
+        # NDVI is computed from the downloaded red/NIR arrays directly
+        if preview:
+            output_name = f"{region_name}_{date}_preview.tif"
+            overview_level = PREVIEW_OVERVIEW_LEVEL
+        else:
+            output_name = f"{region_name}_{date}.tif"
+            overview_level = None
+
+        scene_path = self.download_scene(
+            best_scene,
+            output_name=output_name,
+            overview_level=overview_level,
+            ndvi_path=self.ndvi_path(self.data_dir / output_name)
+        )
 
         return scene_path
 
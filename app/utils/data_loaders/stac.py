@@ -0,0 +1,134 @@
+"""
+Planetary Computer STAC lookups shared by the data loaders
+
+Search results are cached on disk so repeated requests for the same
+collection and bbox skip the STAC round trip.
+"""
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+import hashlib
+import json
+import logging
+
+import orjson
+from diskcache import Cache
+
+logger = logging.getLogger(__name__)
+
+STAC_URL = "https://planetarycomputer.microsoft.com/api/stac/v1"
+
+STAC_CACHE_DIR = Path(__file__).parent.parent.parent.parent / "data" / "cache" / "stac"
+
+# Search results (unsigned item JSON) are reused for a day
+STAC_SEARCH_TTL = 24 * 3600
+
+# Cached asset URLs carry a SAS token that expires after about an hour, so
+# keep them for less than that
+SIGNED_HREF_TTL = 45 * 60
+
+
+@lru_cache(maxsize=1)
+def _stac_cache() -> Cache:
+    return Cache(str(STAC_CACHE_DIR))
+
+
+def _search_key(collection: str, bbox: Tuple[float, float, float, float]) -> str:
+    return hashlib.blake2b(f"{collection}{tuple(bbox)!r}".encode()).hexdigest()
+
+
+def planetary_computer_href(
+    collection: str,
+    bbox: Tuple[float, float, float, float],
+    asset: str = "data"
+) -> str:
+    """
+    Return the signed URL of an asset of the first item intersecting bbox
+
+    Args:
+        collection: STAC collection ('cop-dem-glo-30', 'io-lulc', etc.)
+        bbox: Bounding box (min_lon, min_lat, max_lon, max_lat)
+        asset: Asset key within the item
+
+    Returns:
+        Signed asset URL, cached for SIGNED_HREF_TTL
+    """
+    cache = _stac_cache()
+    key = f"href:{asset}:{_search_key(collection, bbox)}"
+
+    href = cache.get(key)
+    if href is not None:
+        return href
+
+    import planetary_computer as pc
+    import pystac_client
+
+    catalog = pystac_client.Client.open(STAC_URL, modifier=pc.sign_inplace)
+    items = list(catalog.search(collections=[collection], bbox=bbox).items())
+
+    if not items:
+        raise ValueError(f"No items found for {collection} in this bbox")
+
+    logger.info(f"Found {len(items)} tiles for {collection}")
+
+    # Use first item (or mosaic if needed)
+    href = items[0].assets[asset].href
+    cache.set(key, href, expire=SIGNED_HREF_TTL)
+    return href
+
+
+def is_downloaded(
+    collection: str,
+    bbox: Tuple[float, float, float, float],
+    output_path: Path
+) -> bool:
+    """True if output_path still holds the download recorded for (collection, bbox)"""
+    recorded = _stac_cache().get(f"file:{_search_key(collection, bbox)}:{Path(output_path).resolve()}")
+    try:
+        return recorded is not None and recorded == Path(output_path).stat().st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def record_download(
+    collection: str,
+    bbox: Tuple[float, float, float, float],
+    output_path: Path
+) -> None:
+    """Remember that output_path holds the asset for (collection, bbox)"""
+    _stac_cache().set(
+        f"file:{_search_key(collection, bbox)}:{Path(output_path).resolve()}",
+        Path(output_path).stat().st_mtime_ns
+    )
+
+
+def cached_search(session, search_url: str, query: Dict[str, Any]) -> List[dict]:
+    """
+    POST a STAC item search and return its features, cached for STAC_SEARCH_TTL
+
+    Only the unsigned search results are cached; sign assets when they are
+    used, since signed hrefs expire.
+
+    Args:
+        session: requests.Session to search with
+        search_url: STAC /search endpoint
+        query: Search body
+
+    Returns:
+        List of item dictionaries
+    """
+    cache = _stac_cache()
+    body = json.dumps(query, sort_keys=True)
+    key = f"search:{hashlib.blake2b(f'{search_url}{body}'.encode()).hexdigest()}"
+
+    features = cache.get(key)
+    if features is not None:
+        return features
+
+    response = session.post(search_url, json=query)
+    response.raise_for_status()
+
+    features = orjson.loads(response.content).get('features', [])
+    cache.set(key, features, expire=STAC_SEARCH_TTL)
+    return features
@@ -0,0 +1,55 @@
+"""
+Vector file reading/writing shared by the data loaders
+
+pyogrio is used when installed: it moves whole columns between GDAL and
+GeoPandas (as Arrow buffers when pyarrow is present) instead of building
+a Python dict per feature like Fiona.
+"""
+
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+import importlib.util
+
+import geopandas as gpd
+
+try:
+    import pyogrio
+    PYOGRIO_AVAILABLE = True
+except ImportError:
+    PYOGRIO_AVAILABLE = False
+
+# pyogrio can hand GDAL's columns over as Arrow buffers when pyarrow is present
+ARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# Engine for GeoDataFrame.to_file
+VECTOR_IO_ENGINE = "pyogrio" if PYOGRIO_AVAILABLE else "fiona"
+
+
+def read_vector(
+    path: Union[str, Path],
+    layer: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    bbox: Optional[Tuple[float, float, float, float]] = None
+) -> gpd.GeoDataFrame:
+    """
+    Read a vector file, pushing column and bbox filters down to GDAL
+
+    Args:
+        path: Vector file (GeoPackage, FlatGeobuf, GeoJSON, Shapefile, etc.)
+        layer: Optional layer name for multi-layer formats
+        columns: Attribute columns to read (default all); geometry is always read
+        bbox: Only read features intersecting (minx, miny, maxx, maxy), in the layer's CRS
+
+    Returns:
+        GeoDataFrame
+    """
+    if PYOGRIO_AVAILABLE:
+        return pyogrio.read_dataframe(
+            path,
+            layer=layer,
+            columns=columns,
+            bbox=bbox,
+            use_arrow=ARROW_AVAILABLE
+        )
+
+    return gpd.read_file(path, layer=layer, include_fields=columns, bbox=bbox)
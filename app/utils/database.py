@@ -1,11 +1,19 @@
+import io
 import os
-from typing import Optional
+import re
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import QueuePool
-from contextlib import contextmanager
 import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
 from dotenv import load_dotenv
+from geoalchemy2.shape import to_shape
+
+from app.utils.pg_copy import COPY_CHUNK_ROWS, column_types, copy_binary_supported, encode_copy_binary
 
 load_dotenv()
 
@@ -16,6 +24,20 @@ POSTGRES_HOST = os.getenv("POSTGRES_HOST", "localhost")
 POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5433")
 POSTGRES_DB = os.getenv("POSTGRES_DB", "geoassist")
 
+# Connection pool settings. Behind PgBouncer in transaction mode, set
+# DB_POOL_PRE_PING=false (each ping's SELECT 1 opens a transaction that can
+# pin a server connection) and keep DB_POOL_RECYCLE below PgBouncer's
+# server_idle_timeout; stale connections are then retired by age instead
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Run CREATE EXTENSION IF NOT EXISTS postgis when the engine is created
+# (needs a role allowed to create extensions)
+DB_CREATE_POSTGIS = os.getenv("DB_CREATE_POSTGIS", "true").lower() in ("1", "true", "yes")
+
 # Connection URL
 # Handle empty password (common for local Homebrew PostgreSQL)
 if POSTGRES_PASSWORD:
@@ -23,52 +45,225 @@ if POSTGRES_PASSWORD:
 else:
     DATABASE_URL = f"postgresql://{POSTGRES_USER}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
+# Raw SQL from /api/execute-sql runs on a separate pool whose sessions
+# default to read-only transactions. Point this at a read-only role to
+# enforce it at the role level as well
+READONLY_DATABASE_URL = os.getenv("READONLY_DATABASE_URL", DATABASE_URL)
+
+
+_HEX_DIGITS = frozenset('0123456789ABCDEFabcdef')
+
+
+def geometries_from_db(values: np.ndarray) -> np.ndarray:
+    """
+    Convert a geometry column from a query result to shapely geometries
+
+    The column's format is taken from its first non-null value and the
+    whole column decoded in one vectorized shapely call: psycopg2 returns
+    PostGIS geometries as hex EWKB strings, bytea comes back as
+    memoryviews, and ST_AsText gives WKT. EWKB SRIDs are kept. Values
+    that fail to parse become None.
+
+    Args:
+        values: Object array of geometry values
+
+    Returns:
+        Object array of shapely geometries (None for NULL)
+    """
+    first = next((value for value in values if value is not None), None)
+
+    if isinstance(first, (bytes, bytearray, memoryview)):
+        values = np.array([None if value is None else bytes(value) for value in values], dtype=object)
+        return shapely.from_wkb(values, on_invalid='ignore')
+    if isinstance(first, str):
+        if _HEX_DIGITS.issuperset(first):
+            return shapely.from_wkb(values, on_invalid='ignore')
+        return shapely.from_wkt(values, on_invalid='ignore')
+    if first is None or isinstance(first, shapely.Geometry):
+        return values
+    # GeoAlchemy2 elements
+    return np.array([None if value is None else to_shape(value) for value in values], dtype=object)
+
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def qualified_table(schema: str, table_name: str) -> str:
+    """
+    schema.table for interpolation into SQL, after checking both are plain
+    identifiers (identifiers cannot be bound parameters)
+
+    Raises:
+        ValueError: If either name is not a plain SQL identifier
+    """
+    for name in (schema, table_name):
+        if not _IDENTIFIER.match(name):
+            raise ValueError(f"Invalid SQL identifier: {name!r}")
+    return f"{schema}.{table_name}"
+
+
+def rows_to_geodataframe(rows: Sequence[Sequence[Any]], columns: List[str], geom_col: str = "geometry") -> gpd.GeoDataFrame:
+    """
+    Build a GeoDataFrame from query result rows
+
+    For duplicate column names (e.g. a.* plus a computed geometry) the
+    last column wins. The CRS is taken from the geometries' EWKB SRID,
+    falling back to EPSG:4326.
+    """
+    if not rows:
+        # Return empty GeoDataFrame with correct structure
+        empty_gdf = gpd.GeoDataFrame(columns=columns, crs="EPSG:4326")
+        # Set the geometry column
+        if geom_col in empty_gdf.columns:
+            empty_gdf = empty_gdf.set_geometry(geom_col)
+        return empty_gdf
+
+    df = pd.DataFrame(rows, columns=columns)
+    last = {name: i for i, name in enumerate(columns)}
+    if len(last) < len(columns):
+        df = df.iloc[:, list(last.values())]
+
+    # Check for geometry column
+    if geom_col not in df.columns:
+        raise ValueError(f"Query result missing geometry column '{geom_col}'")
+
+    geometries = geometries_from_db(df[geom_col].to_numpy())
+    df[geom_col] = geometries
+
+    # PostGIS EWKB carries the SRID; fall back to WGS84 without one
+    srids = shapely.get_srid(geometries[pd.notna(geometries)])
+    crs = f"EPSG:{srids[0]}" if len(srids) and srids[0] > 0 else "EPSG:4326"
+
+    return gpd.GeoDataFrame(df, geometry=geom_col, crs=crs)
+
+
+class _SessionContext:
+    """
+    Session scope returned by DatabaseManager.get_session: commits on
+    success, rolls back on error, always closes
+
+    A plain class rather than a @contextmanager generator, since it is
+    entered on every request.
+    """
+
+    __slots__ = ("session_factory", "session")
+
+    def __init__(self, session_factory: sessionmaker):
+        self.session_factory = session_factory
+        self.session = None
+
+    def __enter__(self) -> Session:
+        self.session = self.session_factory()
+        return self.session
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        try:
+            if exc_type is None:
+                try:
+                    self.session.commit()
+                except Exception:
+                    self.session.rollback()
+                    raise
+            else:
+                self.session.rollback()
+        finally:
+            self.session.close()
+        return False
+
 
 class DatabaseManager:
     """Manages database connections and spatial queries"""
 
     def __init__(self):
         self.engine = None
+        self.readonly_engine = None
         self.SessionLocal = None
+        self._init_lock = threading.Lock()
 
     def initialize(self):
-        """Initialize database engine and session maker with connection pooling"""
-        self.engine = create_engine(
-            DATABASE_URL,
-            poolclass=QueuePool,
-            pool_size=5,          # Keep 5 connections alive
-            max_overflow=10,      # Allow up to 10 additional connections
-            pool_pre_ping=True,   # Verify connections before using
-            pool_recycle=3600,    # Recycle connections after 1 hour
-            echo=False
-        )
-        self.SessionLocal = sessionmaker(
-            autocommit=False,
-            autoflush=False,
-            bind=self.engine
-        )
-
-    @contextmanager
-    def get_session(self):
-        """Context manager for database sessions"""
-        if not self.SessionLocal:
+        """
+        Initialize database engine and session maker with connection pooling
+
+        Pool size, overflow, recycle age, checkout timeout and pre-ping come
+        from the DB_POOL_* environment variables (see above for PgBouncer).
+
+        Idempotent and thread-safe: concurrent first requests share one
+        engine instead of each creating its own pool.
+
+        Unless DB_CREATE_POSTGIS is false, the postgis extension is created
+        if missing.
+        """
+        if self.engine is not None:
+            return
+
+        with self._init_lock:
+            if self.engine is not None:
+                return
+
+            engine = create_engine(
+                DATABASE_URL,
+                poolclass=QueuePool,
+                pool_size=DB_POOL_SIZE,             # Connections kept alive
+                max_overflow=DB_MAX_OVERFLOW,       # Additional connections under load
+                pool_pre_ping=DB_POOL_PRE_PING,     # Verify connections before using
+                pool_recycle=DB_POOL_RECYCLE,       # Recycle connections after this many seconds
+                pool_timeout=DB_POOL_TIMEOUT,       # Wait this long for a free connection
+                # Batch executemany (to_postgis inserts) into multi-row statements
+                executemany_mode="values_plus_batch",
+                echo=False
+            )
+            if DB_CREATE_POSTGIS and engine.dialect.name == "postgresql":
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgis"))
+                except Exception as e:
+                    print(f"Could not create the postgis extension: {e}")
+            self.SessionLocal = sessionmaker(
+                autocommit=False,
+                autoflush=False,
+                bind=engine
+            )
+            # Published last: other threads check engine without the lock
+            self.engine = engine
+
+    def _get_readonly_engine(self):
+        """
+        Engine for untrusted queries, created on first use
+
+        Every session starts with default_transaction_read_only=on, so a
+        transaction the query manages to end is not followed by a writable one.
+        """
+        if self.readonly_engine is None:
+            with self._init_lock:
+                if self.readonly_engine is None:
+                    self.readonly_engine = create_engine(
+                        READONLY_DATABASE_URL,
+                        poolclass=QueuePool,
+                        pool_size=2,
+                        max_overflow=DB_MAX_OVERFLOW,
+                        pool_pre_ping=DB_POOL_PRE_PING,
+                        pool_recycle=DB_POOL_RECYCLE,
+                        pool_timeout=DB_POOL_TIMEOUT,
+                        connect_args={"options": "-c default_transaction_read_only=on"},
+                        echo=False
+                    )
+        return self.readonly_engine
+
+    def _ensure_initialized(self):
+        """Create the engine on first use"""
+        if self.engine is None:
             self.initialize()
 
-        session = self.SessionLocal()
-        try:
-            yield session
-            session.commit()
-        except Exception:
-            session.rollback()
-            raise
-        finally:
-            session.close()
+    def get_session(self) -> "_SessionContext":
+        """Context manager for database sessions"""
+        self._ensure_initialized()
+
+        return _SessionContext(self.SessionLocal)
 
     def test_connection(self) -> bool:
         """Test database connection"""
         try:
-            if not self.engine:
-                self.initialize()
+            self._ensure_initialized()
 
             with self.engine.connect() as conn:
                 result = conn.execute(text("SELECT PostGIS_Version();"))
@@ -79,22 +274,28 @@ class DatabaseManager:
             print(f"Database connection failed: {e}")
             return False
 
-    def load_vector_from_db(self, table_name: str, schema: str = "vector") -> gpd.GeoDataFrame:
+    def load_vector_from_db(
+        self,
+        table_name: str,
+        schema: str = "vector",
+        chunksize: Optional[int] = None
+    ) -> Union[gpd.GeoDataFrame, Iterator[gpd.GeoDataFrame]]:
         """
         Load vector data from PostGIS database.
 
         Args:
             table_name: Name of the table
             schema: Database schema (default: vector)
+            chunksize: If set, return an iterator of GeoDataFrames of up to
+                this many rows instead
 
         Returns:
             GeoDataFrame with the data
         """
-        if not self.engine:
-            self.initialize()
+        self._ensure_initialized()
 
-        query = f"SELECT * FROM {schema}.{table_name}"
-        gdf = gpd.read_postgis(query, self.engine, geom_col="geometry")
+        query = f"SELECT * FROM {qualified_table(schema, table_name)}"
+        gdf = gpd.read_postgis(query, self.engine, geom_col="geometry", chunksize=chunksize)
         return gdf
 
     def save_vector_to_db(
@@ -102,110 +303,164 @@ class DatabaseManager:
         gdf: gpd.GeoDataFrame,
         table_name: str,
         schema: str = "vector",
-        if_exists: str = "replace"
+        if_exists: str = "replace",
+        use_copy: bool = True
     ):
         """
         Save GeoDataFrame to PostGIS database.
 
+        When the table is (re)created and every column has a binary COPY
+        encoding (see app.utils.pg_copy), rows are loaded with COPY ...
+        FROM STDIN (FORMAT BINARY) in COPY_CHUNK_ROWS batches, sending
+        geometries as raw EWKB. Otherwise, and always when appending to an
+        existing table whose column types may differ, to_postgis is used.
+
         Args:
             gdf: GeoDataFrame to save
             table_name: Name of the table
             schema: Database schema (default: vector)
             if_exists: What to do if table exists ('replace', 'append', 'fail')
+            use_copy: Use binary COPY where possible
         """
-        if not self.engine:
-            self.initialize()
+        self._ensure_initialized()
+
+        if use_copy and if_exists != "append" and copy_binary_supported(gdf):
+            self._copy_geodataframe(gdf, table_name, schema, if_exists)
+        else:
+            gdf.to_postgis(
+                table_name,
+                self.engine,
+                schema=schema,
+                if_exists=if_exists,
+                index=False
+            )
+
+        if if_exists in ("replace", "fail"):
+            self.create_spatial_index(table_name, schema, gdf.geometry.name)
+
+    def create_spatial_index(self, table_name: str, schema: str = "vector", geom_col: str = "geometry"):
+        """
+        Ensure a GiST index on a table's geometry column and refresh its
+        planner statistics, so ST_Intersects / ST_DWithin joins against it
+        use the index instead of scanning.
 
-        gdf.to_postgis(
-            table_name,
-            self.engine,
-            schema=schema,
-            if_exists=if_exists,
-            index=False
-        )
+        The index is named idx_<table>_<column>, as GeoAlchemy2 names the
+        one it creates with the table, so an existing index is not
+        duplicated.
 
-    def execute_spatial_query(self, query: str, geom_col: str = "geometry") -> gpd.GeoDataFrame:
+        Raises:
+            ValueError: If a name is not a plain SQL identifier
+        """
+        self._ensure_initialized()
+
+        table = qualified_table(schema, table_name)
+        index_name = f"idx_{table_name}_{geom_col}"
+        for name in (geom_col, index_name):
+            if not _IDENTIFIER.match(name):
+                raise ValueError(f"Invalid SQL identifier: {name!r}")
+
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} USING GIST ({geom_col})"
+            ))
+            conn.execute(text(f"ANALYZE {table}"))
+
+    def _copy_geodataframe(self, gdf: gpd.GeoDataFrame, table_name: str, schema: str, if_exists: str):
+        """Create the table from gdf's dtypes and COPY its rows in binary"""
+        table = qualified_table(schema, table_name)
+        columns = ", ".join('"' + name.replace('"', '""') + '"' for name in gdf.columns)
+        copy_sql = f"COPY {table} ({columns}) FROM STDIN (FORMAT BINARY)"
+
+        with self.engine.begin() as conn:
+            pd.DataFrame(gdf.iloc[:0]).to_sql(
+                table_name,
+                conn,
+                schema=schema,
+                if_exists=if_exists,
+                index=False,
+                dtype=column_types(gdf)
+            )
+            cursor = conn.connection.cursor()
+            try:
+                for start in range(0, len(gdf), COPY_CHUNK_ROWS):
+                    chunk = gdf.iloc[start:start + COPY_CHUNK_ROWS]
+                    cursor.copy_expert(copy_sql, io.BytesIO(encode_copy_binary(chunk)))
+            finally:
+                cursor.close()
+
+    def execute_spatial_query(
+        self,
+        query: str,
+        geom_col: str = "geometry",
+        chunksize: Optional[int] = None,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Union[gpd.GeoDataFrame, Iterator[gpd.GeoDataFrame]]:
         """
         Execute a spatial SQL query and return results as GeoDataFrame.
 
+        The geometry column may be plain PostGIS geometry (sent as hex
+        EWKB text) or ST_AsEWKB(...) bytea, which is half the size on the
+        wire and needs no hex decoding.
+
         Args:
             query: SQL query string
             geom_col: Name of geometry column (default: geometry)
+            chunksize: If set, return an iterator of GeoDataFrames of up to
+                this many rows instead (see execute_spatial_query_iter)
+            params: Values for :name bound parameters in query
 
         Returns:
             GeoDataFrame with results
         """
-        if not self.engine:
-            self.initialize()
+        if chunksize:
+            return self.execute_spatial_query_iter(query, geom_col, chunksize, params)
+
+        self._ensure_initialized()
 
         # Use manual conversion approach due to geopandas/sqlalchemy compatibility issues
         try:
-            import pandas as pd
-            from shapely import wkb, wkt
-            from geoalchemy2 import Geometry
-            from geoalchemy2.shape import to_shape
-
             # Execute query and get raw results
             with self.engine.connect() as conn:
-                result = conn.execute(text(query))
+                result = conn.execute(text(query), params or {})
                 rows = result.fetchall()
-                columns = result.keys()
-
-            # Convert to list of dicts
-            data = [dict(zip(columns, row)) for row in rows]
-
-            if not data:
-                # Return empty GeoDataFrame with correct structure
-                empty_gdf = gpd.GeoDataFrame(columns=columns, crs="EPSG:4326")
-                # Set the geometry column
-                if geom_col in empty_gdf.columns:
-                    empty_gdf = empty_gdf.set_geometry(geom_col)
-                return empty_gdf
-
-            # Create DataFrame
-            df = pd.DataFrame(data)
-
-            # Check for geometry column
-            if geom_col not in df.columns:
-                raise ValueError(f"Query result missing geometry column '{geom_col}'")
-
-            # Convert geometry column to shapely objects
-            def convert_geometry(geom):
-                if geom is None:
-                    return None
-                if isinstance(geom, (bytes, memoryview)):
-                    # WKB format (binary)
-                    try:
-                        return wkb.loads(bytes(geom))
-                    except Exception:
-                        return None
-                elif isinstance(geom, str):
-                    # Check if it's hex-encoded WKB (EWKB from PostGIS)
-                    if geom and all(c in '0123456789ABCDEFabcdef' for c in geom):
-                        try:
-                            # Hex-encoded WKB - decode and load
-                            return wkb.loads(bytes.fromhex(geom))
-                        except Exception:
-                            pass
-                    # Try WKT format
-                    try:
-                        return wkt.loads(geom)
-                    except Exception:
-                        return None
-                else:
-                    # Try to use geoalchemy2 if available
-                    try:
-                        return to_shape(geom)
-                    except Exception:
-                        # Already a shapely object or unknown type
-                        return geom
-
-            df[geom_col] = df[geom_col].apply(convert_geometry)
-
-            # Create GeoDataFrame
-            gdf = gpd.GeoDataFrame(df, geometry=geom_col, crs="EPSG:4326")
-
-            return gdf
+                columns = list(result.keys())
+
+            return rows_to_geodataframe(rows, columns, geom_col)
+
+        except Exception as e:
+            raise Exception(f"Spatial query failed: {str(e)}")
+
+    def execute_spatial_query_iter(
+        self,
+        query: str,
+        geom_col: str = "geometry",
+        chunksize: int = 10000,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Iterator[gpd.GeoDataFrame]:
+        """
+        Execute a spatial SQL query and yield results in GeoDataFrame chunks.
+
+        Rows are read from a server-side cursor chunksize at a time, so
+        memory stays at one chunk however large the result is. The
+        connection is held until the generator is exhausted or closed.
+
+        Args:
+            query: SQL query string
+            geom_col: Name of geometry column (default: geometry)
+            chunksize: Rows per chunk
+            params: Values for :name bound parameters in query
+
+        Yields:
+            GeoDataFrames of up to chunksize rows
+        """
+        self._ensure_initialized()
+
+        try:
+            with self.engine.connect() as conn:
+                result = conn.execution_options(stream_results=True).execute(text(query), params or {})
+                columns = list(result.keys())
+                while rows := result.fetchmany(chunksize):
+                    yield rows_to_geodataframe(rows, columns, geom_col)
 
         except Exception as e:
             raise Exception(f"Spatial query failed: {str(e)}")
@@ -214,8 +469,9 @@ class DatabaseManager:
         self,
         table_name: str,
         distance: float,
-        schema: str = "vector"
-    ) -> gpd.GeoDataFrame:
+        schema: str = "vector",
+        chunksize: Optional[int] = None
+    ) -> Union[gpd.GeoDataFrame, Iterator[gpd.GeoDataFrame]]:
         """
         Create buffer around features using PostGIS.
 
@@ -223,6 +479,7 @@ class DatabaseManager:
             table_name: Source table
             distance: Buffer distance in meters
             schema: Database schema
+            chunksize: If set, return an iterator of GeoDataFrame chunks
 
         Returns:
             GeoDataFrame with buffered geometries
@@ -230,17 +487,18 @@ class DatabaseManager:
         query = f"""
         SELECT
             *,
-            ST_Buffer(geometry::geography, {distance})::geometry as geometry
-        FROM {schema}.{table_name}
+            ST_AsEWKB(ST_Buffer(geometry::geography, :distance)::geometry) as geometry
+        FROM {qualified_table(schema, table_name)}
         """
-        return self.execute_spatial_query(query)
+        return self.execute_spatial_query(query, chunksize=chunksize, params={"distance": distance})
 
     def intersection_query(
         self,
         table1: str,
         table2: str,
-        schema: str = "vector"
-    ) -> gpd.GeoDataFrame:
+        schema: str = "vector",
+        chunksize: Optional[int] = None
+    ) -> Union[gpd.GeoDataFrame, Iterator[gpd.GeoDataFrame]]:
         """
         Find spatial intersection between two tables.
 
@@ -248,6 +506,7 @@ class DatabaseManager:
             table1: First table name
             table2: Second table name
             schema: Database schema
+            chunksize: If set, return an iterator of GeoDataFrame chunks
 
         Returns:
             GeoDataFrame with intersecting features
@@ -255,19 +514,20 @@ class DatabaseManager:
         query = f"""
         SELECT
             a.*,
-            ST_Intersection(a.geometry, b.geometry) as geometry
-        FROM {schema}.{table1} a, {schema}.{table2} b
+            ST_AsEWKB(ST_Intersection(a.geometry, b.geometry)) as geometry
+        FROM {qualified_table(schema, table1)} a, {qualified_table(schema, table2)} b
         WHERE ST_Intersects(a.geometry, b.geometry)
         """
-        return self.execute_spatial_query(query)
+        return self.execute_spatial_query(query, chunksize=chunksize)
 
     def within_distance_query(
         self,
         table1: str,
         table2: str,
         distance: float,
-        schema: str = "vector"
-    ) -> gpd.GeoDataFrame:
+        schema: str = "vector",
+        chunksize: Optional[int] = None
+    ) -> Union[gpd.GeoDataFrame, Iterator[gpd.GeoDataFrame]]:
         """
         Find features in table1 within distance of features in table2.
 
@@ -276,16 +536,17 @@ class DatabaseManager:
             table2: Second table (reference features)
             distance: Distance in meters
             schema: Database schema
+            chunksize: If set, return an iterator of GeoDataFrame chunks
 
         Returns:
             GeoDataFrame with features within distance
         """
         query = f"""
         SELECT DISTINCT a.*
-        FROM {schema}.{table1} a, {schema}.{table2} b
-        WHERE ST_DWithin(a.geometry::geography, b.geometry::geography, {distance})
+        FROM {qualified_table(schema, table1)} a, {qualified_table(schema, table2)} b
+        WHERE ST_DWithin(a.geometry::geography, b.geometry::geography, :distance)
         """
-        return self.execute_spatial_query(query)
+        return self.execute_spatial_query(query, chunksize=chunksize, params={"distance": distance})
 
     def get_available_tables(self, schema: str = "vector") -> list:
         """
@@ -297,18 +558,17 @@ class DatabaseManager:
         Returns:
             List of table names
         """
-        if not self.engine:
-            self.initialize()
+        self._ensure_initialized()
 
-        query = f"""
+        query = """
         SELECT tablename
         FROM pg_tables
-        WHERE schemaname = '{schema}'
+        WHERE schemaname = :schema
         ORDER BY tablename
         """
 
         with self.engine.connect() as conn:
-            result = conn.execute(text(query))
+            result = conn.execute(text(query), {"schema": schema})
             return [row[0] for row in result]
 
     def get_table_info(self, table_name: str, schema: str = "vector") -> dict:
@@ -322,34 +582,34 @@ class DatabaseManager:
         Returns:
             Dictionary with table info
         """
-        if not self.engine:
-            self.initialize()
+        self._ensure_initialized()
 
         # Get row count
-        count_query = f"SELECT COUNT(*) FROM {schema}.{table_name}"
+        count_query = f"SELECT COUNT(*) FROM {qualified_table(schema, table_name)}"
 
         # Get geometry type
-        geom_query = f"""
+        geom_query = """
         SELECT type
         FROM geometry_columns
-        WHERE f_table_schema = '{schema}'
-        AND f_table_name = '{table_name}'
+        WHERE f_table_schema = :schema
+        AND f_table_name = :table_name
         """
 
         # Get column info
-        columns_query = f"""
+        columns_query = """
         SELECT column_name, data_type
         FROM information_schema.columns
-        WHERE table_schema = '{schema}'
-        AND table_name = '{table_name}'
+        WHERE table_schema = :schema
+        AND table_name = :table_name
         """
 
+        names = {"schema": schema, "table_name": table_name}
         with self.engine.connect() as conn:
             count = conn.execute(text(count_query)).scalar()
-            geom_type_result = conn.execute(text(geom_query)).fetchone()
+            geom_type_result = conn.execute(text(geom_query), names).fetchone()
             geom_type = geom_type_result[0] if geom_type_result else "Unknown"
 
-            columns = conn.execute(text(columns_query)).fetchall()
+            columns = conn.execute(text(columns_query), names).fetchall()
             column_info = [{"name": col[0], "type": col[1]} for col in columns]
 
         return {
@@ -360,34 +620,126 @@ class DatabaseManager:
             "columns": column_info
         }
 
-    def execute_query(self, query: str):
+    def stream_geojson_features(
+        self,
+        query: str,
+        max_rows: int,
+        statement_timeout: str = "10s",
+        chunk_size: int = 1000
+    ):
+        """
+        Run an untrusted query read-only and yield its rows as GeoJSON Features.
+
+        The query is wrapped so PostGIS serializes each row with
+        ST_AsGeoJSON(record) and the result is capped at max_rows. Rows are
+        read from a server-side cursor chunk_size at a time, so memory stays
+        bounded regardless of the result size.
+
+        Only a single statement is accepted: psycopg2 sends the cursor's
+        DECLARE in one simple-protocol call, so a `;` inside the query could
+        run further statements (e.g. COMMIT, then a write). The query runs
+        on the read-only engine (see _get_readonly_engine) in a READ ONLY
+        transaction.
+
+        Args:
+            query: SQL SELECT statement (must return a geometry column)
+            max_rows: Maximum number of features to return
+            statement_timeout: PostgreSQL statement_timeout for the query
+            chunk_size: Rows fetched per round trip
+
+        Yields:
+            GeoJSON Feature strings
+
+        Raises:
+            ValueError: If the query contains more than one statement
+        """
+        query = query.strip().rstrip(";").rstrip()
+        if ";" in query:
+            raise ValueError("Only a single SQL statement is allowed (remove ';')")
+        wrapped = f"SELECT ST_AsGeoJSON(sub.*)::text FROM ({query}) AS sub LIMIT {int(max_rows)}"
+
+        with self._get_readonly_engine().connect() as conn:
+            conn.execution_options(
+                postgresql_readonly=True,
+                stream_results=True,
+                yield_per=chunk_size
+            )
+            conn.execute(text("SELECT set_config('statement_timeout', :timeout, true)"),
+                         {"timeout": statement_timeout})
+            for (feature,) in conn.execute(text(wrapped)):
+                yield feature
+
+    def fetch_prepared_scalar(self, name: str, query: str):
+        """
+        Execute a parameterless query as a server-side prepared statement
+        and return the first column of the first row.
+
+        The statement is PREPAREd once per pooled connection (tracked in the
+        connection's info dict), so repeat calls skip parsing and planning.
+        Requires session-level connections; PgBouncer in transaction mode
+        does not keep prepared statements between transactions.
+
+        Args:
+            name: Statement name (must be a valid SQL identifier)
+            query: SQL query string
+
+        Returns:
+            The scalar value, or None if the query returned no rows
+        """
+        self._ensure_initialized()
+
+        with self.engine.connect() as conn:
+            prepared = conn.info.setdefault("prepared_statements", set())
+            if name not in prepared:
+                conn.execute(text(f"PREPARE {name} AS {query}"))
+                prepared.add(name)
+            return conn.execute(text(f"EXECUTE {name}")).scalar()
+
+    def execute_query(
+        self,
+        query: str,
+        chunksize: Optional[int] = None,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
         """
         Execute a non-spatial SQL query and return results as DataFrame.
 
         This is for aggregation/statistics queries that don't return geometries.
+        pandas builds the columns straight from the cursor; numeric
+        (Decimal) columns come back as floats.
 
         Args:
             query: SQL query string
+            chunksize: If set, return an iterator of DataFrames of up to this
+                many rows, read from a server-side cursor
+            params: Values for :name bound parameters in query
 
         Returns:
             pandas.DataFrame with results
         """
-        if not self.engine:
-            self.initialize()
+        self._ensure_initialized()
 
-        try:
-            import pandas as pd
+        if chunksize:
+            return self._execute_query_iter(query, chunksize, params)
 
+        try:
             with self.engine.connect() as conn:
-                result = conn.execute(text(query))
-                # Get column names
-                columns = result.keys()
-                # Fetch all rows
-                rows = result.fetchall()
+                return pd.read_sql(text(query), conn, params=params)
+
+        except Exception as e:
+            raise Exception(f"Query execution failed: {str(e)}")
 
-                # Create DataFrame
-                df = pd.DataFrame(rows, columns=columns)
-                return df
+    def _execute_query_iter(
+        self,
+        query: str,
+        chunksize: int,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Iterator[pd.DataFrame]:
+        """execute_query in chunks; the connection is held until exhausted or closed"""
+        try:
+            with self.engine.connect() as conn:
+                conn = conn.execution_options(stream_results=True)
+                yield from pd.read_sql(text(query), conn, params=params, chunksize=chunksize)
 
         except Exception as e:
             raise Exception(f"Query execution failed: {str(e)}")
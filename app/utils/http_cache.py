@@ -0,0 +1,43 @@
+"""
+HTTP Caching Helpers
+
+ETag computation and conditional (If-None-Match) responses shared by the
+HTML pages and the cached JSON endpoints.
+"""
+
+import hashlib
+
+from fastapi import Request
+from fastapi.responses import Response
+
+
+def compute_etag(body: bytes) -> str:
+    """Return a strong ETag for a response body"""
+    return f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+def etag_response(
+    request: Request,
+    body: bytes,
+    etag: str,
+    media_type: str,
+    cache_control: str
+) -> Response:
+    """
+    Return the body, or 304 Not Modified if the client already has it.
+
+    Args:
+        request: Incoming request (checked for If-None-Match)
+        body: Encoded response body
+        etag: ETag of the body (see compute_etag)
+        media_type: Content type of the body
+        cache_control: Cache-Control header value
+
+    Returns:
+        Full response or empty 304 response
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type=media_type, headers=headers)
@@ -0,0 +1,443 @@
+"""
+Raster Kernels Module
+Fused elementwise kernels for the change-detection and terrain hot paths
+
+Numba and CuPy are optional. Large rasters go to the GPU when CuPy finds
+a CUDA device, otherwise kernels are JIT-compiled with Numba and run in
+parallel across rows; without either, equivalent NumPy code is used.
+"""
+
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+try:
+    import cupy as cp
+    CUPY_AVAILABLE = cp.cuda.runtime.getDeviceCount() > 0
+except Exception:
+    # Not installed, or installed without a usable CUDA driver/device
+    CUPY_AVAILABLE = False
+
+# Quantized NDVI: value = round(ndvi * NDVI_Q8_SCALE) + NDVI_Q8_OFFSET as
+# uint8, with NaN/nodata stored as NDVI_Q8_NODATA. A quarter of the float32
+# memory traffic, at a resolution of ~0.008 NDVI. Offset-encoded uint8 is
+# used because GDAL < 3.7 has no signed 8-bit type
+NDVI_Q8_SCALE = 127
+NDVI_Q8_OFFSET = 128
+NDVI_Q8_NODATA = 0
+
+# Quantized slope/aspect: value = stored * TERRAIN_Q16_SCALE + offset as
+# int16, with NaN stored as TERRAIN_Q16_NODATA. 0.01 degree resolution at
+# half the bytes of float32. Aspect (0-360) is stored around an offset of
+# 180 so it fits the int16 range
+TERRAIN_Q16_SCALE = 0.01
+TERRAIN_Q16_NODATA = -32768
+SLOPE_Q16_OFFSET = 0.0
+ASPECT_Q16_OFFSET = 180.0
+
+# Below this size host<->device transfers outweigh the GPU kernel speedup
+GPU_MIN_PIXELS = 50_000_000
+
+RAD_TO_DEG = 180.0 / np.pi
+
+
+if NUMBA_AVAILABLE:
+    # fastmath is left off: it assumes no NaNs, and NaN is the usual NDVI
+    # nodata value, which must compare as "no loss" like it does in NumPy
+
+    @njit(parallel=True, cache=True)
+    def _vegloss_numba(t1, t2, threshold, out):
+        for i in prange(t1.shape[0]):
+            for j in range(t1.shape[1]):
+                out[i, j] = (t2[i, j] - t1[i, j]) < threshold
+
+    @njit(parallel=True, cache=True)
+    def _vegloss_masked_numba(t1, t2, threshold, mask_vec, out):
+        for i in prange(t1.shape[0]):
+            for j in range(t1.shape[1]):
+                out[i, j] = ((t2[i, j] - t1[i, j]) < threshold) and mask_vec[i, j] != 0
+
+    @njit(parallel=True, cache=True)
+    def _vegloss_q8_numba(t1, t2, qthreshold, nodata, out):
+        for i in prange(t1.shape[0]):
+            for j in range(t1.shape[1]):
+                a = np.int16(t1[i, j])
+                b = np.int16(t2[i, j])
+                out[i, j] = (b - a) < qthreshold and a != nodata and b != nodata
+
+    @njit(parallel=True, cache=True)
+    def _vegloss_q8_masked_numba(t1, t2, qthreshold, nodata, mask_vec, out):
+        for i in prange(t1.shape[0]):
+            for j in range(t1.shape[1]):
+                a = np.int16(t1[i, j])
+                b = np.int16(t2[i, j])
+                out[i, j] = (
+                    (b - a) < qthreshold and a != nodata and b != nodata and mask_vec[i, j] != 0
+                )
+
+    @njit(parallel=True, cache=True)
+    def _ndvi_numba(red, nir, out):
+        for i in prange(red.shape[0]):
+            for j in range(red.shape[1]):
+                r = np.float32(red[i, j])
+                n = np.float32(nir[i, j])
+                d = n + r
+                out[i, j] = 0.0 if d == 0 else (n - r) / d
+
+    # Terrain kernels: finite differences as in np.gradient (central inside,
+    # one-sided at the edges), fused with the slope/aspect trigonometry so
+    # no full-size float64 gradient arrays are materialised
+
+    @njit(cache=True)
+    def _gradient_at(dem, i, j, spacing0, spacing1):
+        rows, cols = dem.shape
+        if i == 0:
+            g0 = (dem[1, j] - dem[0, j]) / spacing0
+        elif i == rows - 1:
+            g0 = (dem[i, j] - dem[i - 1, j]) / spacing0
+        else:
+            g0 = (dem[i + 1, j] - dem[i - 1, j]) / (2.0 * spacing0)
+        if j == 0:
+            g1 = (dem[i, 1] - dem[i, 0]) / spacing1
+        elif j == cols - 1:
+            g1 = (dem[i, j] - dem[i, j - 1]) / spacing1
+        else:
+            g1 = (dem[i, j + 1] - dem[i, j - 1]) / (2.0 * spacing1)
+        return g0, g1
+
+    @njit(parallel=True, cache=True)
+    def _slope_numba(dem, spacing0, spacing1, out):
+        for i in prange(dem.shape[0]):
+            for j in range(dem.shape[1]):
+                g0, g1 = _gradient_at(dem, i, j, spacing0, spacing1)
+                out[i, j] = np.arctan(np.sqrt(g0 * g0 + g1 * g1)) * RAD_TO_DEG
+
+    @njit(parallel=True, cache=True)
+    def _aspect_numba(dem, spacing0, spacing1, out):
+        for i in prange(dem.shape[0]):
+            for j in range(dem.shape[1]):
+                g0, g1 = _gradient_at(dem, i, j, spacing0, spacing1)
+                out[i, j] = (np.arctan2(-g1, g0) * RAD_TO_DEG + 360.0) % 360.0
+
+    @njit(parallel=True, cache=True)
+    def _terrain_numba(dem, spacing0, spacing1, slope_out, aspect_out):
+        for i in prange(dem.shape[0]):
+            for j in range(dem.shape[1]):
+                g0, g1 = _gradient_at(dem, i, j, spacing0, spacing1)
+                slope_out[i, j] = np.arctan(np.sqrt(g0 * g0 + g1 * g1)) * RAD_TO_DEG
+                aspect_out[i, j] = (np.arctan2(-g1, g0) * RAD_TO_DEG + 360.0) % 360.0
+
+
+if CUPY_AVAILABLE:
+    _vegloss_gpu = cp.ElementwiseKernel(
+        'float32 a, float32 b, float32 thr',
+        'bool o',
+        'o = (b - a) < thr',
+        'vegloss'
+    )
+
+
+def _gpu_eligible(t1: np.ndarray, t2: np.ndarray, out: np.ndarray, mask_vec) -> bool:
+    """Only large, unmasked float32 rasters are worth the device round trip"""
+    return (
+        CUPY_AVAILABLE
+        and mask_vec is None
+        and t1.size >= GPU_MIN_PIXELS
+        and t1.dtype == np.float32
+        and t2.dtype == np.float32
+        and out.flags.c_contiguous
+    )
+
+
+def _check_same_shape(**arrays: Optional[np.ndarray]) -> None:
+    """
+    Raise ValueError unless all given arrays share one shape
+
+    The compiled kernels do no bounds checking, so a smaller input would
+    be read (or an output written) out of bounds instead of failing.
+    """
+    shapes = {name: a.shape for name, a in arrays.items() if a is not None}
+    if len(set(shapes.values())) > 1:
+        raise ValueError(f"Kernel inputs must have the same shape, got {shapes}")
+
+
+def _numba_eligible(*arrays: np.ndarray, dtype=np.float32) -> bool:
+    """The compiled kernels are only specialised for contiguous float32/uint8 input"""
+    return NUMBA_AVAILABLE and all(
+        a.dtype == dtype and a.flags.c_contiguous for a in arrays
+    )
+
+
+def quantize_ndvi_array(ndvi: np.ndarray, nodata: Optional[float] = None) -> np.ndarray:
+    """
+    Quantize NDVI in [-1, 1] to offset-encoded uint8 (see NDVI_Q8_SCALE)
+
+    NaN and nodata pixels become NDVI_Q8_NODATA.
+    """
+    scaled = np.multiply(ndvi, NDVI_Q8_SCALE, dtype=np.float32)
+    np.rint(scaled, out=scaled)
+    np.clip(scaled, -NDVI_Q8_SCALE, NDVI_Q8_SCALE, out=scaled)
+    scaled += NDVI_Q8_OFFSET
+    invalid = np.isnan(ndvi)
+    if nodata is not None:
+        invalid |= ndvi == nodata
+    scaled[invalid] = NDVI_Q8_NODATA
+    return scaled.astype(np.uint8)
+
+
+def quantize_terrain_array(values: np.ndarray, offset: float) -> np.ndarray:
+    """
+    Quantize float degrees to int16 fixed point (see TERRAIN_Q16_SCALE)
+
+    NaN pixels become TERRAIN_Q16_NODATA.
+    """
+    scaled = np.subtract(values, offset, dtype=np.float32)
+    scaled /= TERRAIN_Q16_SCALE
+    np.rint(scaled, out=scaled)
+    np.clip(scaled, TERRAIN_Q16_NODATA + 1, np.iinfo(np.int16).max, out=scaled)
+    scaled[np.isnan(values)] = TERRAIN_Q16_NODATA
+    return scaled.astype(np.int16)
+
+
+def _vegloss_q8(
+    t1: np.ndarray,
+    t2: np.ndarray,
+    threshold: float,
+    out: np.ndarray,
+    mask_vec: Optional[np.ndarray]
+) -> np.ndarray:
+    """vegloss_kernel for quantized uint8 NDVI; nodata is never loss"""
+    # The offset cancels in the difference
+    qthreshold = np.int16(round(threshold * NDVI_Q8_SCALE))
+
+    if _numba_eligible(t1, t2, dtype=np.uint8):
+        if mask_vec is None:
+            _vegloss_q8_numba(t1, t2, qthreshold, NDVI_Q8_NODATA, out)
+        else:
+            _vegloss_q8_masked_numba(t1, t2, qthreshold, NDVI_Q8_NODATA, mask_vec, out)
+        return out
+
+    loss = out.view(np.bool_)
+    # Widen once so the uint8 difference can't wrap around
+    np.less(np.subtract(t2, t1, dtype=np.int16), qthreshold, out=loss)
+    loss &= t1 != NDVI_Q8_NODATA
+    loss &= t2 != NDVI_Q8_NODATA
+    if mask_vec is not None:
+        np.logical_and(loss, mask_vec, out=loss)
+    return out
+
+
+def vegloss_kernel(
+    t1: np.ndarray,
+    t2: np.ndarray,
+    threshold: float,
+    out: np.ndarray,
+    mask_vec: Optional[np.ndarray] = None,
+    diff: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Compute the vegetation loss mask (t2 - t1) < threshold in one pass
+
+    Args:
+        t1: NDVI at time 1 (earlier), float32 or quantized uint8
+        t2: NDVI at time 2 (later), same shape and dtype as t1
+        threshold: Loss threshold in NDVI units (negative for loss)
+        out: uint8 array receiving 1 for loss pixels, 0 elsewhere
+        mask_vec: Optional array of the same shape; pixels where it is 0
+            are never marked as loss
+        diff: Optional float32 scratch buffer for the NumPy fallback
+
+    Returns:
+        out
+
+    Raises:
+        ValueError: If the arrays do not all have the same shape
+    """
+    _check_same_shape(t1=t1, t2=t2, out=out, mask_vec=mask_vec)
+
+    if t1.dtype == np.uint8 and t2.dtype == np.uint8:
+        return _vegloss_q8(t1, t2, threshold, out, mask_vec)
+
+    # Compare in float32 like NumPy does for a float32 array vs a scalar
+    threshold = np.float32(threshold)
+
+    if _gpu_eligible(t1, t2, out, mask_vec):
+        # Upload both rasters, and copy back only the one-byte-per-pixel mask
+        loss_gpu = _vegloss_gpu(cp.asarray(t1), cp.asarray(t2), threshold)
+        loss_gpu.get(out=out.view(np.bool_))
+        return out
+
+    if _numba_eligible(t1, t2):
+        if mask_vec is None:
+            _vegloss_numba(t1, t2, threshold, out)
+        else:
+            _vegloss_masked_numba(t1, t2, threshold, mask_vec, out)
+        return out
+
+    loss = out.view(np.bool_)
+    diff = np.subtract(t2, t1, out=diff)
+    np.less(diff, threshold, out=loss)
+    if mask_vec is not None:
+        np.logical_and(loss, mask_vec, out=loss)
+    return out
+
+
+def ndvi_kernel(red: np.ndarray, nir: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    NDVI = (nir - red) / (nir + red) in float32, 0 where nir + red == 0
+
+    Accepts the raw band dtype (e.g. uint16 reflectance) and converts per
+    pixel, so no full-size float copies of the inputs are made.
+
+    Args:
+        red: 2D red band
+        nir: 2D near-infrared band, same shape as red
+        out: Optional float32 output array
+
+    Returns:
+        out (allocated if not given)
+
+    Raises:
+        ValueError: If red, nir and out do not have the same shape
+    """
+    _check_same_shape(red=red, nir=nir, out=out)
+    if out is None:
+        out = np.empty(red.shape, dtype=np.float32)
+
+    if (NUMBA_AVAILABLE and red.ndim == 2 and red.flags.c_contiguous
+            and nir.flags.c_contiguous and out.flags.c_contiguous):
+        _ndvi_numba(red, nir, out)
+        return out
+
+    denom = np.add(nir, red, dtype=np.float32)
+    np.subtract(nir, red, out=out, dtype=np.float32)
+    zero = denom == 0
+    np.divide(out, denom, out=out, where=~zero)
+    out[zero] = 0
+    return out
+
+
+def _check_terrain_input(dem: np.ndarray) -> None:
+    if dem.ndim != 2 or min(dem.shape) < 2:
+        raise ValueError(f"Terrain kernels need a 2D array with at least 2x2 samples, got shape {dem.shape}")
+
+
+def _central_diff(a: np.ndarray, spacing: float, axis: int) -> np.ndarray:
+    """
+    np.gradient(a, spacing, axis=axis) for a uniform grid, as float32
+
+    Central differences inside, one-sided at the two edges; each is a
+    single vectorized subtract over contiguous slices.
+    """
+    def along(start, stop):
+        index = [slice(None)] * a.ndim
+        index[axis] = slice(start, stop)
+        return tuple(index)
+
+    out = np.empty(a.shape, dtype=np.float32)
+    inner = out[along(1, -1)]
+    np.subtract(a[along(2, None)], a[along(None, -2)], out=inner, dtype=np.float32)
+    inner *= 0.5 / spacing
+
+    first, last = out[along(0, 1)], out[along(-1, None)]
+    np.subtract(a[along(1, 2)], a[along(0, 1)], out=first, dtype=np.float32)
+    np.subtract(a[along(-1, None)], a[along(-2, -1)], out=last, dtype=np.float32)
+    first /= spacing
+    last /= spacing
+    return out
+
+
+def slope_kernel(dem: np.ndarray, spacing0: float, spacing1: float) -> np.ndarray:
+    """
+    Slope in degrees, arctan(|gradient|), in one pass over the DEM
+
+    Args:
+        dem: 2D elevation array
+        spacing0: Sample spacing along axis 0, as passed to np.gradient
+        spacing1: Sample spacing along axis 1
+
+    Returns:
+        float32 array of dem's shape
+    """
+    _check_terrain_input(dem)
+    if NUMBA_AVAILABLE:
+        out = np.empty(dem.shape, dtype=np.float32)
+        _slope_numba(dem, float(spacing0), float(spacing1), out)
+        return out
+
+    # NumPy fallback: float32 gradients, reused as the output buffer
+    g0 = _central_diff(dem, spacing0, axis=0)
+    g1 = _central_diff(dem, spacing1, axis=1)
+    slope = np.hypot(g0, g1, out=g0)
+    np.arctan(slope, out=slope)
+    slope *= RAD_TO_DEG
+    return slope
+
+
+def aspect_kernel(dem: np.ndarray, spacing0: float, spacing1: float) -> np.ndarray:
+    """
+    Aspect in degrees [0, 360), arctan2(-gradient1, gradient0), in one pass
+
+    Args:
+        dem: 2D elevation array
+        spacing0: Sample spacing along axis 0, as passed to np.gradient
+        spacing1: Sample spacing along axis 1
+
+    Returns:
+        float32 array of dem's shape
+    """
+    _check_terrain_input(dem)
+    if NUMBA_AVAILABLE:
+        out = np.empty(dem.shape, dtype=np.float32)
+        _aspect_numba(dem, float(spacing0), float(spacing1), out)
+        return out
+
+    g0 = _central_diff(dem, spacing0, axis=0)
+    g1 = _central_diff(dem, spacing1, axis=1)
+    aspect = np.arctan2(np.negative(g1, out=g1), g0, out=g0)
+    aspect *= RAD_TO_DEG
+    aspect += 360
+    np.remainder(aspect, 360, out=aspect)
+    return aspect
+
+
+def terrain_kernel(dem: np.ndarray, spacing0: float, spacing1: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Slope and aspect together, sharing one gradient computation
+
+    Same results as slope_kernel and aspect_kernel, for half the gradient work.
+
+    Args:
+        dem: 2D elevation array
+        spacing0: Sample spacing along axis 0, as passed to np.gradient
+        spacing1: Sample spacing along axis 1
+
+    Returns:
+        (slope, aspect) float32 arrays of dem's shape
+    """
+    _check_terrain_input(dem)
+    if NUMBA_AVAILABLE:
+        slope = np.empty(dem.shape, dtype=np.float32)
+        aspect = np.empty(dem.shape, dtype=np.float32)
+        _terrain_numba(dem, float(spacing0), float(spacing1), slope, aspect)
+        return slope, aspect
+
+    g0 = _central_diff(dem, spacing0, axis=0)
+    g1 = _central_diff(dem, spacing1, axis=1)
+    slope = np.hypot(g0, g1)
+    np.arctan(slope, out=slope)
+    slope *= RAD_TO_DEG
+    aspect = np.arctan2(np.negative(g1, out=g1), g0, out=g0)
+    aspect *= RAD_TO_DEG
+    aspect += 360
+    np.remainder(aspect, 360, out=aspect)
+    return slope, aspect
@@ -9,6 +9,7 @@ from typing import Dict, List, Optional, Any
 from app.utils.database import db_manager
 from sqlalchemy import text, inspect
 import json
+import orjson
 from pathlib import Path
 
 
@@ -116,8 +117,8 @@ class SchemaDiscovery:
         # Try to load from file
         if self.DESCRIPTIONS_FILE.exists():
             try:
-                with open(self.DESCRIPTIONS_FILE, 'r') as f:
-                    descriptions = json.load(f)
+                with open(self.DESCRIPTIONS_FILE, 'rb') as f:
+                    descriptions = orjson.loads(f.read())
             except Exception as e:
                 print(f"Warning: Could not load table descriptions: {e}")
 
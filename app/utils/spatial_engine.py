@@ -1,9 +1,12 @@
 import json
+import uuid
 from pathlib import Path
 from typing import Any, Dict, Optional, List, Union
 import geopandas as gpd
 import pandas as pd
 import numpy as np
+import orjson
+import shapely
 from app.models.query_model import OperationPlan
 from app.utils.sql_generator import sql_generator
 import logging
@@ -188,10 +191,9 @@ class SpatialEngine:
 
         # Convert to GeoJSON with custom JSON handler for NaN values
         try:
-            # Use __geo_interface__ for more robust conversion
-            geojson = gdf_copy.__geo_interface__
+            geojson = self._to_feature_collection(gdf_copy)
         except Exception as e:
-            logger.error(f"Error with __geo_interface__: {e}")
+            logger.error(f"Error building GeoJSON FeatureCollection: {e}")
             # Fallback to to_json() method
             try:
                 geojson_str = gdf_copy.to_json()
@@ -217,6 +219,39 @@ class SpatialEngine:
             "metadata": metadata
         }
 
+    @staticmethod
+    def _to_feature_collection(gdf: gpd.GeoDataFrame) -> Dict[str, Any]:
+        """
+        Build a GeoJSON FeatureCollection dict from a GeoDataFrame.
+
+        Same output as gdf.__geo_interface__, but geometries are encoded in
+        one vectorized shapely.to_geojson call (GEOS) and decoded with orjson
+        instead of walking every coordinate in Python via mapping().
+        """
+        geometry = gdf.geometry
+        geometry_json = shapely.to_geojson(geometry.values)
+        bounds = shapely.bounds(geometry.values).tolist()
+        attributes = gdf.drop(columns=geometry.name)
+        # Missing values become null, as with __geo_interface__
+        properties = attributes.astype(object).where(attributes.notna(), None).to_dict(orient="records")
+
+        features = [
+            {
+                "id": str(index),
+                "type": "Feature",
+                "properties": props,
+                "geometry": orjson.loads(geom) if geom is not None else None,
+                "bbox": bbox if geom is not None else None
+            }
+            for index, props, geom, bbox in zip(gdf.index, properties, geometry_json, bounds)
+        ]
+
+        return {
+            "type": "FeatureCollection",
+            "features": features,
+            "bbox": gdf.total_bounds.tolist()
+        }
+
     def _format_stats_result(self, data) -> Dict[str, Any]:
         """
         Format non-spatial results (aggregations, statistics) as JSON table.
@@ -336,14 +371,12 @@ class SpatialEngine:
         ndvi_t2 = self.data_dir / params['ndvi_t2']
         threshold = params.get('threshold', -0.2)
 
-        # Compute difference
-        diff = self.raster_ops.ndvi_difference(ndvi_t1, ndvi_t2)
+        # Fast path for rasters on the same grid
+        loss_areas = self.raster_ops.detect_vegetation_loss_aligned(ndvi_t1, ndvi_t2, threshold)
 
-        # Detect loss
-        loss_areas = self.raster_ops.detect_vegetation_loss(
-            diff,
-            threshold=threshold
-        )
+        if loss_areas is None:
+            # Resample t2 onto t1's grid in memory
+            loss_areas = self.raster_ops.detect_vegetation_loss_resampled(ndvi_t1, ndvi_t2, threshold)
 
         # Format result
         if len(loss_areas) > 0:
@@ -369,31 +402,31 @@ class SpatialEngine:
         ndvi_t1 = self.data_dir / params['ndvi_t1']
         ndvi_t2 = self.data_dir / params['ndvi_t2']
         threshold = params.get('threshold', -0.2)
+        mask_path = self.data_dir / params['mask_vector'] if params.get('mask_vector') else None
 
-        # Compute difference and save to temp file
-        diff_path = self.data_dir / "temp" / "ndvi_diff_temp.tif"
-        diff_path.parent.mkdir(parents=True, exist_ok=True)
-
-        diff = self.raster_ops.ndvi_difference(
-            ndvi_t1,
-            ndvi_t2,
-            output_path=diff_path
+        # Fast path for rasters on the same grid; the mask vector is
+        # rasterized once (and cached) and applied per pixel
+        loss_areas = self.raster_ops.detect_vegetation_loss_aligned(
+            ndvi_t1, ndvi_t2, threshold, mask_vector=mask_path
         )
 
-        # Detect loss (using the saved file path)
-        loss_areas = self.raster_ops.detect_vegetation_loss(diff_path, threshold=threshold)
+        if loss_areas is None:
+            # Resample t2 onto t1's grid in memory; plans run concurrently,
+            # so no shared intermediate file
+            loss_areas = self.raster_ops.detect_vegetation_loss_resampled(ndvi_t1, ndvi_t2, threshold)
 
-        # Optional: filter by mask vector (e.g., residential areas)
-        if 'mask_vector' in params and len(loss_areas) > 0:
-            mask_path = self.data_dir / params['mask_vector']
-            mask_gdf = gpd.read_file(mask_path)
+            # Optional: filter by mask vector (e.g., residential areas)
+            if mask_path is not None and len(loss_areas) > 0:
+                # Skip mask features outside the detected loss extent
+                extent = gpd.GeoSeries([shapely.box(*loss_areas.total_bounds)], crs=loss_areas.crs)
+                mask_gdf = gpd.read_file(mask_path, bbox=extent)
 
-            # Ensure same CRS
-            if mask_gdf.crs != loss_areas.crs:
-                mask_gdf = mask_gdf.to_crs(loss_areas.crs)
+                # Ensure same CRS
+                if mask_gdf.crs != loss_areas.crs:
+                    mask_gdf = mask_gdf.to_crs(loss_areas.crs)
 
-            # Spatial intersection
-            loss_areas = gpd.overlay(loss_areas, mask_gdf, how='intersection')
+                # Spatial intersection
+                loss_areas = gpd.overlay(loss_areas, mask_gdf, how='intersection')
 
         return self._format_result(loss_areas)
 
@@ -424,7 +457,8 @@ class SpatialEngine:
         """Clip raster by vector polygon"""
         raster_path = self.data_dir / params['raster']
         vector_path = self.data_dir / params['vector']
-        output_path = self.data_dir / params.get('output', 'temp/clipped.tif')
+        # Requests run concurrently, so never share a default output file
+        output_path = self.data_dir / (params.get('output') or f"temp/clipped_{uuid.uuid4().hex}.tif")
 
         # Load vector
         vector = gpd.read_file(vector_path)
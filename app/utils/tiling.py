@@ -0,0 +1,43 @@
+"""
+Raster Tiling Module
+Splits raster grids into windows for tile-parallel processing
+"""
+
+from typing import List, Tuple
+
+from rasterio.windows import Window
+
+
+def generate_tiling_grid(
+    shape: Tuple[int, int],
+    tile_size: int = 2048,
+    overlap: int = 0
+) -> List[Window]:
+    """
+    Cover a raster grid with square tiles
+
+    Args:
+        shape: Raster (height, width) in pixels
+        tile_size: Tile edge length in pixels (edge tiles may be smaller)
+        overlap: Pixels each tile extends into its neighbours on every side
+
+    Returns:
+        List of rasterio Windows, row-major, clipped to the grid
+    """
+    if tile_size <= 0:
+        raise ValueError(f"tile_size must be positive, got {tile_size}")
+    if overlap < 0:
+        raise ValueError(f"overlap must be non-negative, got {overlap}")
+
+    height, width = shape
+    windows = []
+
+    for row in range(0, height, tile_size):
+        for col in range(0, width, tile_size):
+            row_start = max(row - overlap, 0)
+            col_start = max(col - overlap, 0)
+            row_stop = min(row + tile_size + overlap, height)
+            col_stop = min(col + tile_size + overlap, width)
+            windows.append(Window(col_start, row_start, col_stop - col_start, row_stop - row_start))
+
+    return windows
@@ -0,0 +1,29 @@
+"""
+Gunicorn configuration for production deployments.
+
+Runs the FastAPI app under Uvicorn's ASGI worker. Usage:
+
+    gunicorn app.main:app -c gunicorn_conf.py
+
+Request handlers call psycopg2, GeoPandas and GDAL, which block in C code,
+so each worker only serves as many concurrent requests as it has threads
+for that work. Size WEB_CONCURRENCY for CPU-bound raster work, and keep the
+per-worker database pool (pool_size + max_overflow in app/utils/database.py)
+in mind: total connections = workers x pool.
+"""
+
+import os
+
+bind = f"{os.getenv('API_HOST', '0.0.0.0')}:{os.getenv('API_PORT', '8000')}"
+
+workers = int(os.getenv("WEB_CONCURRENCY", (os.cpu_count() or 1) * 2 + 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+worker_connections = 1000
+keepalive = 5
+
+# LLM calls and raster operations can take well over the 30s default
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+graceful_timeout = 30
+
+accesslog = "-"
+errorlog = "-"
@@ -13,6 +13,8 @@ from rasterio.warp import calculate_default_transform, reproject, Resampling
 from datetime import datetime, timedelta
 import logging
 
+from app.utils.kernels import ndvi_kernel
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -176,19 +178,11 @@ class RealSentinel2Loader:
         """
         logger.info("🌿 Computing NDVI...")
 
-        # Convert to float
-        red = red_band.astype(float)
-        nir = nir_band.astype(float)
-
-        # Compute NDVI
-        ndvi = np.where(
-            (nir + red) == 0,
-            0,
-            (nir - red) / (nir + red)
-        )
+        # Fused float32 NDVI straight from the raw band dtype
+        ndvi = ndvi_kernel(red_band, nir_band)
 
         # Clip to valid range
-        ndvi = np.clip(ndvi, -1, 1)
+        np.clip(ndvi, -1, 1, out=ndvi)
 
         # Mask invalid values
         ndvi = np.ma.masked_invalid(ndvi)
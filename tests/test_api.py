@@ -1,6 +1,10 @@
+import json
+import time
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
+from app.models.query_model import NLQuery, OperationPlan, GeospatialOperation
+from app.routes.query import _build_response
 
 client = TestClient(app)
 
@@ -15,6 +19,17 @@ class TestAPI:
         data = response.json()
         assert "message" in data or "Cognitive Geospatial Assistant" in response.text
 
+    def test_root_endpoint_etag(self):
+        """Test root endpoint answers 304 when the ETag matches"""
+        response = client.get("/")
+        etag = response.headers.get("etag")
+        if etag is None:
+            pytest.skip("Frontend index.html not present")
+
+        cached = client.get("/", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.headers["etag"] == etag
+
     def test_health_check(self):
         """Test health check endpoint"""
         response = client.get("/api/health")
@@ -54,6 +69,44 @@ class TestAPI:
         assert response.status_code == 422  # Validation error
 
 
+class TestBuildResponse:
+    """Test the shared /query and /query-stats response builder"""
+
+    def test_success_response_includes_plan(self):
+        """Test plan fields are copied into a successful response"""
+        plan = OperationPlan(
+            operations=[GeospatialOperation(operation="spatial_query", parameters={"sql": "SELECT 1"})],
+            reasoning="Test reasoning",
+            datasets_required=["osm_hospitals"],
+            layer_name="test_layer"
+        )
+        result = {"success": True, "data": {"type": "FeatureCollection", "features": []}}
+
+        response = _build_response(
+            NLQuery(question="Find hospitals"), result, plan, time.perf_counter(),
+            default_result_type="geojson", default_data={}
+        )
+        data = json.loads(response.body)
+
+        assert data["success"] is True
+        assert data["result_type"] == "geojson"
+        assert data["layer_name"] == "test_layer"
+        assert data["operations"][0]["operation"] == "spatial_query"
+        assert data["datasets_used"] == ["osm_hospitals"]
+
+    def test_error_response(self):
+        """Test executor errors become an error QueryResponse"""
+        response = _build_response(
+            NLQuery(question="Find hospitals"), {"success": False, "error": "boom"}, None,
+            time.perf_counter(), default_result_type="table", default_data=[]
+        )
+        data = json.loads(response.body)
+
+        assert data["success"] is False
+        assert data["result_type"] == "error"
+        assert data["error"] == "boom"
+
+
 class TestCORS:
     """Test CORS configuration"""
 
@@ -62,3 +115,25 @@ class TestCORS:
         response = client.options("/api/health")
         # OPTIONS request should be handled
         assert response.status_code in [200, 405]
+
+
+class TestResolveDataPath:
+    """Test request paths resolved against data/"""
+
+    def test_deleted_dataset_is_404(self, tmp_path, monkeypatch):
+        """Test a dataset removed after its first request is not served from the cache"""
+        from types import SimpleNamespace
+        from fastapi import HTTPException
+        import app.routes.raster as raster
+
+        monkeypatch.setattr(raster, "get_spatial_engine", lambda: SimpleNamespace(data_dir=tmp_path))
+        raster._resolve.cache_clear()
+        dataset = tmp_path / "ndvi.tif"
+        dataset.write_bytes(b"")
+
+        assert raster.resolve_data_path("ndvi.tif") == str(dataset.resolve())
+        dataset.unlink()
+        with pytest.raises(HTTPException) as excinfo:
+            raster.resolve_data_path("ndvi.tif")
+        assert excinfo.value.status_code == 404
+        raster._resolve.cache_clear()
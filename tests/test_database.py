@@ -0,0 +1,160 @@
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import Point
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app.utils.database import DatabaseManager, geometries_from_db
+
+
+class TestGeometriesFromDB:
+    """Test conversion of query-result geometry columns"""
+
+    def test_hex_ewkb_keeps_srid(self):
+        """Test hex EWKB (psycopg2's geometry format) decodes with its SRID"""
+        point = shapely.set_srid(Point(13.4, 52.5), 25833)
+        values = np.array([shapely.to_wkb(point, hex=True, include_srid=True), None], dtype=object)
+        geoms = geometries_from_db(values)
+        assert geoms[0].equals(Point(13.4, 52.5))
+        assert shapely.get_srid(geoms[0]) == 25833
+        assert geoms[1] is None
+
+    def test_wkt_and_bytea_columns(self):
+        """Test WKT text and bytea (memoryview) columns are decoded"""
+        wkt_geoms = geometries_from_db(np.array(['POINT (3 4)', None], dtype=object))
+        assert wkt_geoms[0].equals(Point(3, 4)) and wkt_geoms[1] is None
+        bytea = memoryview(shapely.to_wkb(Point(1, 2)))
+        assert geometries_from_db(np.array([None, bytea], dtype=object))[1].equals(Point(1, 2))
+
+    def test_invalid_values_become_none(self):
+        """Test unparseable rows are None instead of failing the query"""
+        good = shapely.to_wkb(Point(1, 2), hex=True)
+        geoms = geometries_from_db(np.array([good, 'ABCD'], dtype=object))
+        assert geoms[0].equals(Point(1, 2))
+        assert geoms[1] is None
+
+
+class TestExecuteSpatialQuery:
+    """Test query results are converted whole and in chunks"""
+
+    def _manager(self, rows=25):
+        manager = DatabaseManager()
+        manager.engine = create_engine("sqlite://")
+        with manager.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE t (id INTEGER, geometry TEXT)"))
+            for i in range(rows):
+                point = shapely.set_srid(Point(i, i), 3857)
+                conn.execute(text("INSERT INTO t VALUES (:i, :g)"),
+                             {"i": i, "g": shapely.to_wkb(point, hex=True, include_srid=True)})
+        return manager
+
+    def test_crs_from_srid(self):
+        """Test the result CRS comes from the EWKB SRID"""
+        gdf = self._manager().execute_spatial_query("SELECT * FROM t")
+        assert len(gdf) == 25
+        assert gdf.crs == "EPSG:3857"
+
+    def test_chunked(self):
+        """Test chunksize yields bounded GeoDataFrames covering every row"""
+        chunks = list(self._manager().execute_spatial_query("SELECT * FROM t", chunksize=10))
+        assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+        assert sum(chunk['id'].sum() for chunk in chunks) == sum(range(25))
+
+    def test_session_commits_and_rolls_back(self):
+        """Test get_session commits on success and rolls back on error"""
+        manager = self._manager(rows=0)
+        manager.SessionLocal = sessionmaker(bind=manager.engine)
+        with manager.get_session() as session:
+            session.execute(text("INSERT INTO t VALUES (1, NULL)"))
+        with pytest.raises(RuntimeError):
+            with manager.get_session() as session:
+                session.execute(text("INSERT INTO t VALUES (2, NULL)"))
+                raise RuntimeError("boom")
+        with manager.engine.connect() as conn:
+            assert conn.execute(text("SELECT id FROM t")).scalars().all() == [1]
+
+    def test_initialize_once_under_concurrency(self, monkeypatch):
+        """Test concurrent first calls create a single engine"""
+        import app.utils.database as database
+        from concurrent.futures import ThreadPoolExecutor
+
+        created = []
+
+        def fake_create_engine(*args, **kwargs):
+            created.append(1)
+            return create_engine("sqlite://")
+
+        monkeypatch.setattr(database, "create_engine", fake_create_engine)
+        manager = DatabaseManager()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda _: manager.initialize(), range(32)))
+        assert len(created) == 1
+        assert manager.SessionLocal is not None
+
+    def test_execute_query_chunked(self):
+        """Test execute_query returns one DataFrame or bounded chunks"""
+        manager = self._manager()
+        df = manager.execute_query("SELECT COUNT(*) AS n FROM t")
+        assert df['n'].tolist() == [25]
+        chunks = list(manager.execute_query("SELECT id FROM t", chunksize=10))
+        assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+
+    def test_bound_parameters_and_identifiers(self):
+        """Test helpers bind values and reject non-identifier table names"""
+        manager = self._manager()
+        gdf = manager.execute_spatial_query("SELECT * FROM t WHERE id < :n", params={"n": 3})
+        assert len(gdf) == 3
+        with pytest.raises(ValueError, match="Invalid SQL identifier"):
+            manager.get_table_info("t; DROP TABLE t")
+
+    def test_stream_geojson_rejects_injected_commit(self, monkeypatch):
+        """Test a second statement (COMMIT, then a write) is refused before connecting"""
+        import app.utils.database as database
+
+        monkeypatch.setattr(database, "create_engine", lambda *args, **kwargs: pytest.fail("connected"))
+        manager = DatabaseManager()
+        injected = "SELECT 1) AS s; COMMIT; DELETE FROM vector.x; SELECT (1"
+        with pytest.raises(ValueError, match="single SQL statement"):
+            next(manager.stream_geojson_features(injected, max_rows=10))
+
+    def test_readonly_engine_defaults_to_read_only(self, monkeypatch):
+        """Test untrusted queries get their own engine with read-only sessions"""
+        import app.utils.database as database
+
+        calls = []
+        monkeypatch.setattr(database, "create_engine", lambda *args, **kwargs: calls.append(kwargs) or object())
+        manager = DatabaseManager()
+        engine = manager._get_readonly_engine()
+        assert manager._get_readonly_engine() is engine and len(calls) == 1
+        assert "default_transaction_read_only=on" in calls[0]["connect_args"]["options"]
+
+
+class TestSaveVectorToDB:
+    """Test the spatial index step of save_vector_to_db"""
+
+    @pytest.fixture
+    def saved(self, monkeypatch):
+        import geopandas as gpd
+
+        indexed = []
+        monkeypatch.setattr(gpd.GeoDataFrame, "to_postgis", lambda self, *args, **kwargs: None)
+        monkeypatch.setattr(DatabaseManager, "create_spatial_index",
+                            lambda self, *args: indexed.append(args))
+        manager = DatabaseManager()
+        manager.engine = create_engine("sqlite://")
+        gdf = gpd.GeoDataFrame({"id": [1]}, geometry=[Point(0, 0)], crs="EPSG:4326")
+        return manager, gdf, indexed
+
+    def test_index_after_replace_only(self, saved):
+        """Test a replaced table is indexed and an appended one is not"""
+        manager, gdf, indexed = saved
+        manager.save_vector_to_db(gdf, "roads", use_copy=False)
+        manager.save_vector_to_db(gdf, "roads", if_exists="append", use_copy=False)
+        assert indexed == [("roads", "vector", "geometry")]
+
+    def test_index_rejects_bad_identifiers(self):
+        """Test index creation validates names before running SQL"""
+        manager = DatabaseManager()
+        manager.engine = create_engine("sqlite://")
+        with pytest.raises(ValueError, match="Invalid SQL identifier"):
+            manager.create_spatial_index("roads", geom_col="geom); DROP TABLE roads; --")
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from app.utils.kernels import (
+    ASPECT_Q16_OFFSET,
+    TERRAIN_Q16_NODATA,
+    TERRAIN_Q16_SCALE,
+    aspect_kernel,
+    ndvi_kernel,
+    quantize_terrain_array,
+    slope_kernel,
+    terrain_kernel,
+    vegloss_kernel
+)
+
+
+@pytest.fixture
+def dem():
+    """Create a smooth random elevation surface"""
+    rng = np.random.default_rng(0)
+    return np.cumsum(rng.normal(0, 1, (120, 90)), axis=0).astype(np.float32)
+
+
+class TestTerrainKernels:
+    """Test fused slope/aspect kernels against np.gradient"""
+
+    def test_slope_matches_gradient(self, dem):
+        """Test slope equals arctan(|np.gradient|) in degrees"""
+        dx, dy = np.gradient(dem, 30.0, -30.0)
+        expected = np.degrees(np.arctan(np.sqrt(dx**2 + dy**2)))
+        slope = slope_kernel(dem, 30.0, -30.0)
+        assert slope.dtype == np.float32
+        np.testing.assert_allclose(slope, expected, atol=1e-3)
+
+    def test_aspect_matches_gradient(self, dem):
+        """Test aspect equals arctan2(-dy, dx) normalised to [0, 360)"""
+        dx, dy = np.gradient(dem, 30.0, -30.0)
+        expected = (np.degrees(np.arctan2(-dy, dx)) + 360) % 360
+        aspect = aspect_kernel(dem, 30.0, -30.0)
+        diff = np.abs(aspect - expected)
+        assert np.minimum(diff, 360 - diff).max() < 1e-2
+        assert aspect.min() >= 0 and aspect.max() < 360
+
+    def test_terrain_matches_separate_kernels(self, dem):
+        """Test the combined kernel returns slope_kernel and aspect_kernel"""
+        slope, aspect = terrain_kernel(dem, 30.0, -30.0)
+        np.testing.assert_allclose(slope, slope_kernel(dem, 30.0, -30.0), atol=1e-5)
+        np.testing.assert_allclose(aspect, aspect_kernel(dem, 30.0, -30.0), atol=1e-4)
+
+    def test_too_small_input(self):
+        """Test a DEM without two samples per axis is rejected"""
+        with pytest.raises(ValueError):
+            slope_kernel(np.ones((1, 5), dtype=np.float32), 1.0, 1.0)
+
+    def test_quantize_aspect_round_trip(self, dem):
+        """Test int16 aspect decodes to within half a quantization step"""
+        aspect = aspect_kernel(dem, 30.0, -30.0)
+        aspect[0, 0] = np.nan
+        q = quantize_terrain_array(aspect, ASPECT_Q16_OFFSET)
+        assert q.dtype == np.int16
+        assert q[0, 0] == TERRAIN_Q16_NODATA
+        decoded = q[1:].astype(np.float32) * TERRAIN_Q16_SCALE + ASPECT_Q16_OFFSET
+        assert np.abs(decoded - aspect[1:]).max() <= TERRAIN_Q16_SCALE / 2 + 1e-4
+
+
+class TestNDVIKernel:
+    """Test the fused NDVI kernel"""
+
+    def test_matches_float64_formula(self):
+        """Test uint16 bands give (nir - red) / (nir + red), 0 where both are 0"""
+        rng = np.random.default_rng(1)
+        red = rng.integers(0, 10000, (64, 48), dtype=np.uint16)
+        nir = rng.integers(0, 10000, (64, 48), dtype=np.uint16)
+        red[0, :5] = nir[0, :5] = 0
+        r, n = red.astype(float), nir.astype(float)
+        with np.errstate(invalid='ignore'):
+            expected = np.where(n + r == 0, 0, (n - r) / (n + r))
+        ndvi = ndvi_kernel(red, nir)
+        assert ndvi.dtype == np.float32
+        np.testing.assert_allclose(ndvi, expected, atol=1e-6)
+        assert (ndvi[0, :5] == 0).all()
+
+    @pytest.mark.parametrize("numba", [False, True])
+    def test_mismatched_shapes_rejected(self, monkeypatch, numba):
+        """Test differently sized bands raise before reaching a compiled kernel"""
+        import app.utils.kernels as kernels
+
+        # With NUMBA_AVAILABLE forced on, the check must run before dispatch
+        monkeypatch.setattr(kernels, "NUMBA_AVAILABLE", numba)
+        red = np.ones((64, 48), dtype=np.uint16)
+        with pytest.raises(ValueError, match="same shape"):
+            ndvi_kernel(red, np.ones((32, 48), dtype=np.uint16))
+        with pytest.raises(ValueError, match="same shape"):
+            ndvi_kernel(red, red, out=np.empty((32, 48), dtype=np.float32))
+
+        t1 = np.zeros((64, 48), dtype=np.float32)
+        out = np.empty((64, 48), dtype=np.uint8)
+        with pytest.raises(ValueError, match="same shape"):
+            vegloss_kernel(t1, np.zeros((32, 48), dtype=np.float32), -0.2, out)
+        with pytest.raises(ValueError, match="same shape"):
+            vegloss_kernel(t1, t1, -0.2, out, mask_vec=np.ones((32, 48), dtype=np.uint8))
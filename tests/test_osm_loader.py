@@ -0,0 +1,144 @@
+import io
+import json
+
+import pytest
+
+from app.utils.data_loaders.osm_loader import (
+    COMMON_FEATURE_TYPES,
+    OVERPASS_FEATURES,
+    OSMLoader,
+    build_overpass_query,
+    elements_to_gdf,
+    iter_overpass_elements,
+    split_by_dataset,
+    tile_bbox
+)
+
+BBOX = (13.0, 52.0, 13.5, 52.5)
+
+
+class _Response:
+    """Minimal stand-in for a streamed requests.Response"""
+
+    def __init__(self, payload):
+        self.content = json.dumps(payload).encode()
+        self.raw = io.BytesIO(self.content)
+
+
+def _node(osm_id, **tags):
+    return {'type': 'node', 'id': osm_id, 'lon': 13.1, 'lat': 52.1, 'tags': tags}
+
+
+def _way(osm_id, **tags):
+    ring = [{'lon': 13.1, 'lat': 52.1}, {'lon': 13.2, 'lat': 52.1}, {'lon': 13.2, 'lat': 52.2}, {'lon': 13.1, 'lat': 52.1}]
+    return {'type': 'way', 'id': osm_id, 'geometry': ring, 'tags': tags}
+
+
+class TestOverpassBatching:
+    """Test the combined Overpass query and the local split by dataset"""
+
+    def test_same_key_statements_are_merged(self):
+        """Test exact matches on one key become a single regex statement"""
+        statements = OVERPASS_FEATURES['hospital'] + OVERPASS_FEATURES['school']
+        query = build_overpass_query(statements, BBOX)
+        assert 'nw["amenity"~"^(hospital|school)$"](52.0,13.0,52.5,13.5);' in query
+        assert query.count('["amenity"') == 1
+        # A global [bbox:...] would also clip `out geom`
+        assert '[bbox:' not in query
+        assert 'out geom;' in query
+
+    def test_common_features_in_one_query(self):
+        """Test every dataset's statements fit in one query"""
+        statements = [
+            s for features in COMMON_FEATURE_TYPES.values() for f in features for s in OVERPASS_FEATURES[f]
+        ]
+        query = build_overpass_query(statements, BBOX)
+        assert query.count('[out:json]') == 1
+        assert 'relation["boundary"="administrative"]["admin_level"="8"]' in query
+
+    def test_split_by_dataset(self):
+        """Test elements land in every dataset whose tags they match"""
+        elements = [
+            _node(1, amenity='hospital'),
+            _way(2, amenity='cinema'),
+            _node(3, highway='bus_stop'),
+            _way(4, natural='water', water='yes'),
+            _node(5, amenity='bench'),
+            {'type': 'relation', 'id': 6, 'tags': {'boundary': 'administrative', 'admin_level': '8'}},
+        ]
+        datasets = split_by_dataset(elements, COMMON_FEATURE_TYPES)
+        assert [e['id'] for e in datasets['hospitals']] == [1]
+        assert [e['id'] for e in datasets['theatres']] == [2]
+        assert [e['id'] for e in datasets['transport_stops']] == [3]
+        assert [e['id'] for e in datasets['water_bodies']] == [4]
+        assert [e['id'] for e in datasets['districts']] == [6]
+        assert datasets['schools'] == []
+
+    def test_elements_to_gdf(self):
+        """Test nodes become points and closed ways polygons"""
+        gdf = elements_to_gdf([_node(1, amenity='hospital'), _way(2, amenity='school')])
+        assert list(gdf.geom_type) == ['Point', 'Polygon']
+        assert list(gdf['amenity']) == ['hospital', 'school']
+
+    def test_elements_to_gdf_mixed_order(self):
+        """Test geometries stay aligned with their tags across geometry types"""
+        line = {'type': 'way', 'id': 3, 'geometry': [{'lon': 13.0, 'lat': 52.0}, {'lon': 13.1, 'lat': 52.1}], 'tags': {'highway': 'path'}}
+        gdf = elements_to_gdf([_way(1, amenity='school'), line, _node(2, amenity='atm'), {'type': 'node', 'id': 4, 'lon': 0, 'lat': 0}])
+        assert list(gdf['osm_id']) == [1, 3, 2]
+        assert list(gdf.geom_type) == ['Polygon', 'LineString', 'Point']
+        assert len(elements_to_gdf([])) == 0
+
+    def test_iter_overpass_elements(self):
+        """Test untagged elements are dropped and node ids and bounds trimmed"""
+        way = {**_way(2, amenity='school'), 'nodes': [1, 2, 3, 1], 'bounds': {'minlat': 52.1}}
+        payload = {'version': 0.6, 'elements': [_node(1, amenity='atm'), {'type': 'node', 'id': 3, 'lon': 0, 'lat': 0}, way]}
+        elements = list(iter_overpass_elements(_Response(payload)))
+        assert [e['id'] for e in elements] == [1, 2]
+        assert elements[1] == _way(2, amenity='school')
+
+    def test_tile_bbox(self):
+        """Test large bboxes are split into a covering grid of small tiles"""
+        assert tile_bbox(BBOX, 0.5) == [BBOX]
+        tiles = tile_bbox((13.0, 52.0, 13.6, 52.5), 0.25)
+        assert len(tiles) == 6
+        assert tiles[0][:2] == (13.0, 52.0) and tiles[-1][2:] == (13.6, 52.5)
+        assert all(t[2] - t[0] <= 0.25 and t[3] - t[1] <= 0.25 for t in tiles)
+
+    def test_elements_to_gdf_sparse_tags(self):
+        """Test tag columns are aligned and missing tags are null"""
+        gdf = elements_to_gdf([_node(1, amenity='atm'), _node(2, name='A'), _node(3, amenity='bank', name='B')])
+        assert list(gdf.columns) == ['osm_id', 'amenity', 'name', 'geometry']
+        assert gdf['amenity'].tolist() == ['atm', None, 'bank']
+        assert gdf['name'].tolist() == [None, 'A', 'B']
+
+    def test_unknown_feature_rejected(self, tmp_path):
+        """Test typos raise before any request and no features mean no query"""
+        loader = OSMLoader(data_dir=str(tmp_path))
+        with pytest.raises(ValueError, match="hosptial"):
+            loader.query_overpass(BBOX, ['hospital', 'hosptial'])
+        gdf = loader.query_overpass(BBOX, [])
+        assert len(gdf) == 0 and gdf.crs == "EPSG:4326"
+
+    def test_way_crossing_tile_edge_keeps_full_geometry(self, tmp_path, monkeypatch):
+        """Test a park ring spanning two tiles comes back whole, and null nodes raise"""
+        ring = [{'lon': 13.2, 'lat': 52.1}, {'lon': 13.3, 'lat': 52.1},
+                {'lon': 13.3, 'lat': 52.2}, {'lon': 13.2, 'lat': 52.2}, {'lon': 13.2, 'lat': 52.1}]
+        park = {'type': 'way', 'id': 7, 'geometry': ring, 'tags': {'leisure': 'park'}}
+
+        queries = []
+
+        def run_overpass(query, force=False):
+            queries.append(query)
+            return [dict(park)]
+
+        loader = OSMLoader(data_dir=str(tmp_path))
+        monkeypatch.setattr(loader, '_run_overpass', run_overpass)
+        gdf = loader.query_overpass((13.0, 52.0, 13.5, 52.25), ['park'])
+
+        assert len(queries) == 2 and not any('[bbox:' in query for query in queries)
+        assert len(gdf) == 1 and gdf.geometry.iloc[0].geom_type == 'Polygon'
+        assert gdf.geometry.iloc[0].bounds == (13.2, 52.1, 13.3, 52.2)
+
+        clipped = dict(park, geometry=ring[:2] + [None] + ring[3:])
+        with pytest.raises(ValueError, match="way 7"):
+            elements_to_gdf([clipped])
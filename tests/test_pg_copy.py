@@ -0,0 +1,80 @@
+import struct
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from geoalchemy2 import Geometry
+from shapely.geometry import Point
+from sqlalchemy import types
+
+from app.utils.pg_copy import column_types, copy_binary_supported, encode_copy_binary
+
+
+def _decode(stream: bytes):
+    """Split a binary COPY stream into rows of raw field bytes (None for NULL)"""
+    assert stream.startswith(b"PGCOPY\n\xff\r\n\x00")
+    pos, rows = 19, []
+    while True:
+        (count,) = struct.unpack_from(">h", stream, pos)
+        pos += 2
+        if count == -1:
+            assert pos == len(stream)
+            return rows
+        row = []
+        for _ in range(count):
+            (length,) = struct.unpack_from(">i", stream, pos)
+            pos += 4
+            if length == -1:
+                row.append(None)
+            else:
+                row.append(stream[pos:pos + length])
+                pos += length
+        rows.append(row)
+
+
+class TestCopyBinary:
+    """Test binary COPY encoding of GeoDataFrames"""
+
+    def test_round_trip(self):
+        """Test each column type decodes back to its value, with NULLs"""
+        gdf = gpd.GeoDataFrame({
+            "osm_id": np.array([1, 2], dtype=np.int64),
+            "rank": np.array([3, 4], dtype=np.int32),
+            "area": [1.5, np.nan],
+            "name": ["Köln", None],
+            "seen": pd.to_datetime(["2000-01-01 00:00:01", None]),
+            "geometry": [Point(6.9, 50.9), None],
+        }, crs="EPSG:4326")
+        assert copy_binary_supported(gdf)
+
+        rows = _decode(encode_copy_binary(gdf))
+        assert len(rows) == 2 and all(len(row) == 6 for row in rows)
+
+        first, second = rows
+        assert struct.unpack(">q", first[0])[0] == 1
+        assert struct.unpack(">i", first[1])[0] == 3
+        assert struct.unpack(">d", first[2])[0] == 1.5
+        assert first[3].decode("utf-8") == "Köln"
+        assert struct.unpack(">q", first[4])[0] == 1_000_000
+        geom = shapely.from_wkb(first[5])
+        assert geom.equals(Point(6.9, 50.9)) and shapely.get_srid(geom) == 4326
+        assert second[2:] == [None, None, None, None]
+
+    def test_column_types(self):
+        """Test SQL types match the encoded widths"""
+        gdf = gpd.GeoDataFrame({
+            "a": np.array([1], dtype=np.int16),
+            "b": ["x"],
+            "geometry": [Point(0, 0)],
+        }, crs="EPSG:3857")
+        dtypes = column_types(gdf)
+        assert dtypes["a"] is types.BigInteger
+        assert dtypes["b"] is types.Text
+        assert isinstance(dtypes["geometry"], Geometry)
+        assert dtypes["geometry"].geometry_type == "POINT" and dtypes["geometry"].srid == 3857
+
+    def test_unsupported_columns(self):
+        """Test mixed object columns fall back to to_postgis"""
+        gdf = gpd.GeoDataFrame({"tags": [{"a": 1}], "geometry": [Point(0, 0)]})
+        assert not copy_binary_supported(gdf)
@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+import app.utils.raster_operations as raster_operations
+from app.utils.raster_operations import read_band_cached
+
+
+def _write(path, value):
+    with rasterio.open(path, 'w', driver='GTiff', width=32, height=32, count=1, dtype='float32',
+                       crs='EPSG:32633', transform=from_origin(0, 32, 1, 1)) as dst:
+        dst.write(np.full((1, 32, 32), value, dtype=np.float32))
+
+
+@pytest.fixture
+def band_cache(monkeypatch):
+    """Empty band cache with room for two 32x32 float32 bands"""
+    monkeypatch.setattr(raster_operations, '_band_cache', raster_operations.OrderedDict())
+    monkeypatch.setattr(raster_operations, '_band_cache_bytes', 0)
+    monkeypatch.setattr(raster_operations, 'BAND_CACHE_BYTES', 2 * 32 * 32 * 4)
+    return raster_operations._band_cache
+
+
+class TestBandCache:
+    """Test the byte-budgeted cache behind read_band_cached"""
+
+    def test_evicts_by_size(self, tmp_path, band_cache):
+        """Test the least recently used band is dropped once the budget is exceeded"""
+        paths = [tmp_path / f"b{i}.tif" for i in range(3)]
+        for i, path in enumerate(paths):
+            _write(path, i)
+
+        first, _ = read_band_cached(paths[0])
+        read_band_cached(paths[1])
+        assert read_band_cached(paths[0])[0] is first
+        read_band_cached(paths[2])
+
+        assert [key[0] for key in band_cache] == [str(paths[0]), str(paths[2])]
+        assert raster_operations._band_cache_bytes == 2 * 32 * 32 * 4
+        assert not first.flags.writeable
+
+    def test_rewritten_file_replaces_entry(self, tmp_path, band_cache):
+        """Test a changed file is re-read and its old version released"""
+        path = tmp_path / "b.tif"
+        _write(path, 1)
+        read_band_cached(path)
+        _write(path, 2)
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**9))
+
+        array, _ = read_band_cached(path)
+        assert array[0, 0] == 2
+        assert len(band_cache) == 1
+
+    def test_oversized_band_not_cached(self, tmp_path, band_cache, monkeypatch):
+        """Test a band larger than the budget is returned but not kept"""
+        monkeypatch.setattr(raster_operations, 'BAND_CACHE_BYTES', 100)
+        path = tmp_path / "b.tif"
+        _write(path, 1)
+        assert read_band_cached(path)[0].shape == (32, 32)
+        assert len(band_cache) == 0
+
+    @pytest.mark.parametrize("budget_bands, expected_reads", [(2, 2), (1.5, 0)])
+    def test_aligned_pair_decoded_once_or_streamed(self, tmp_path, band_cache, monkeypatch,
+                                                   budget_bands, expected_reads):
+        """Test repeat change detections hit the cache, or stream when the pair can't fit"""
+        from app.utils.raster_operations import RasterOperations
+
+        monkeypatch.setattr(raster_operations, 'BAND_CACHE_BYTES', int(budget_bands * 32 * 32 * 4))
+        reads = []
+        read_band = raster_operations._read_band
+        monkeypatch.setattr(raster_operations, '_read_band', lambda path: reads.append(path) or read_band(path))
+
+        _write(tmp_path / "t1.tif", 0.8)
+        _write(tmp_path / "t2.tif", 0.1)
+        ops = RasterOperations()
+        results = [ops.detect_vegetation_loss_aligned(tmp_path / "t1.tif", tmp_path / "t2.tif") for _ in range(3)]
+
+        assert len(reads) == expected_reads
+        assert all(len(result) == 1 for result in results)
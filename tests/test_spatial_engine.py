@@ -1,5 +1,6 @@
 import pytest
 import geopandas as gpd
+from pathlib import Path
 from shapely.geometry import Point, Polygon
 from app.utils.spatial_engine import SpatialEngine
 from app.models.query_model import OperationPlan, GeospatialOperation
@@ -99,3 +100,55 @@ class TestGeospatialOperations:
 
         assert engine.current_result is not None
         assert len(engine.current_result) > 0
+
+
+class TestNDVIChangeFallback:
+    """Test vegetation loss on NDVI rasters that are not on the same grid"""
+
+    @staticmethod
+    def _write_ndvi(path, array, res):
+        import rasterio
+        from rasterio.transform import from_origin
+
+        with rasterio.open(path, 'w', driver='GTiff', width=array.shape[1], height=array.shape[0],
+                           count=1, dtype='float32', crs='EPSG:32633',
+                           transform=from_origin(390000, 5820000, res, res)) as dst:
+            dst.write(array, 1)
+
+    def test_loss_is_georeferenced_without_temp_file(self, tmp_path):
+        """Test the resampling path keeps t1's grid and writes nothing to data/temp"""
+        import numpy as np
+
+        t1 = np.full((40, 40), 0.8, dtype=np.float32)
+        t2 = np.full((20, 20), 0.8, dtype=np.float32)
+        t2[:5, :5] = 0.1
+        self._write_ndvi(tmp_path / "t1.tif", t1, 10)
+        self._write_ndvi(tmp_path / "t2.tif", t2, 20)
+
+        engine = SpatialEngine(data_dir=str(tmp_path))
+        result = engine._execute_vegetation_loss({"ndvi_t1": "t1.tif", "ndvi_t2": "t2.tif"})
+
+        assert result["metadata"]["count"] > 0
+        assert not (tmp_path / "temp").exists()
+        # UTM 33N (390000, 5820000) is in Berlin; pixel coordinates would land near the equator
+        minx, miny, maxx, maxy = result["metadata"]["bounds"]
+        assert 13 < minx < maxx < 14 and 52 < miny < maxy < 53
+
+    def test_clip_defaults_to_unique_output(self, tmp_path):
+        """Test clips without an output get their own file and leave no .part behind"""
+        import numpy as np
+        from shapely.geometry import box
+
+        self._write_ndvi(tmp_path / "t1.tif", np.ones((40, 40), dtype=np.float32), 10)
+        gpd.GeoDataFrame(geometry=[box(390050, 5819650, 390250, 5819950)], crs="EPSG:32633") \
+            .to_file(tmp_path / "aoi.geojson", driver="GeoJSON")
+
+        engine = SpatialEngine(data_dir=str(tmp_path))
+        params = {"raster": "t1.tif", "vector": "aoi.geojson"}
+        first = engine._execute_clip_raster(dict(params))["output_path"]
+        second = engine._execute_clip_raster(dict(params))["output_path"]
+
+        assert first != second
+        assert sorted(p.name for p in (tmp_path / "temp").iterdir()) == sorted(
+            [Path(first).name, Path(second).name]
+        )
@@ -0,0 +1,30 @@
+import pytest
+from app.utils.tiling import generate_tiling_grid
+
+
+class TestTilingGrid:
+    """Test raster tiling grid generation"""
+
+    def test_tiles_cover_grid_without_overlap(self):
+        """Test tiles partition the grid exactly"""
+        windows = generate_tiling_grid((1000, 700), tile_size=256)
+        assert len(windows) == 4 * 3
+        assert sum(w.width * w.height for w in windows) == 1000 * 700
+
+    def test_edge_tiles_are_clipped(self):
+        """Test the last row/column of tiles stops at the grid edge"""
+        last = generate_tiling_grid((1000, 700), tile_size=256)[-1]
+        assert (last.row_off, last.col_off) == (768, 512)
+        assert (last.height, last.width) == (232, 188)
+
+    def test_overlap(self):
+        """Test tiles extend into their neighbours but not past the grid"""
+        windows = generate_tiling_grid((512, 512), tile_size=256, overlap=1)
+        assert (windows[0].width, windows[0].height) == (257, 257)
+        assert (windows[3].col_off, windows[3].row_off) == (255, 255)
+        assert (windows[3].width, windows[3].height) == (257, 257)
+
+    def test_invalid_tile_size(self):
+        """Test non-positive tile sizes are rejected"""
+        with pytest.raises(ValueError):
+            generate_tiling_grid((100, 100), tile_size=0)